@@ -38,6 +38,7 @@
             pygobject3
             python-dateutil
             python-Levenshtein
+            rapidfuzz
             requests
             semver
             thefuzz
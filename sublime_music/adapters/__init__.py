@@ -4,15 +4,20 @@ from .adapter_base import (
     CacheMissError,
     CachingAdapter,
     ConfigurationStore,
+    LibraryChanges,
     SongCacheStatus,
     UIInfo,
 )
+from .concurrency import AdaptiveConcurrencyLimiter
 from .configure_server_form import ConfigParamDescriptor, ConfigureServerForm
+from .executor import TaskPriority
 from .manager import AdapterManager, DownloadProgress, Result, SearchResult
+from .session_pool import HTTPSessionPool
 
 __all__ = (
     "Adapter",
     "AdapterManager",
+    "AdaptiveConcurrencyLimiter",
     "AlbumSearchQuery",
     "CacheMissError",
     "CachingAdapter",
@@ -20,8 +25,11 @@ __all__ = (
     "ConfigurationStore",
     "ConfigureServerForm",
     "DownloadProgress",
+    "HTTPSessionPool",
+    "LibraryChanges",
     "Result",
     "SearchResult",
     "SongCacheStatus",
+    "TaskPriority",
     "UIInfo",
 )
@@ -2,11 +2,12 @@ import abc
 import copy
 import hashlib
 import uuid
+from concurrent.futures import Future
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, cast
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple, cast
 
 import gi
 
@@ -22,6 +23,8 @@ except Exception:
 
 from ..util import this_decade
 from .api_objects import Album, Artist, Directory, Genre, Playlist, PlayQueue, SearchResult, Song
+from .concurrency import AdaptiveConcurrencyLimiter
+from .session_pool import HTTPSessionPool
 
 
 class SongCacheStatus(Enum):
@@ -126,6 +129,37 @@ class AlbumSearchQuery:
         return self._strhash
 
 
+@dataclass
+class LibraryChanges:
+    """
+    Describes what has changed in the library since the last library sync. This is
+    returned by :class:`Adapter.get_library_changes`.
+
+    **Fields:**
+
+    * :class:`LibraryChanges.watermark` -- an opaque string that identifies the state
+      of the library as of this sync. It is stored by the caching adapter and passed to
+      the next call to :class:`Adapter.get_library_changes`.
+    * :class:`LibraryChanges.changed` -- whether or not anything may have changed since
+      the last sync. If this is ``False``, the cached artists, root directory, and album
+      lists are up to date.
+    * :class:`LibraryChanges.new_albums` -- the albums that were added since the last
+      sync, newest first, so that they can be cached without retrieving all of the
+      album lists again.
+    * :class:`LibraryChanges.new_albums_complete` -- whether ``new_albums`` contains
+      every album that was added since the last sync. If it does, the caching adapter
+      can add them to the album lists that it has cached instead of invalidating them.
+    * :class:`LibraryChanges.root_directory` -- the root directory, if the adapter had
+      to retrieve it to find out whether anything changed.
+    """
+
+    watermark: str
+    changed: bool = True
+    new_albums: Sequence[Album] = ()
+    new_albums_complete: bool = False
+    root_directory: Optional[Directory] = None
+
+
 class CacheMissError(Exception):
     """
     This exception should be thrown by caching adapters when the request data is not
@@ -314,6 +348,17 @@ class Adapter(abc.ABC):
         cache to disk, disconnecting from a server, etc.
         """
 
+    def call_async(self, function_name: str, *args, **kwargs) -> Optional[Future]:
+        """
+        Start calling the data retrieval method with the given name without blocking a
+        thread, if the adapter supports that for the method.
+
+        :returns: a future for the result of the method, or ``None`` if the method has
+            to be called directly (in which case the :class:`AdapterManager` calls it on
+            one of its threads).
+        """
+        return None
+
     # Usage Properties
     # These properties determine how the adapter can be used and how quickly
     # data can be expected from this adapter.
@@ -349,6 +394,24 @@ class Adapter(abc.ABC):
         """
         return True
 
+    @property
+    def http_session_pool(self) -> Optional[HTTPSessionPool]:
+        """
+        The pool of HTTP connections that the adapter uses to talk to its server, if
+        any. The :class:`AdapterManager` uses the same pool to download the URIs that
+        the adapter returns so that the downloads can reuse the connections.
+        """
+        return None
+
+    @property
+    def concurrency_limiter(self) -> Optional[AdaptiveConcurrencyLimiter]:
+        """
+        The limiter for the number of requests that the adapter makes to its server at
+        once, if any. Its statistics are included in the metrics of the
+        :class:`AdapterManager`.
+        """
+        return None
+
     @abc.abstractmethod
     def on_offline_mode_change(self, offline_mode: bool):
         """
@@ -560,6 +623,14 @@ class Adapter(abc.ABC):
         """
         return False
 
+    # Library Sync
+    @property
+    def can_get_library_changes(self) -> bool:
+        """
+        Whether or not the adapter supports :class:`get_library_changes`.
+        """
+        return False
+
     # Data Retrieval Methods
     # These properties determine if what things the adapter can be used to do
     # at the current moment.
@@ -675,6 +746,28 @@ class Adapter(abc.ABC):
         """
         raise self._check_can_error("get_song_details")
 
+    def get_songs_details(self, song_ids: Sequence[str]) -> Dict[str, Song]:
+        """
+        Get the details for multiple song IDs at once. Adapters which can look up many
+        songs more efficiently than one at a time should override this. The default
+        implementation calls :class:`get_song_details` for each of the song IDs.
+
+        This function will only be called if :class:`can_get_song_details` is ``True``.
+
+        :param song_ids: The IDs of the songs to get the details for.
+        :returns: A dictionary of song ID to
+            :class:`sublime_music.adapters.api_objects.Song`. Songs which the adapter
+            can't return (for example, songs that have not been cached or have been
+            invalidated if this is a caching adapter) are left out of the dictionary.
+        """
+        songs = {}
+        for song_id in song_ids:
+            try:
+                songs[song_id] = self.get_song_details(song_id)
+            except CacheMissError:
+                pass
+        return songs
+
     def scrobble_song(self, song: Song):
         """
         Scrobble the given song.
@@ -720,7 +813,10 @@ class Adapter(abc.ABC):
         raise self._check_can_error("get_ignored_articles")
 
     def get_albums(
-        self, query: AlbumSearchQuery, sort_direction: str = "ascending"
+        self,
+        query: AlbumSearchQuery,
+        sort_direction: str = "ascending",
+        on_page: Optional[Callable[[Sequence[Album]], None]] = None,
     ) -> Sequence[Album]:
         """
         Get a list of all of the albums known to the adapter for the given query.
@@ -732,6 +828,9 @@ class Adapter(abc.ABC):
 
         :param query: An :class:`AlbumSearchQuery` object representing the types of
             albums to return.
+        :param on_page: If the adapter retrieves the albums in pages, it should call
+            this function with each page, in order, as soon as it arrives so that the
+            albums can be shown before all of them have been retrieved.
         :returns: A list of all of the :class:`sublime_music.adapter.api_objects.Album`
             objects known to the adapter that match the query.
         """
@@ -806,6 +905,17 @@ class Adapter(abc.ABC):
         """
         raise self._check_can_error("search")
 
+    def get_library_changes(self, watermark: Optional[str]) -> LibraryChanges:
+        """
+        Find out what has changed in the library since the last library sync. This
+        should be much cheaper than retrieving the artists and albums again.
+
+        :param watermark: the :class:`LibraryChanges.watermark` returned by the last
+            sync, or ``None`` if the library has never been synced.
+        :returns: a :class:`LibraryChanges` object describing what has changed.
+        """
+        raise self._check_can_error("get_library_changes")
+
     @staticmethod
     def _check_can_error(method_name: str) -> NotImplementedError:
         return NotImplementedError(
@@ -864,11 +974,32 @@ class CachingAdapter(Adapter):
         SONG_FILE = "song_file"
         SONG_FILE_PERMANENT = "song_file_permanent"
         SONG_RATING = "song_rating"
+        LIBRARY_SYNC = "library_sync"
 
         # These are only for clearing the cache, and will only do deletion
         ALL_SONGS = "all_songs"
         EVERYTHING = "everything"
 
+    # How long the data for each cache key stays valid after it is ingested. Expired
+    # data should be treated like invalidated data: a ``CacheMissError`` should be
+    # thrown with the expired data in the ``partial_data`` field. The data for keys
+    # that are not in this dictionary never expires.
+    cache_ttls: Dict[CachedDataKey, timedelta] = {}
+
+    def get_expiration_time(
+        self, data_key: CachedDataKey, param: Optional[str]
+    ) -> Optional[datetime]:
+        """
+        Get the time at which the cached data will expire according to
+        :class:`cache_ttls`.
+
+        :param data_key: the type of data.
+        :param param: the parameter that uniquely identifies the data.
+        :returns: the time at which the data expires, or ``None`` if there is no valid
+            data cached for the given key and parameter, or if it never expires.
+        """
+        return None
+
     @abc.abstractmethod
     def ingest_new_data(self, data_key: CachedDataKey, param: Optional[str], data: Any):
         """
@@ -887,6 +1018,67 @@ class CachingAdapter(Adapter):
         :param data: the data that was returned by the ground truth adapter.
         """
 
+    def ingest_new_data_page(
+        self,
+        data_key: CachedDataKey,
+        param: Optional[str],
+        data: Sequence[Any],
+        offset: int,
+        is_last_page: bool,
+    ) -> bool:
+        """
+        Ingest one page of a list (currently, only the albums for a
+        :class:`AlbumSearchQuery`) as soon as it is returned by the ground truth
+        adapter. The page at offset 0 replaces any existing data, and each page after
+        that is appended to it. The data must not be considered valid until the last
+        page has been ingested.
+
+        :param data_key: the type of data to be ingested.
+        :param param: a string that uniquely identify the data to be ingested.
+        :param data: the items on the page. This is empty for the last page if the
+            total number of items was not known until the previous page arrived.
+        :param offset: the index of the first item of the page in the list.
+        :param is_last_page: whether or not this is the last page.
+        :returns: whether or not the page was ingested. If the adapter doesn't support
+            ingesting pages (the default), all of the data is ingested with
+            :class:`ingest_new_data` once the last page arrives.
+        """
+        return False
+
+    def ingest_new_data_batch(self, items: Iterable[Tuple[CachedDataKey, Optional[str], Any]]):
+        """
+        Ingest multiple pieces of new data at once. Adapters should override this if
+        they can ingest all of the data more efficiently together (for example, in a
+        single database transaction). The default implementation calls
+        :class:`ingest_new_data` for each item.
+
+        :param items: ``(data_key, param, data)`` tuples with the same meaning as the
+            arguments to :class:`ingest_new_data`.
+        """
+        for data_key, param, data in items:
+            self.ingest_new_data(data_key, param, data)
+
+    def get_library_watermark(self) -> Optional[str]:
+        """
+        Get the :class:`LibraryChanges.watermark` of the last library sync that was
+        ingested (with the ``LIBRARY_SYNC`` key).
+
+        :returns: the watermark, or ``None`` if the adapter doesn't store it (the
+            default) or if no library sync has been ingested.
+        """
+        return None
+
+    def get_cached_params(self, data_key: CachedDataKey) -> Optional[Set[str]]:
+        """
+        Get the parameters of all of the data of the given type that is cached and
+        valid, so that the caller doesn't have to check each one separately.
+
+        :param data_key: the type of data (for example, ``ALBUM``).
+        :returns: the parameters (for example, the IDs of the albums whose details are
+            cached), or ``None`` if the adapter can't list them (the default).
+        """
+        return None
+
     @abc.abstractmethod
     def invalidate_data(self, data_key: CachedDataKey, param: Optional[str]):
         """
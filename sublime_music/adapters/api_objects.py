@@ -2,9 +2,10 @@
 Defines the objects that are returned by adapter methods.
 """
 import abc
-import logging
+import heapq
+import threading
 from datetime import datetime, timedelta
-from functools import lru_cache, partial
+from operator import itemgetter
 from typing import (
     Any,
     Callable,
@@ -13,13 +14,14 @@ from typing import (
     List,
     Optional,
     Sequence,
+    Set,
     Tuple,
     TypeVar,
     Union,
     cast,
 )
 
-from thefuzz import fuzz
+from rapidfuzz import fuzz, process
 
 
 class Genre(abc.ABC):
@@ -124,37 +126,37 @@ class PlayQueue(abc.ABC):
     current_index: Optional[int]
 
 
-@lru_cache(maxsize=8192)
-def similarity_ratio(query: str, string: str) -> int:
-    """
-    Return the :class:`thefuzz.fuzz.partial_ratio` between the ``query`` and
-    the given ``string``.
-
-    This ends up being called quite a lot, so the result is cached in an LRU
-    cache using :class:`functools.lru_cache`.
-
-    :param query: the query string
-    :param string: the string to compare to the query string
-    """
-    return fuzz.partial_ratio(query, string)
-
-
 class SearchResult:
     """
     An object representing the aggregate results of a search which can include
     both server and local results.
+
+    Each result is scored against the query (with
+    :class:`rapidfuzz.fuzz.partial_ratio`) the first time the results of its type are
+    requested after it was added, so merging in more results only scores the new ones.
     """
 
+    # The maximum number of results of each type, and the minimum similarity of a result
+    # to the query.
+    max_results = 20
+    min_similarity = 60
+
+    _result_types = ("artists", "albums", "songs", "playlists")
+
     def __init__(self, query: Optional[str] = None):
         self.query = query
-        self.similiarity_partial = partial(
-            similarity_ratio, self.query.lower() if self.query else ""
-        )
+        self._normalized_query = query.lower() if query else ""
         self._artists: Dict[str, Artist] = {}
         self._albums: Dict[str, Album] = {}
         self._songs: Dict[str, Song] = {}
         self._playlists: Dict[str, Playlist] = {}
 
+        # The similarity of each result to the query (or None if it isn't similar
+        # enough), and the IDs of the results that haven't been scored yet, by type.
+        self._scores: Dict[str, Dict[str, Optional[float]]] = {t: {} for t in self._result_types}
+        self._unscored: Dict[str, Set[str]] = {t: set() for t in self._result_types}
+        self._lock = threading.Lock()
+
     def __repr__(self) -> str:
         fields = ("query", "_artists", "_albums", "_songs", "_playlists")
         formatted_fields = (f"{f}={getattr(self, f)}" for f in fields)
@@ -166,53 +168,85 @@ class SearchResult:
             return
 
         member = f"_{result_type}"
-        cast(Dict[str, Any], getattr(self, member)).update({r.id: r for r in results})
+        new_results = {r.id: r for r in results}
+        with self._lock:
+            cast(Dict[str, Any], getattr(self, member)).update(new_results)
+            self._unscored[result_type].update(new_results)
 
     def update(self, other: "SearchResult"):
         assert self.query == other.query
-        self._artists.update(other._artists)
-        self._albums.update(other._albums)
-        self._songs.update(other._songs)
-        self._playlists.update(other._playlists)
+        # Copy the other search result first, rather than holding both locks at once
+        # (which could deadlock if the other search result is updated from this one at
+        # the same time).
+        with other._lock:
+            snapshot = {
+                result_type: (
+                    dict(cast(Dict[str, Any], getattr(other, f"_{result_type}"))),
+                    set(other._unscored[result_type]),
+                    dict(other._scores[result_type]),
+                )
+                for result_type in self._result_types
+            }
+
+        with self._lock:
+            for result_type, (other_results, other_unscored, other_scores) in snapshot.items():
+                cast(Dict[str, Any], getattr(self, f"_{result_type}")).update(other_results)
+
+                # The query is the same, so the results that have already been scored by
+                # the other search result don't have to be scored again.
+                for id_ in other_results:
+                    if id_ in other_unscored:
+                        self._unscored[result_type].add(id_)
+                    else:
+                        self._unscored[result_type].discard(id_)
+                        self._scores[result_type][id_] = other_scores[id_]
 
     _S = TypeVar("_S")
 
     def _to_result(
         self,
-        it: Dict[str, _S],
+        result_type: str,
         transform: Callable[[_S], Tuple[Optional[str], ...]],
     ) -> List[_S]:
         assert self.query
-        all_results = []
-        for value in it.values():
-            transformed = transform(value)
-            if any(t is None for t in transformed):
-                continue
-
-            max_similarity = max(
-                self.similiarity_partial(t.lower()) for t in transformed if t is not None
+        with self._lock:
+            results = cast(Dict[str, SearchResult._S], getattr(self, f"_{result_type}"))
+            scores = self._scores[result_type]
+            if unscored := self._unscored[result_type]:
+                # Score all of the strings of all of the new results in one batch.
+                choices: Dict[Tuple[str, int], str] = {}
+                for id_ in unscored:
+                    scores[id_] = None
+                    transformed = transform(results[id_])
+                    if any(t is None for t in transformed):
+                        continue
+                    for i, t in enumerate(transformed):
+                        choices[(id_, i)] = cast(str, t).lower()
+
+                for _, similarity, key in process.extract(
+                    self._normalized_query,
+                    choices,
+                    scorer=fuzz.partial_ratio,
+                    processor=None,
+                    limit=None,
+                    score_cutoff=self.min_similarity,
+                ):
+                    # The key of each match is the key of the choice that it matched.
+                    id_, _ = cast(Tuple[str, int], key)
+                    scores[id_] = max(similarity, scores[id_] or 0)
+                unscored.clear()
+
+            # Ties are broken by the order in which the results were added.
+            best: List[Tuple[float, str]] = heapq.nlargest(
+                self.max_results,
+                ((score, id_) for id_ in results if (score := scores.get(id_)) is not None),
+                key=itemgetter(0),
             )
-            if max_similarity < 60:
-                continue
-
-            all_results.append((max_similarity, value))
-
-        all_results.sort(key=lambda rx: rx[0], reverse=True)
-
-        result: List[SearchResult._S] = []
-        for ratio, x in all_results:
-            if ratio >= 60 and len(result) < 20:
-                result.append(x)
-            else:
-                # No use going on, all the rest are less.
-                break
-
-        logging.debug(similarity_ratio.cache_info())
-        return result
+            return [results[id_] for _, id_ in best]
 
     @property
     def artists(self) -> List[Artist]:
-        return self._to_result(self._artists, lambda a: (a.name,))
+        return self._to_result("artists", lambda a: (a.name,))
 
     def _try_get_artist_name(self, obj: Union[Album, Song]) -> Optional[str]:
         try:
@@ -223,12 +257,12 @@ class SearchResult:
 
     @property
     def albums(self) -> List[Album]:
-        return self._to_result(self._albums, lambda a: (a.name, self._try_get_artist_name(a)))
+        return self._to_result("albums", lambda a: (a.name, self._try_get_artist_name(a)))
 
     @property
     def songs(self) -> List[Song]:
-        return self._to_result(self._songs, lambda s: (s.title, self._try_get_artist_name(s)))
+        return self._to_result("songs", lambda s: (s.title, self._try_get_artist_name(s)))
 
     @property
     def playlists(self) -> List[Playlist]:
-        return self._to_result(self._playlists, lambda p: (p.name,))
+        return self._to_result("playlists", lambda p: (p.name,))
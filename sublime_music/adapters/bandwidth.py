@@ -0,0 +1,152 @@
+import threading
+from time import monotonic
+from typing import Callable, Dict, List
+
+from .executor import TaskPriority
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, now: float):
+        self.rate = rate
+        self.tokens = self.burst
+        self.last_refill = now
+
+    @property
+    def burst(self) -> float:
+        # Allow up to one second worth of data to be downloaded in a burst.
+        return self.rate
+
+    def refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def set_rate(self, rate: float, now: float):
+        self.refill(now)
+        self.rate = rate
+        self.tokens = min(self.burst, self.tokens)
+
+    def wait_time(self) -> float:
+        """
+        :returns: how long until the bucket is out of debt.
+        """
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate if self.rate > 0 else float("inf")
+
+
+class BandwidthLimiter:
+    """
+    A token bucket limiting the number of bytes per second that are downloaded by all
+    of the threads that share it.
+
+    Part of the bandwidth can be reserved (for example, for the song that is being
+    streamed by the player). While bandwidth is reserved, downloads with
+    :class:`TaskPriority.PREFETCH` or :class:`TaskPriority.BACKGROUND` priority are
+    limited to the rest of the bandwidth. Within the limit, a download only gets
+    bandwidth if no download with a higher priority is waiting for it.
+    """
+
+    # The share of the bandwidth that low priority downloads always get, no matter how
+    # much bandwidth is reserved, so that they are never starved completely.
+    min_bulk_share = 0.1
+
+    def __init__(self, rate: float = 0, clock: Callable[[], float] = monotonic):
+        """
+        :param rate: the maximum number of bytes per second. 0 means unlimited.
+        :param clock: the function used to get the current time, in seconds.
+        """
+        self._condition = threading.Condition()
+        self._clock = clock
+        self._rate = rate
+        self._reserved = 0.0
+        self._total_bucket = _TokenBucket(rate, clock())
+        self._bulk_bucket = _TokenBucket(self._bulk_rate(), clock())
+        self._waiting: Dict[TaskPriority, int] = {p: 0 for p in TaskPriority}
+
+    @property
+    def rate(self) -> float:
+        return self._rate
+
+    @property
+    def reserved(self) -> float:
+        return self._reserved
+
+    def set_rate(self, rate: float):
+        """
+        Change the maximum number of bytes per second. 0 means unlimited.
+        """
+        with self._condition:
+            self._rate = rate
+            self._update_buckets()
+
+    def reserve(self, bytes_per_second: float):
+        """
+        Reserve bandwidth for something other than low priority downloads. This
+        replaces any previous reservation. Reserve 0 bytes per second to release the
+        reservation.
+
+        Without a limit (the default rate of 0), nothing is throttled, so the
+        reservation has no effect.
+        """
+        with self._condition:
+            self._reserved = max(0.0, bytes_per_second)
+            self._update_buckets()
+
+    def acquire(self, num_bytes: int, priority: TaskPriority = TaskPriority.VISIBLE):
+        """
+        Block until ``num_bytes`` can be downloaded without exceeding the limit.
+        """
+        if not self._rate:
+            return
+
+        with self._condition:
+            self._waiting[priority] += 1
+            try:
+                while self._rate:
+                    now = self._clock()
+                    buckets = self._buckets_for(priority)
+                    for bucket in buckets:
+                        bucket.refill(now)
+
+                    wait_time = max(bucket.wait_time() for bucket in buckets)
+                    if wait_time <= 0 and not self._higher_priority_waiting(priority):
+                        for bucket in buckets:
+                            bucket.tokens -= num_bytes
+                        return
+
+                    # Wake up when the buckets are out of debt or (if a download with a
+                    # higher priority is waiting) when it has taken its share.
+                    self._condition.wait(wait_time if wait_time > 0 else 0.1)
+            finally:
+                self._waiting[priority] -= 1
+                self._condition.notify_all()
+
+    def release(self, num_bytes: int, priority: TaskPriority = TaskPriority.VISIBLE):
+        """
+        Give back bandwidth that was acquired with :class:`acquire` but not used, for
+        example because the download was cancelled or failed before the bytes arrived.
+        """
+        if not self._rate or num_bytes <= 0:
+            return
+
+        with self._condition:
+            for bucket in self._buckets_for(priority):
+                bucket.tokens = min(bucket.burst, bucket.tokens + num_bytes)
+            self._condition.notify_all()
+
+    def _bulk_rate(self) -> float:
+        return max(self._rate - self._reserved, self._rate * self.min_bulk_share)
+
+    def _update_buckets(self):
+        now = self._clock()
+        self._total_bucket.set_rate(self._rate, now)
+        self._bulk_bucket.set_rate(self._bulk_rate(), now)
+        self._condition.notify_all()
+
+    def _buckets_for(self, priority: TaskPriority) -> List[_TokenBucket]:
+        if priority >= TaskPriority.PREFETCH:
+            return [self._total_bucket, self._bulk_bucket]
+        return [self._total_bucket]
+
+    def _higher_priority_waiting(self, priority: TaskPriority) -> bool:
+        return any(self._waiting[p] for p in TaskPriority if p < priority)
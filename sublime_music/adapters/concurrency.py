@@ -0,0 +1,141 @@
+import threading
+from time import monotonic
+from typing import Any, Dict, Optional
+
+
+class AdaptiveConcurrencyLimiter:
+    """
+    Limits the number of requests that are in flight to a server at once, and adapts
+    the limit to what the server can handle using additive increase, multiplicative
+    decrease (AIMD).
+
+    While the limit is being used, it grows by one for every ``limit`` requests that
+    succeed with a healthy latency (no more than ``latency_tolerance`` times the lowest
+    recent latency). Whenever a request times out or the server reports that it is
+    overloaded, the limit is multiplied by ``backoff_ratio``. Failures of requests that
+    were already in flight when the limit was cut don't cut it again, so a burst of
+    failures only backs off once.
+    """
+
+    # How much the lowest recent latency drifts up with each request, so that it
+    # follows the server if it gets slower for good.
+    min_latency_drift = 0.01
+
+    def __init__(
+        self,
+        initial_limit: int = 4,
+        min_limit: int = 1,
+        max_limit: int = 32,
+        latency_tolerance: float = 2.0,
+        backoff_ratio: float = 0.5,
+    ):
+        """
+        :param initial_limit: the number of requests to allow at once to begin with.
+        :param min_limit: the smallest that the limit can get.
+        :param max_limit: the largest that the limit can get.
+        :param latency_tolerance: how many times slower than the lowest recent latency a
+            request can be and still count as healthy.
+        :param backoff_ratio: what to multiply the limit by when the server is
+            overloaded.
+        """
+        self.min_limit = min_limit
+        self.max_limit = max(min_limit, max_limit)
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+
+        self._condition = threading.Condition()
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self._in_flight = 0
+        self._min_latency: Optional[float] = None
+        self._last_backoff = float("-inf")
+        self._last_limit_reached = float("-inf")
+
+        self._max_in_flight = 0
+        self._requests = 0
+        self._overloads = 0
+        self._backoffs = 0
+        self._total_latency = 0.0
+        self._total_wait = 0.0
+
+    @property
+    def limit(self) -> int:
+        return max(self.min_limit, int(self._limit))
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> float:
+        """
+        Block until another request can be made without going over the limit.
+
+        :returns: the time that the request started, which must be passed to
+            :class:`release` once the request is done.
+        """
+        with self._condition:
+            wait_start = monotonic()
+            while self._in_flight >= self.limit:
+                self._condition.wait()
+
+            self._in_flight += 1
+            self._max_in_flight = max(self._max_in_flight, self._in_flight)
+            start_time = monotonic()
+            self._total_wait += start_time - wait_start
+            if self._in_flight >= self.limit:
+                self._last_limit_reached = start_time
+            return start_time
+
+    def release(self, start_time: float, overloaded: bool = False):
+        """
+        Record that a request is done, and adapt the limit.
+
+        :param start_time: the value returned by :class:`acquire` for the request.
+        :param overloaded: whether the request timed out or the server said that it is
+            overloaded.
+        """
+        now = monotonic()
+        latency = now - start_time
+        with self._condition:
+            self._in_flight -= 1
+            self._requests += 1
+            self._total_latency += latency
+
+            if overloaded:
+                self._overloads += 1
+                if start_time >= self._last_backoff:
+                    self._limit = max(self.min_limit, self._limit * self.backoff_ratio)
+                    self._last_backoff = now
+                    self._backoffs += 1
+            else:
+                if self._min_latency is None:
+                    self._min_latency = latency
+                else:
+                    self._min_latency = min(
+                        latency, self._min_latency * (1 + self.min_latency_drift)
+                    )
+
+                # Only grow the limit if it was reached while the request was in flight.
+                # Otherwise, it isn't what is holding requests back.
+                limit_reached = self._last_limit_reached >= start_time
+                if limit_reached and latency <= self._min_latency * self.latency_tolerance:
+                    self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+
+            self._condition.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        :returns: the current limit, the number of requests in flight, and statistics
+            about the requests made so far.
+        """
+        with self._condition:
+            return {
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "max_in_flight": self._max_in_flight,
+                "requests": self._requests,
+                "overloads": self._overloads,
+                "backoffs": self._backoffs,
+                "min_latency": self._min_latency,
+                "mean_latency": self._total_latency / self._requests if self._requests else 0.0,
+                "mean_wait": self._total_wait / self._requests if self._requests else 0.0,
+            }
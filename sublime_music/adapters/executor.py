@@ -0,0 +1,217 @@
+import heapq
+import itertools
+import os
+import threading
+import weakref
+from concurrent.futures import Executor, Future
+from enum import IntEnum
+from typing import Any, Callable, Dict, List, Optional, Set
+
+
+# Like concurrent.futures.ThreadPoolExecutor, the workers are not daemon threads so
+# that a running task (such as a download or a database write) is never killed half
+# way through when the interpreter exits. Instead, every executor is shut down (and its
+# workers joined) before the interpreter waits for non-daemon threads, which would
+# otherwise block forever on the idle workers.
+_executors: "weakref.WeakSet[PriorityThreadPoolExecutor]" = weakref.WeakSet()
+_interpreter_shutdown = False
+
+
+def _python_exit():
+    global _interpreter_shutdown
+    _interpreter_shutdown = True
+    for executor in list(_executors):
+        executor.shutdown(wait=True)
+
+
+threading._register_atexit(_python_exit)  # type: ignore
+
+
+class TaskPriority(IntEnum):
+    """
+    The scheduling class of a task submitted to a :class:`PriorityThreadPoolExecutor`.
+    Tasks with a lower value are always started before tasks with a higher value.
+
+    * :class:`TaskPriority.INTERACTIVE` -- work that the user is actively waiting on,
+      such as the song that was just clicked.
+    * :class:`TaskPriority.VISIBLE` -- data for the UI that is currently on screen.
+    * :class:`TaskPriority.PREFETCH` -- data that will probably be needed soon, such as
+      the next songs in the play queue.
+    * :class:`TaskPriority.BACKGROUND` -- bulk work, such as syncing or downloading
+      everything in a playlist.
+    """
+
+    INTERACTIVE = 0
+    VISIBLE = 1
+    PREFETCH = 2
+    BACKGROUND = 3
+
+
+class _WorkItem:
+    def __init__(
+        self,
+        priority: TaskPriority,
+        sequence: int,
+        future: Future,
+        fn: Callable,
+        args: Any,
+        kwargs: Any,
+    ):
+        self.priority = priority
+        self.sequence = sequence
+        self.future = future
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        # Set to False when the item is re-queued at a higher priority so that the
+        # stale heap entry is skipped.
+        self.queued = True
+
+    def __lt__(self, other: "_WorkItem") -> bool:
+        return (self.priority, self.sequence) < (other.priority, other.sequence)
+
+    def run(self):
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except BaseException as e:
+            self.future.set_exception(e)
+        else:
+            self.future.set_result(result)
+
+
+class PriorityThreadPoolExecutor(Executor):
+    """
+    A thread pool executor which runs queued tasks in order of their
+    :class:`TaskPriority` (and in FIFO order within a priority class) instead of
+    strictly in FIFO order.
+    """
+
+    def __init__(self, max_workers: int | None = None, thread_name_prefix: str = ""):
+        self._max_workers = max_workers or min(32, (os.cpu_count() or 1) + 4)
+        self._thread_name_prefix = thread_name_prefix or f"PriorityThreadPool-{id(self)}"
+        self._condition = threading.Condition()
+        self._queue: List[_WorkItem] = []
+        self._work_items: Dict[Future, _WorkItem] = {}
+        self._queue_depths: Dict[TaskPriority, int] = {p: 0 for p in TaskPriority}
+        self._sequence = itertools.count()
+        self._threads: Set[threading.Thread] = set()
+        self._idle_workers = 0
+        self._shutdown = False
+        _executors.add(self)
+
+    def submit(  # type: ignore
+        self,
+        fn: Callable,
+        /,
+        *args,
+        priority: TaskPriority = TaskPriority.VISIBLE,
+        **kwargs,
+    ) -> Future:
+        with self._condition:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+            if _interpreter_shutdown:
+                raise RuntimeError("cannot schedule new futures after interpreter shutdown")
+
+            future: Future = Future()
+            work_item = _WorkItem(priority, next(self._sequence), future, fn, args, kwargs)
+            self._push(work_item)
+            self._adjust_thread_count()
+            self._condition.notify()
+            return future
+
+    def promote(self, future: Future, priority: TaskPriority) -> bool:
+        """
+        Move a task that is still queued into a higher priority class.
+
+        :param future: the future returned by :class:`submit`.
+        :param priority: the new priority. Does nothing if it is lower than the current
+            priority of the task.
+        :returns: whether or not the task was promoted.
+        """
+        with self._condition:
+            work_item = self._work_items.get(future)
+            if work_item is None or work_item.priority <= priority:
+                return False
+
+            work_item.queued = False
+            self._queue_depths[work_item.priority] -= 1
+            self._push(
+                _WorkItem(
+                    priority,
+                    work_item.sequence,
+                    work_item.future,
+                    work_item.fn,
+                    work_item.args,
+                    work_item.kwargs,
+                )
+            )
+            return True
+
+    def queue_depths(self) -> Dict[TaskPriority, int]:
+        """
+        :returns: the number of tasks waiting to be started in each priority class.
+        """
+        with self._condition:
+            return dict(self._queue_depths)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False):
+        with self._condition:
+            self._shutdown = True
+            if cancel_futures:
+                while self._queue:
+                    if (work_item := heapq.heappop(self._queue)).queued:
+                        work_item.future.cancel()
+                self._work_items.clear()
+                self._queue_depths = {p: 0 for p in TaskPriority}
+            self._condition.notify_all()
+            threads = list(self._threads)
+
+        if wait:
+            for thread in threads:
+                if thread is not threading.current_thread():
+                    thread.join()
+
+    def _push(self, work_item: _WorkItem):
+        heapq.heappush(self._queue, work_item)
+        self._work_items[work_item.future] = work_item
+        self._queue_depths[work_item.priority] += 1
+
+    def _pop(self) -> Optional[_WorkItem]:
+        while self._queue:
+            work_item = heapq.heappop(self._queue)
+            if work_item.queued:
+                del self._work_items[work_item.future]
+                self._queue_depths[work_item.priority] -= 1
+                return work_item
+        return None
+
+    def _adjust_thread_count(self):
+        if len(self._queue) <= self._idle_workers or len(self._threads) >= self._max_workers:
+            return
+
+        thread = threading.Thread(
+            name=f"{self._thread_name_prefix}_{len(self._threads)}",
+            target=self._worker,
+        )
+        self._threads.add(thread)
+        thread.start()
+
+    def _worker(self):
+        while True:
+            with self._condition:
+                self._idle_workers += 1
+                while not (work_item := self._pop()):
+                    if self._shutdown:
+                        self._idle_workers -= 1
+                        self._threads.discard(threading.current_thread())
+                        return
+                    self._condition.wait()
+                self._idle_workers -= 1
+
+            work_item.run()
+            # Don't keep a reference to the work item (and its arguments) while waiting
+            # for the next one.
+            del work_item
@@ -1,10 +1,27 @@
+import bisect
 import hashlib
 import logging
+import operator
+import os
 import shutil
 import threading
-from datetime import datetime
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from functools import reduce
 from pathlib import Path
-from typing import Any, Dict, Iterable, Optional, Sequence, Set, Tuple, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    cast,
+)
 
 import peewee
 from gi.repository import Gtk
@@ -19,13 +36,19 @@ from .. import (
     ConfigParamDescriptor,
     ConfigurationStore,
     ConfigureServerForm,
+    LibraryChanges,
     SongCacheStatus,
     UIInfo,
 )
 from . import models
+from .bulk_ingest import BulkIngest
 
 KEYS = CachingAdapter.CachedDataKey
 
+# Older versions of SQLite only allow 999 parameters to be bound in a single query. Each
+# ID in a song lookup is bound twice.
+SONG_LOOKUP_CHUNK_SIZE = 400
+
 
 class FilesystemAdapter(CachingAdapter):
     """
@@ -76,10 +99,28 @@ class FilesystemAdapter(CachingAdapter):
         models.database.init(database_filename)
         models.database.connect()
 
-        with self.db_write_lock, models.database.atomic():
+        with self._write_transaction():
             models.database.create_tables(models.ALL_TABLES)
             self._migrate_db()
 
+        self.has_search_indexes = False
+        try:
+            with self._write_transaction():
+                self._create_search_indexes()
+            self.has_search_indexes = True
+        except peewee.OperationalError:
+            logging.exception("Failed to create the search indexes. Search will be slower.")
+
+    @contextmanager
+    def _write_transaction(self) -> Iterator[None]:
+        """
+        Writes to the database are serialized by :class:`db_write_lock`. The transaction
+        takes the database's write lock up front (``BEGIN IMMEDIATE``) so that it never
+        has to upgrade from a read lock part way through.
+        """
+        with self.db_write_lock, models.database.atomic("IMMEDIATE"):
+            yield
+
     def initial_sync(self):
         # TODO (#188) this is where scanning the fs should potentially happen?
         pass
@@ -92,6 +133,37 @@ class FilesystemAdapter(CachingAdapter):
     def _migrate_db(self):
         pass
 
+    def _create_search_indexes(self):
+        for index, field in models.SEARCH_INDEXES:
+            # Index the data that was cached before the index existed.
+            rebuild = not index.table_exists()
+            index.create_table()
+
+            table, index_table, column = (
+                field.model._meta.table_name,
+                index._meta.table_name,
+                field.column_name,
+            )
+            insert = (
+                f"INSERT INTO {index_table}(rowid, {column}) VALUES (new.rowid, new.{column});"
+            )
+            delete = (
+                f"INSERT INTO {index_table}({index_table}, rowid, {column}) "
+                f"VALUES ('delete', old.rowid, old.{column});"
+            )
+            for name, event, body in (
+                ("insert", "INSERT", insert),
+                ("update", f"UPDATE OF {column}", delete + insert),
+                ("delete", "DELETE", delete),
+            ):
+                models.database.execute_sql(
+                    f"CREATE TRIGGER IF NOT EXISTS {index_table}_after_{name} "
+                    f"AFTER {event} ON {table} BEGIN {body} END"
+                )
+
+            if rebuild:
+                index.rebuild()
+
     # Usage and Availability Properties
     # ==================================================================================
     can_be_cached = False  # Can't be cached (there's no need).
@@ -142,6 +214,18 @@ class FilesystemAdapter(CachingAdapter):
     def can_set_song_rating(self) -> bool:
         return self._can_get_key(KEYS.SONG_RATING)
 
+    cache_ttls = {
+        KEYS.ALBUM: timedelta(weeks=1),
+        KEYS.ALBUMS: timedelta(days=1),
+        KEYS.ARTIST: timedelta(days=1),
+        KEYS.ARTISTS: timedelta(days=1),
+        KEYS.DIRECTORY: timedelta(days=1),
+        KEYS.GENRES: timedelta(days=1),
+        KEYS.IGNORED_ARTICLES: timedelta(weeks=1),
+        KEYS.PLAYLIST_DETAILS: timedelta(minutes=5),
+        KEYS.PLAYLISTS: timedelta(minutes=5),
+    }
+
     supported_schemes = ("file",)
     supported_artist_query_types = {
         AlbumSearchQuery.Type.RANDOM,
@@ -157,6 +241,21 @@ class FilesystemAdapter(CachingAdapter):
 
     # Data Helper Methods
     # ==================================================================================
+    def _unexpired_clauses(self, cache_key: CachingAdapter.CachedDataKey) -> Tuple[Any, ...]:
+        """
+        :returns: the where clauses that filter out the CacheInfo rows for the given
+            cache key which have expired.
+        """
+        if (ttl := self.cache_ttls.get(cache_key)) is None:
+            return ()
+        return (models.CacheInfo.last_ingestion_time >= datetime.now() - ttl,)
+
+    def _is_expired(self, cache_info: models.CacheInfo) -> bool:
+        cache_key = cast(KEYS, cache_info.cache_key)
+        if (ttl := self.cache_ttls.get(cache_key)) is None:
+            return False
+        return cache_info.last_ingestion_time < datetime.now() - ttl
+
     def _get_list(
         self,
         model: Any,
@@ -178,6 +277,7 @@ class FilesystemAdapter(CachingAdapter):
             if not models.CacheInfo.get_or_none(
                 models.CacheInfo.valid == True,  # noqa: 712
                 models.CacheInfo.cache_key == cache_key,
+                *self._unexpired_clauses(cache_key),
             ):
                 raise CacheMissError(partial_data=result)
         return result
@@ -193,12 +293,13 @@ class FilesystemAdapter(CachingAdapter):
                 raise Exception(f"{model} with id={id} does not exist")
             return obj
 
-        # If we haven't ingested data for this item before, or it's been invalidated,
-        # raise a CacheMissError with the partial data.
+        # If we haven't ingested data for this item before, or it's been invalidated or
+        # has expired, raise a CacheMissError with the partial data.
         cache_info = models.CacheInfo.get_or_none(
             models.CacheInfo.cache_key == cache_key,
             models.CacheInfo.parameter == id,
             models.CacheInfo.valid == True,  # noqa: 712
+            *self._unexpired_clauses(cache_key),
         )
         if not cache_info:
             raise CacheMissError(partial_data=obj)
@@ -255,9 +356,12 @@ class FilesystemAdapter(CachingAdapter):
         return cached_statuses
 
     _playlists = None
+    _playlists_expiration: Optional[datetime] = None
 
     def get_playlists(self, ignore_cache_miss: bool = False) -> Sequence[API.Playlist]:
-        if self._playlists is not None:
+        if self._playlists is not None and (
+            self._playlists_expiration is None or datetime.now() < self._playlists_expiration
+        ):
             return self._playlists
 
         self._playlists = self._get_list(
@@ -266,6 +370,8 @@ class FilesystemAdapter(CachingAdapter):
             ignore_cache_miss=ignore_cache_miss,
             order_by=fn.LOWER(models.Playlist.name),
         )
+        if self.is_cache:
+            self._playlists_expiration = self.get_expiration_time(KEYS.PLAYLISTS, None)
         return self._playlists
 
     def get_playlist_details(self, playlist_id: str) -> API.Playlist:
@@ -316,6 +422,45 @@ class FilesystemAdapter(CachingAdapter):
             CachingAdapter.CachedDataKey.SONG,
         )
 
+    def get_songs_details(self, song_ids: Sequence[str]) -> Dict[str, API.Song]:
+        songs: Dict[str, API.Song] = {}
+        song_artist = models.Artist.alias()
+
+        for i in range(0, len(song_ids), SONG_LOOKUP_CHUNK_SIZE):
+            chunk = song_ids[i : i + SONG_LOOKUP_CHUNK_SIZE]
+
+            # Load the album and artist along with each song so that accessing them
+            # doesn't cause another query per song.
+            query = (
+                models.Song.select(models.Song, models.Album, song_artist)
+                .join(models.Album, peewee.JOIN.LEFT_OUTER, on=models.Song.album)
+                .switch(models.Song)
+                .join(
+                    song_artist,
+                    peewee.JOIN.LEFT_OUTER,
+                    on=(models.Song.artist == song_artist.id),
+                    attr="artist",
+                )
+                .where(models.Song.id.in_(chunk))
+            )
+
+            # Only return songs that have valid data in the cache.
+            if self.is_cache:
+                query = query.where(
+                    models.Song.id.in_(
+                        models.CacheInfo.select(models.CacheInfo.parameter).where(
+                            models.CacheInfo.cache_key == KEYS.SONG,
+                            models.CacheInfo.parameter.in_(chunk),
+                            models.CacheInfo.valid == True,  # noqa: 712
+                            *self._unexpired_clauses(KEYS.SONG),
+                        )
+                    )
+                )
+
+            songs.update({song.id: song for song in query})
+
+        return songs
+
     def get_artists(self, ignore_cache_miss: bool = False) -> Sequence[API.Artist]:
         return self._get_list(
             models.Artist,
@@ -332,22 +477,23 @@ class FilesystemAdapter(CachingAdapter):
     def get_albums(
         self,
         query: AlbumSearchQuery,
-        sort_direction: str = "ascending"
+        sort_direction: str = "ascending",
         # TODO (#208) deal with sort dir here?
+        on_page: Optional[Callable[[Sequence[API.Album]], None]] = None,
     ) -> Sequence[API.Album]:
         strhash = query.strhash()
         query_result = models.AlbumQueryResult.get_or_none(
             models.AlbumQueryResult.query_hash == strhash
         )
-        # If we've cached the query result, then just return it. If it's stale, then
-        # return the old value as a cache miss error.
+        # If we've cached the query result, then just return it. If it's stale or has
+        # expired, then return the old value as a cache miss error.
         if query_result and (
             cache_info := models.CacheInfo.get_or_none(
                 models.CacheInfo.cache_key == CachingAdapter.CachedDataKey.ALBUMS,
                 models.CacheInfo.parameter == strhash,
             )
         ):
-            if cache_info.valid:
+            if cache_info.valid and not self._is_expired(cache_info):
                 return query_result.albums
             else:
                 raise CacheMissError(partial_data=query_result.albums)
@@ -411,8 +557,102 @@ class FilesystemAdapter(CachingAdapter):
     def get_genres(self) -> Sequence[API.Genre]:
         return self._get_list(models.Genre, CachingAdapter.CachedDataKey.GENRES)
 
+    # The maximum number of candidates of each type that are retrieved from the search
+    # indexes. Only these are scored by the fuzzy matching in SearchResult.
+    search_candidates = 200
+
+    def _search_index(
+        self,
+        index: Any,
+        field: Any,
+        query: str,
+        where_clauses: Tuple[Any, ...] = (),
+    ) -> peewee.Query:
+        """
+        Find the objects whose ``field`` best matches the query using the full-text
+        search index over that field.
+
+        :returns: a query for at most :class:`search_candidates` objects.
+        """
+        query = query.lower()
+        if len(query) <= 3:
+            # A query this short has at most one trigram, but it is still similar to
+            # anything that shares two consecutive characters with it. The index can't
+            # find those, so scan for them (preferring the exact matches).
+            pieces = {query[i : i + 2] for i in range(len(query) - 1)} or {query}
+            return (
+                field.model.select()
+                .where(reduce(operator.or_, (field.contains(p) for p in pieces)), *where_clauses)
+                .order_by(field.contains(query).desc())
+                .limit(self.search_candidates)
+            )
+
+        # Match anything with any of the query's trigrams so that the matching is as
+        # fuzzy as the scoring in SearchResult. The best matches have the most (and the
+        # rarest) trigrams in common with the query.
+        trigrams = sorted({query[i : i + 3] for i in range(len(query) - 2)})
+        match = " OR ".join('"{}"'.format(t.replace('"', '""')) for t in trigrams)
+        matches = (
+            index.select(index.rowid)
+            .where(index.match(match))
+            .order_by(index.rank())
+            .limit(self.search_candidates)
+        )
+        return field.model.select().where(peewee.SQL("rowid").in_(matches), *where_clauses)
+
     def search(self, query: str) -> API.SearchResult:
         search_result = API.SearchResult(query)
+        if self.has_search_indexes:
+            search_result.add_results(
+                "artists",
+                self._search_index(
+                    models.ArtistSearchIndex,
+                    models.Artist.name,
+                    query,
+                    where_clauses=(~(models.Artist.id.startswith("invalid:")),),
+                ),
+            )
+
+            # Albums and songs also match by the name of their artist, so the albums and
+            # songs of the best matching artists are candidates as well.
+            artist_ids = [a.id for a in search_result.artists]
+            album_clauses = (
+                ~(models.Album.id.startswith("invalid:")),
+                models.Album.artist.is_null(False),
+            )
+            search_result.add_results(
+                "albums",
+                self._search_index(
+                    models.AlbumSearchIndex, models.Album.name, query, where_clauses=album_clauses
+                ),
+            )
+            search_result.add_results(
+                "albums",
+                models.Album.select()
+                .where(models.Album.artist.in_(artist_ids), *album_clauses)
+                .limit(self.search_candidates),
+            )
+            search_result.add_results(
+                "songs",
+                self._search_index(
+                    models.SongSearchIndex,
+                    models.Song.title,
+                    query,
+                    where_clauses=(models.Song.artist.is_null(False),),
+                ),
+            )
+            search_result.add_results(
+                "songs",
+                models.Song.select()
+                .where(models.Song.artist.in_(artist_ids))
+                .limit(self.search_candidates),
+            )
+            search_result.add_results(
+                "playlists",
+                self._search_index(models.PlaylistSearchIndex, models.Playlist.name, query),
+            )
+            return search_result
+
         search_result.add_results("albums", self.get_all_albums())
         search_result.add_results("artists", self.get_artists(ignore_cache_miss=True))
         search_result.add_results(
@@ -432,6 +672,19 @@ class FilesystemAdapter(CachingAdapter):
 
     # Data Ingestion Methods
     # ==================================================================================
+    def get_expiration_time(
+        self, data_key: CachingAdapter.CachedDataKey, param: Optional[str]
+    ) -> Optional[datetime]:
+        if (ttl := self.cache_ttls.get(data_key)) is None:
+            return None
+
+        cache_info = models.CacheInfo.get_or_none(
+            models.CacheInfo.cache_key == data_key,
+            models.CacheInfo.parameter == param,
+            models.CacheInfo.valid == True,  # noqa: 712
+        )
+        return cache_info.last_ingestion_time + ttl if cache_info else None
+
     def _strhash(self, string: str) -> str:
         return hashlib.sha1(bytes(string, "utf8")).hexdigest()
 
@@ -445,15 +698,89 @@ class FilesystemAdapter(CachingAdapter):
 
         # Wrap the actual ingestion function in a database lock, and an atomic
         # transaction.
-        with self.db_write_lock, models.database.atomic():
-            self._do_ingest_new_data(data_key, param, data)
+        with self._write_transaction():
+            bulk_ingest = BulkIngest()
+            if bulk_ingest.add(data_key, param, data):
+                bulk_ingest.execute()
+            else:
+                self._do_ingest_new_data(data_key, param, data)
+
+    def ingest_new_data_batch(
+        self, items: Iterable[Tuple[CachingAdapter.CachedDataKey, Optional[str], Any]]
+    ):
+        assert self.is_cache, "FilesystemAdapter is not in cache mode!"
+
+        # Ingest everything in a single transaction rather than one per item. Runs of
+        # items that can be ingested in bulk are written together.
+        with self._write_transaction():
+            bulk_ingest = BulkIngest()
+            for data_key, param, data in items:
+                if not bulk_ingest.add(data_key, param, data):
+                    bulk_ingest.execute()
+                    self._do_ingest_new_data(data_key, param, data)
+            bulk_ingest.execute()
+
+    def ingest_new_data_page(
+        self,
+        data_key: CachingAdapter.CachedDataKey,
+        param: Optional[str],
+        data: Sequence[Any],
+        offset: int,
+        is_last_page: bool,
+    ) -> bool:
+        assert self.is_cache, "FilesystemAdapter is not in cache mode!"
+        if data_key != KEYS.ALBUMS:
+            return False
+
+        with self._write_transaction():
+            albums = [self._do_ingest_new_data(KEYS.ALBUM, a.id, a, partial=True) for a in data]
+            album_query_result, _ = models.AlbumQueryResult.get_or_create(
+                query_hash=param, defaults={"query_hash": param}
+            )
+            album_query_result.albums.add(
+                albums, clear_existing=(offset == 0), start_position=offset
+            )
+
+            # The query result is only valid once all of the pages have been ingested.
+            now = datetime.now()
+            cache_info, created = models.CacheInfo.get_or_create(
+                cache_key=data_key,
+                parameter=param,
+                defaults={
+                    "cache_key": data_key,
+                    "parameter": param,
+                    "last_ingestion_time": now,
+                    "valid": is_last_page,
+                },
+            )
+            if not created:
+                cache_info.valid = is_last_page
+                cache_info.last_ingestion_time = now
+                cache_info.save()
+
+        return True
+
+    def get_library_watermark(self) -> Optional[str]:
+        if library_sync := models.LibrarySync.get_or_none(id=0):
+            return library_sync.watermark
+        return None
+
+    def get_cached_params(self, data_key: CachingAdapter.CachedDataKey) -> Optional[Set[str]]:
+        return {
+            cache_info.parameter
+            for cache_info in models.CacheInfo.select(models.CacheInfo.parameter).where(
+                models.CacheInfo.cache_key == data_key,
+                models.CacheInfo.valid == True,  # noqa: 712
+                *self._unexpired_clauses(data_key),
+            )
+        }
 
     def invalidate_data(self, key: CachingAdapter.CachedDataKey, param: Optional[str]):
         assert self.is_cache, "FilesystemAdapter is not in cache mode!"
 
         # Wrap the actual ingestion function in a database lock, and an atomic
         # transaction.
-        with self.db_write_lock, models.database.atomic():
+        with self._write_transaction():
             self._do_invalidate_data(key, param)
 
     def delete_data(self, key: CachingAdapter.CachedDataKey, param: Optional[str]):
@@ -461,7 +788,7 @@ class FilesystemAdapter(CachingAdapter):
 
         # Wrap the actual ingestion function in a database lock, and an atomic
         # transaction.
-        with self.db_write_lock, models.database.atomic():
+        with self._write_transaction():
             self._do_delete_data(key, param)
 
     def _do_ingest_new_data(
@@ -472,8 +799,8 @@ class FilesystemAdapter(CachingAdapter):
         partial: bool = False,
     ) -> Any:
         # TODO (#201): this entire function is not exactly efficient due to the nested
-        # dependencies and everything. I'm not sure how to improve it, and I'm not sure
-        # if it needs improving at this point.
+        # dependencies and everything. The keys that carry large amounts of data are
+        # ingested with BulkIngest instead (see ingest_new_data).
         logging.debug(f"_do_ingest_new_data param={param} data_key={data_key} data={data}")
 
         def getattrs(obj: Any, keys: Iterable[str]) -> Dict[str, Any]:
@@ -697,6 +1024,30 @@ class FilesystemAdapter(CachingAdapter):
             ).on_conflict_replace().execute()
             models.IgnoredArticle.delete().where(models.IgnoredArticle.name.not_in(data)).execute()
 
+        elif data_key == KEYS.LIBRARY_SYNC:
+            changes = cast(LibraryChanges, data)
+            if changes.changed:
+                if changes.root_directory:
+                    self._do_ingest_new_data(KEYS.DIRECTORY, "root", changes.root_directory)
+                else:
+                    self._do_invalidate_data(KEYS.DIRECTORY, "root")
+
+                if changes.new_albums and changes.new_albums_complete:
+                    self._merge_new_albums(changes.new_albums)
+                else:
+                    # Something other than new albums changed (or not all of the new
+                    # albums are known), so the lists of artists, albums, and genres may
+                    # all be out of date.
+                    models.CacheInfo.update({"valid": False}).where(
+                        models.CacheInfo.cache_key.in_([KEYS.ALBUMS, KEYS.ARTISTS, KEYS.GENRES])
+                    ).execute()
+                    for album in changes.new_albums:
+                        self._do_ingest_new_data(KEYS.ALBUM, album.id, album, partial=True)
+
+            models.LibrarySync.replace(
+                id=0, watermark=changes.watermark, last_sync_time=now
+            ).execute()
+
         elif data_key == KEYS.PLAYLIST_DETAILS:
             api_playlist = cast(API.Playlist, data)
             playlist_data: Dict[str, Any] = {
@@ -823,7 +1174,12 @@ class FilesystemAdapter(CachingAdapter):
 
         # Special handling for Song
         if data_key == KEYS.SONG_FILE and data:
-            path, buffer_filename, size = data
+            # The data is either (path, buffer_filename, size) or (path,
+            # buffer_filename, size, file_hash). If the hash of the buffer file is
+            # given, the buffer file belongs to the cache and is moved into place
+            # instead of being hashed and copied.
+            path, buffer_filename, size, *rest = data
+            file_hash = rest[0] if rest else None
 
             if path:
                 cache_info.path = path
@@ -832,13 +1188,20 @@ class FilesystemAdapter(CachingAdapter):
                 cache_info.size = size
 
             if buffer_filename:
-                cache_info.file_hash = compute_file_hash(buffer_filename)
+                cache_info.file_hash = file_hash or compute_file_hash(buffer_filename)
 
-                # Copy the actual song file from the download buffer dir to the cache
-                # dir.
+                # Move or copy the actual song file from the download buffer dir to the
+                # cache dir.
                 filename = self._compute_song_filename(cache_info)
                 filename.parent.mkdir(parents=True, exist_ok=True)
-                shutil.copy(str(buffer_filename), str(filename))
+                if file_hash:
+                    try:
+                        os.replace(buffer_filename, filename)
+                    except OSError:
+                        # The buffer file is on a different filesystem.
+                        shutil.move(str(buffer_filename), str(filename))
+                else:
+                    shutil.copy(str(buffer_filename), str(filename))
 
         elif data_key == KEYS.SONG_RATING:
             song = models.Song.get_by_id(param)
@@ -848,6 +1211,109 @@ class FilesystemAdapter(CachingAdapter):
         cache_info.save()
         return return_val if return_val is not None else cache_info
 
+    def _merge_new_albums(self, new_albums: Sequence[API.Album]):
+        """
+        Add the albums that were added to the library to the cached album lists that
+        they belong in, so that the lists stay valid. Ingesting the albums also adds
+        their artists and genres to the cached artist and genre lists.
+
+        The queries of the cached random and year range lists can't be recovered from
+        their hashes, so those lists are invalidated instead.
+        """
+        Type = AlbumSearchQuery.Type
+        new_album_ids = [a.id for a in new_albums if a.id]
+        existing_album_ids = {
+            a.id
+            for a in models.Album.select(models.Album.id).where(models.Album.id.in_(new_album_ids))
+        }
+        for album in new_albums:
+            self._do_ingest_new_data(KEYS.ALBUM, album.id, album, partial=True)
+
+        # Keep the album counts of the artists in the cached artist list up to date.
+        for artist_id, count in Counter(
+            a.artist.id for a in new_albums if a.artist and a.id not in existing_album_ids
+        ).items():
+            models.Artist.update(album_count=models.Artist.album_count + count).where(
+                models.Artist.id == artist_id
+            ).execute()
+
+        # The names and artist names of all of the albums, to find where the new albums
+        # go in the alphabetical lists. These are only loaded if they are needed.
+        sort_names: Dict[str, Tuple[str, str]] = {}
+
+        def name_sort_key(album_id: str) -> Tuple[str, ...]:
+            if not sort_names:
+                sort_names.update(
+                    (album_id, ((name or "").lower(), (artist_name or "").lower()))
+                    for album_id, name, artist_name in models.Album.select(
+                        models.Album.id, models.Album.name, models.Artist.name
+                    )
+                    .join(models.Artist, peewee.JOIN.LEFT_OUTER)
+                    .tuples()
+                )
+            return sort_names.get(album_id, ("", ""))
+
+        def artist_sort_key(album_id: str) -> Tuple[str, ...]:
+            return tuple(reversed(name_sort_key(album_id)))
+
+        # The lists are ordered the same way as the corresponding queries in get_albums.
+        # The new albums are newest first.
+        merges: Dict[str, Tuple[Sequence[str], Optional[Callable[[str], Tuple[str, ...]]]]] = {
+            AlbumSearchQuery(Type.NEWEST).strhash(): (new_album_ids, None),
+            AlbumSearchQuery(Type.ALPHABETICAL_BY_NAME).strhash(): (new_album_ids, name_sort_key),
+            AlbumSearchQuery(Type.ALPHABETICAL_BY_ARTIST).strhash(): (
+                new_album_ids,
+                artist_sort_key,
+            ),
+        }
+        for genre in {a.genre.name: a.genre for a in new_albums if a.genre}.values():
+            merges[AlbumSearchQuery(Type.GENRE, genre=genre).strhash()] = (
+                [a.id for a in new_albums if a.id and a.genre and a.genre.name == genre.name],
+                name_sort_key,
+            )
+
+        for query_hash, (album_ids, sort_key) in merges.items():
+            if not (
+                query_result := models.AlbumQueryResult.get_or_none(
+                    models.AlbumQueryResult.query_hash == query_hash
+                )
+            ):
+                continue
+
+            list_album_ids = [a.id for a in query_result.albums]
+            already_listed = set(list_album_ids)
+            album_ids = [i for i in album_ids if i not in already_listed]
+            if not album_ids:
+                continue
+
+            if sort_key is None:
+                list_album_ids = album_ids + list_album_ids
+            else:
+                keys = [sort_key(i) for i in list_album_ids]
+                for album_id in album_ids:
+                    position = bisect.bisect_right(keys, key := sort_key(album_id))
+                    keys.insert(position, key)
+                    list_album_ids.insert(position, album_id)
+            query_result.albums = list_album_ids
+
+        # New albums don't change the lists of the most played, recently played, and
+        # starred albums, or of the other genres.
+        unaffected_queries = [
+            AlbumSearchQuery(Type.FREQUENT),
+            AlbumSearchQuery(Type.RECENT),
+            AlbumSearchQuery(Type.STARRED),
+            *(
+                AlbumSearchQuery(Type.GENRE, genre=AlbumSearchQuery._Genre(g.name))
+                for g in models.Genre.select(models.Genre.name)
+            ),
+        ]
+        models.CacheInfo.update({"valid": False}).where(
+            models.CacheInfo.cache_key == KEYS.ALBUMS,
+            models.CacheInfo.parameter.not_in(
+                [*merges, *(q.strhash() for q in unaffected_queries)]
+            ),
+        ).execute()
+
     def _do_invalidate_data(
         self,
         data_key: CachingAdapter.CachedDataKey,
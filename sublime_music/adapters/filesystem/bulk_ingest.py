@@ -0,0 +1,444 @@
+import hashlib
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, cast
+
+from peewee import EXCLUDED, Field, chunked, fn
+
+from .. import CachingAdapter, api_objects as API
+from . import models
+
+KEYS = CachingAdapter.CachedDataKey
+
+# A reference to a CacheInfo row that may not have been written yet. These are resolved
+# to CacheInfo IDs once all of the CacheInfo rows have been written.
+CacheInfoRef = Tuple[CachingAdapter.CachedDataKey, Optional[str]]
+
+
+class BulkIngest:
+    """
+    Ingests API objects into the cache database in bulk. The objects (and everything
+    that they reference) are flattened into rows for each table, and then each table is
+    written with as few ``INSERT ... ON CONFLICT`` statements as possible instead of a
+    ``get_or_create`` and ``save`` for every row.
+
+    The result is the same as ingesting each object with
+    :class:`FilesystemAdapter._do_ingest_new_data`: existing rows are only updated with
+    the values that are not ``None``, and the ``CacheInfo`` for each object is marked
+    valid unless all of the data for the object was partial.
+    """
+
+    # The keys that can be ingested in bulk.
+    keys = {
+        KEYS.ALBUM,
+        KEYS.ALBUMS,
+        KEYS.ARTISTS,
+        KEYS.DIRECTORY,
+        KEYS.PLAYLIST_DETAILS,
+        KEYS.SEARCH_RESULTS,
+        KEYS.SONG,
+    }
+
+    # The maximum number of rows to write with a single statement, to stay under
+    # SQLite's limit on the number of variables in a statement.
+    chunk_size = 100
+
+    def __init__(self):
+        self._reset()
+
+    def _reset(self):
+        self.now = datetime.now()
+        self._cache_infos: Dict[CacheInfoRef, Dict[str, Any]] = {}
+        self._rows: Dict[Any, Dict[Any, Dict[str, Any]]] = {
+            models.Genre: {},
+            models.Artist: {},
+            models.Album: {},
+            models.Song: {},
+            models.Directory: {},
+            models.Playlist: {},
+        }
+        self._album_query_results: Dict[str, List[str]] = {}
+        self._playlist_songs: Dict[str, List[str]] = {}
+        self._similar_artists: Dict[str, List[Optional[str]]] = {}
+        self._artists_lists: List[Set[str]] = []
+
+    def add(self, data_key: CachingAdapter.CachedDataKey, param: Optional[str], data: Any) -> bool:
+        """
+        Add the data to be ingested.
+
+        :returns: whether or not the data can be ingested in bulk. If it can't, nothing
+            is added.
+        """
+        if data_key not in BulkIngest.keys:
+            return False
+
+        self._add_cache_info(data_key, param)
+        if data_key == KEYS.ALBUM:
+            self._add_album(cast(API.Album, data), param=param)
+
+        elif data_key == KEYS.ALBUMS:
+            self._album_query_results[cast(str, param)] = [
+                self._add_album(a, partial=True) for a in data
+            ]
+
+        elif data_key == KEYS.ARTISTS:
+            self._artists_lists.append({self._add_artist(a, partial=True) for a in data})
+
+        elif data_key == KEYS.DIRECTORY:
+            self._add_directory(cast(API.Directory, data), param=param)
+
+        elif data_key == KEYS.PLAYLIST_DETAILS:
+            self._add_playlist(cast(API.Playlist, data), param=param)
+
+        elif data_key == KEYS.SEARCH_RESULTS:
+            search_result = cast(API.SearchResult, data)
+            for artist in search_result._artists.values():
+                self._add_artist(artist, partial=True)
+            for album in search_result._albums.values():
+                self._add_album(album, partial=True)
+            for song in search_result._songs.values():
+                self._add_song(song, partial=True)
+            for playlist in search_result._playlists.values():
+                self._add_playlist(playlist, partial=True)
+
+        elif data_key == KEYS.SONG:
+            self._add_song(cast(API.Song, data), param=param)
+
+        return True
+
+    def execute(self):
+        """
+        Write all of the data that has been added to the database, and reset. This
+        should be called in a transaction.
+        """
+        cache_info_ids = self._write_cache_infos()
+
+        for model, rows in self._rows.items():
+            for row in rows.values():
+                for name, value in row.items():
+                    if isinstance(value, tuple):  # a CacheInfoRef
+                        row[name] = cache_info_ids.get(cast(CacheInfoRef, value))
+            self._upsert(model, rows.values())
+
+        for artist_id, similar_artist_ids in self._similar_artists.items():
+            models.SimilarArtist.delete().where(models.SimilarArtist.artist == artist_id).execute()
+            self._insert(
+                models.SimilarArtist,
+                [
+                    {"artist": artist_id, "similar_artist": similar_artist_id, "order": i}
+                    for i, similar_artist_id in enumerate(similar_artist_ids)
+                ],
+                replace=True,
+            )
+
+        # The artists that are no longer in the list of artists are deleted.
+        for artist_ids in self._artists_lists:
+            models.Artist.delete().where(
+                models.Artist.id.not_in(list(artist_ids)) & ~models.Artist.id.startswith("invalid")
+            ).execute()
+
+        if self._album_query_results:
+            models.AlbumQueryResult.insert_many(
+                [{"query_hash": query_hash} for query_hash in self._album_query_results]
+            ).on_conflict_ignore().execute()
+        self._set_sorted_relation(models.AlbumQueryResult.albums, self._album_query_results)
+        self._set_sorted_relation(models.Playlist._songs, self._playlist_songs)
+
+        self._reset()
+
+    # Flattening
+    # ==================================================================================
+    def _add_cache_info(
+        self,
+        data_key: CachingAdapter.CachedDataKey,
+        param: Optional[str],
+        partial: bool = False,
+        **values: Any,
+    ) -> CacheInfoRef:
+        cache_info = self._cache_infos.setdefault((data_key, param), {"valid": False})
+        cache_info["valid"] = cache_info["valid"] or not partial
+        self._merge(cache_info, values)
+        return (data_key, param)
+
+    def _add_row(self, model: Any, values: Dict[str, Any]) -> Any:
+        primary_key = values[model._meta.primary_key.name]
+        self._merge(self._rows[model].setdefault(primary_key, {}), values)
+        return primary_key
+
+    @staticmethod
+    def _merge(row: Dict[str, Any], values: Dict[str, Any]):
+        # Like updating the row with a save, only the values that are set overwrite.
+        row.update((k, v) for k, v in values.items() if v is not None or k not in row)
+
+    @staticmethod
+    def _invalid_id(name: str) -> str:
+        return f"invalid:{hashlib.sha1(bytes(name, 'utf8')).hexdigest()}"
+
+    @staticmethod
+    def _getattrs(obj: Any, keys: Iterable[str]) -> Dict[str, Any]:
+        return {k: getattr(obj, k) for k in keys}
+
+    def _add_cover_art(self, cover_art: Optional[str]) -> Optional[CacheInfoRef]:
+        if not cover_art:
+            return None
+        return self._add_cache_info(KEYS.COVER_ART_FILE, cover_art, file_id=cover_art)
+
+    def _add_genre(self, genre: Optional[API.Genre]) -> Optional[str]:
+        if not genre:
+            return None
+        self._add_cache_info(KEYS.GENRE, None)
+        return self._add_row(
+            models.Genre, self._getattrs(genre, ["name", "song_count", "album_count"])
+        )
+
+    def _add_artist(self, artist: API.Artist, partial: bool = False) -> str:
+        self._add_cache_info(KEYS.ARTIST, artist.id, partial)
+        artist_id = artist.id or self._invalid_id(artist.name)
+        for album in artist.albums or []:
+            self._add_album(album, partial=True)
+        if artist.similar_artists:
+            self._similar_artists[artist_id] = [a.id for a in artist.similar_artists]
+
+        return self._add_row(
+            models.Artist,
+            {
+                "id": artist_id,
+                **self._getattrs(
+                    artist,
+                    [
+                        "name",
+                        "album_count",
+                        "starred",
+                        "biography",
+                        "music_brainz_id",
+                        "last_fm_url",
+                    ],
+                ),
+                "_artist_image_url": self._add_cover_art(artist.artist_image_url),
+            },
+        )
+
+    def _add_album(
+        self, album: API.Album, partial: bool = False, param: Optional[str] = None
+    ) -> str:
+        self._add_cache_info(KEYS.ALBUM, param or album.id, partial)
+        if not partial:
+            for song in album.songs or []:
+                self._add_song(song)
+
+        return self._add_row(
+            models.Album,
+            {
+                "id": album.id or self._invalid_id(album.name),
+                **self._getattrs(
+                    album,
+                    [
+                        "name",
+                        "created",
+                        "duration",
+                        "play_count",
+                        "song_count",
+                        "starred",
+                        "year",
+                    ],
+                ),
+                "genre": self._add_genre(album.genre),
+                "artist": self._add_artist(ar, partial=True) if (ar := album.artist) else None,
+                "_cover_art": self._add_cover_art(album.cover_art),
+            },
+        )
+
+    def _add_song(self, song: API.Song, partial: bool = False, param: Optional[str] = None) -> str:
+        self._add_cache_info(KEYS.SONG, param or song.id, partial)
+        return self._add_row(
+            models.Song,
+            {
+                **self._getattrs(
+                    song,
+                    [
+                        "id",
+                        "title",
+                        "track",
+                        "year",
+                        "duration",
+                        "parent_id",
+                        "disc_number",
+                        "user_rating",
+                    ],
+                ),
+                "genre": self._add_genre(song.genre),
+                "artist": self._add_artist(ar, partial=True) if (ar := song.artist) else None,
+                "album": self._add_album(al, partial=True) if (al := song.album) else None,
+                "_cover_art": self._add_cover_art(song.cover_art),
+                "file": (
+                    self._add_cache_info(
+                        KEYS.SONG_FILE,
+                        song.id,
+                        file_id=song.id,
+                        path=song.path,
+                        size=song.size or None,
+                    )
+                    if song.path
+                    else None
+                ),
+            },
+        )
+
+    def _add_directory(
+        self, directory: API.Directory, partial: bool = False, param: Optional[str] = None
+    ) -> str:
+        self._add_cache_info(KEYS.DIRECTORY, param or directory.id, partial)
+        if not partial:
+            for child in directory.children:
+                if hasattr(child, "children"):  # directory
+                    self._add_directory(cast(API.Directory, child), partial=True)
+                else:
+                    self._add_song(cast(API.Song, child))
+
+        return self._add_row(
+            models.Directory, self._getattrs(directory, ["id", "name", "parent_id"])
+        )
+
+    def _add_playlist(
+        self, playlist: API.Playlist, partial: bool = False, param: Optional[str] = None
+    ) -> str:
+        self._add_cache_info(KEYS.PLAYLIST_DETAILS, param or playlist.id, partial)
+        if not partial:
+            self._playlist_songs[playlist.id] = [self._add_song(s) for s in playlist.songs]
+
+        return self._add_row(
+            models.Playlist,
+            {
+                **self._getattrs(
+                    playlist,
+                    [
+                        "id",
+                        "name",
+                        "song_count",
+                        "duration",
+                        "created",
+                        "changed",
+                        "comment",
+                        "owner",
+                        "public",
+                    ],
+                ),
+                "_cover_art": self._add_cover_art(playlist.cover_art),
+            },
+        )
+
+    # Writing
+    # ==================================================================================
+    def _write_cache_infos(self) -> Dict[CacheInfoRef, int]:
+        CacheInfo = models.CacheInfo
+        rows = []
+        for (cache_key, parameter), values in self._cache_infos.items():
+            row = {
+                "cache_key": cache_key,
+                "parameter": parameter,
+                "last_ingestion_time": self.now,
+                **values,
+            }
+            if parameter is not None:
+                rows.append(row)
+                continue
+
+            # NULL parameters never conflict with each other in the unique index, so
+            # these have to be looked up.
+            cache_info, created = CacheInfo.get_or_create(
+                cache_key=cache_key, parameter=None, defaults=row
+            )
+            if not created:
+                cache_info.valid = cache_info.valid or values["valid"]
+                cache_info.last_ingestion_time = self.now
+                cache_info.save()
+
+        self._upsert(
+            CacheInfo,
+            rows,
+            conflict_target=[CacheInfo.cache_key, CacheInfo.parameter],
+            update={
+                CacheInfo.valid: CacheInfo.valid | EXCLUDED.valid,
+                CacheInfo.last_ingestion_time: EXCLUDED.last_ingestion_time,
+                **{
+                    field: fn.COALESCE(getattr(EXCLUDED, field.column_name), field)
+                    for field in (CacheInfo.file_id, CacheInfo.path, CacheInfo.size)
+                },
+            },
+        )
+
+        # Look up the IDs of the rows that are referenced by other rows.
+        params_by_key: Dict[CachingAdapter.CachedDataKey, List[str]] = {
+            KEYS.COVER_ART_FILE: [],
+            KEYS.SONG_FILE: [],
+        }
+        for cache_key, parameter in self._cache_infos:
+            if cache_key in params_by_key and parameter is not None:
+                params_by_key[cache_key].append(parameter)
+
+        cache_info_ids: Dict[CacheInfoRef, int] = {}
+        for cache_key, params in params_by_key.items():
+            for params_chunk in chunked(params, BulkIngest.chunk_size):
+                for id_, parameter in (
+                    CacheInfo.select(CacheInfo.id, CacheInfo.parameter)
+                    .where(CacheInfo.cache_key == cache_key, CacheInfo.parameter.in_(params_chunk))
+                    .tuples()
+                ):
+                    cache_info_ids[(cache_key, parameter)] = id_
+        return cache_info_ids
+
+    @staticmethod
+    def _upsert(
+        model: Any,
+        rows: Iterable[Dict[str, Any]],
+        conflict_target: Optional[Sequence[Field]] = None,
+        update: Optional[Dict[Field, Any]] = None,
+    ):
+        rows = list(rows)
+        if not rows:
+            return
+
+        fields = [model._meta.fields[name] for name in {name: 0 for row in rows for name in row}]
+        if conflict_target is None:
+            conflict_target = [model._meta.primary_key]
+        if update is None:
+            update = {
+                field: fn.COALESCE(getattr(EXCLUDED, field.column_name), field)
+                for field in fields
+                if field.name not in {f.name for f in conflict_target}
+            }
+
+        for rows_chunk in chunked(rows, BulkIngest.chunk_size):
+            model.insert_many(
+                [tuple(row.get(field.name) for field in fields) for row in rows_chunk],
+                fields=fields,
+            ).on_conflict(conflict_target=conflict_target, update=update).execute()
+
+    @staticmethod
+    def _insert(model: Any, rows: Sequence[Dict[str, Any]], replace: bool = False):
+        for rows_chunk in chunked(rows, BulkIngest.chunk_size):
+            query = model.insert_many(rows_chunk)
+            (query.on_conflict_replace() if replace else query).execute()
+
+    @staticmethod
+    def _set_sorted_relation(field: Any, relations: Dict[str, List[str]]):
+        """
+        Replace the contents of the sorted many-to-many relation ``field`` for each
+        source ID in ``relations`` with the corresponding list of destination IDs.
+        """
+        if not relations:
+            return
+
+        through_model = field.get_through_model()
+        src_name, dest_name = (m._meta.name for m in field.get_models())
+        src_field = getattr(through_model, src_name)
+        for src_ids_chunk in chunked(list(relations), BulkIngest.chunk_size):
+            through_model.delete().where(src_field.in_(src_ids_chunk)).execute()
+
+        BulkIngest._insert(
+            through_model,
+            [
+                {src_name: src_id, dest_name: dest_id, "position": i}
+                for src_id, dest_ids in relations.items()
+                for i, dest_id in enumerate(dest_ids)
+            ],
+        )
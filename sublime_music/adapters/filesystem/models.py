@@ -1,8 +1,9 @@
-from typing import List, Optional, Union
+from typing import List, Optional, Tuple, Type, Union
 
 from peewee import (
     AutoField,
     BooleanField,
+    Field,
     ForeignKeyField,
     IntegerField,
     Model,
@@ -11,6 +12,7 @@ from peewee import (
     TextField,
     prefetch,
 )
+from playhouse.sqlite_ext import FTS5Model, SearchField
 
 from .sqlite_extensions import (
     CacheConstantsField,
@@ -19,7 +21,21 @@ from .sqlite_extensions import (
     TzDateTimeField,
 )
 
-database = SqliteDatabase(None)
+# The cache database is in WAL mode so that reads (which often happen on the UI thread)
+# never wait for an ingestion to finish. Each thread gets its own connection (which is
+# the peewee default) and the FilesystemAdapter only lets one thread write at a time.
+database = SqliteDatabase(
+    None,
+    pragmas={
+        "journal_mode": "wal",
+        # In WAL mode, only syncing at checkpoints can't corrupt the database. At worst,
+        # the most recent ingestions are lost if the power goes out.
+        "synchronous": "normal",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -16 * 1024,  # KiB per connection
+        "temp_store": "memory",
+    },
+)
 
 
 # Models
@@ -34,7 +50,7 @@ class CacheInfo(BaseModel):
     valid = BooleanField(default=False)
     cache_key = CacheConstantsField()
     parameter = TextField(null=True, default="")
-    # TODO (#2) actually use this for cache expiry.
+    # Used for cache expiry. See FilesystemAdapter.cache_ttls.
     last_ingestion_time = TzDateTimeField(null=False)
 
     class Meta:
@@ -230,6 +246,53 @@ class Playlist(BaseModel):
             return None
 
 
+class LibrarySync(BaseModel):
+    id = IntegerField(unique=True, primary_key=True)
+    # See LibraryChanges.watermark.
+    watermark = TextField()
+    last_sync_time = TzDateTimeField(null=False)
+
+
+# Full-Text Search Indexes
+# =============================================================================
+# These index the names of the objects in the corresponding tables (which they use as
+# their content) for FilesystemAdapter.search. The trigram tokenizer allows matching any
+# part of a name. They are kept up-to-date by triggers on the content tables (see
+# FilesystemAdapter._create_search_indexes) and aren't in ALL_TABLES because older
+# versions of SQLite don't support the trigram tokenizer.
+class SearchIndex(FTS5Model):
+    class Meta:
+        database = database
+
+
+class AlbumSearchIndex(SearchIndex):
+    name = SearchField()
+
+    class Meta:
+        options = {"content": Album, "tokenize": "trigram"}
+
+
+class ArtistSearchIndex(SearchIndex):
+    name = SearchField()
+
+    class Meta:
+        options = {"content": Artist, "tokenize": "trigram"}
+
+
+class PlaylistSearchIndex(SearchIndex):
+    name = SearchField()
+
+    class Meta:
+        options = {"content": Playlist, "tokenize": "trigram"}
+
+
+class SongSearchIndex(SearchIndex):
+    title = SearchField()
+
+    class Meta:
+        options = {"content": Song, "tokenize": "trigram"}
+
+
 class Version(BaseModel):
     id = IntegerField(unique=True, primary_key=True)
     major = IntegerField()
@@ -263,9 +326,18 @@ ALL_TABLES = (
     Directory,
     Genre,
     IgnoredArticle,
+    LibrarySync,
     Playlist,
     Playlist._songs.get_through_model(),
     SimilarArtist,
     Song,
     Version,
 )
+
+# (search index, indexed field of the content model)
+SEARCH_INDEXES: Tuple[Tuple[Type[FTS5Model], Field], ...] = (
+    (AlbumSearchIndex, Album.name),
+    (ArtistSearchIndex, Artist.name),
+    (PlaylistSearchIndex, Playlist.name),
+    (SongSearchIndex, Song.title),
+)
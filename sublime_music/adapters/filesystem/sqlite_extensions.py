@@ -46,7 +46,7 @@ class TzDateTimeField(TextField):
 # Sorted M-N Association Field
 # =============================================================================
 class SortedManyToManyQuery(ManyToManyQuery):
-    def add(self, value: Sequence[Any], clear_existing: bool = False):
+    def add(self, value: Sequence[Any], clear_existing: bool = False, start_position: int = 0):
         if clear_existing:
             self.clear()
 
@@ -61,7 +61,7 @@ class SortedManyToManyQuery(ManyToManyQuery):
             {
                 accessor.src_fk.name: src_id,
                 accessor.dest_fk.name: rel_id,
-                "position": i,
+                "position": start_position + i,
             }
             for i, rel_id in enumerate(self._id_list(value))  # type: ignore
         ]
@@ -0,0 +1,142 @@
+import logging
+import threading
+from time import monotonic
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from .adapter_base import CachingAdapter
+
+IngestItem = Tuple[CachingAdapter.CachedDataKey, Optional[str], Any]
+
+
+class IngestQueue:
+    """
+    A write-behind queue in front of a caching adapter. Everything that is put on the
+    queue is ingested by a single writer thread. Once data arrives, the writer waits up
+    to ``batch_interval`` seconds for more, and then ingests all of it with one call to
+    :class:`CachingAdapter.ingest_new_data_batch` (and so in one transaction), rather
+    than committing each of the many small ingests separately.
+
+    Callers that need to read their own writes from the caching adapter must call
+    :class:`flush` first.
+    """
+
+    def __init__(
+        self,
+        caching_adapter: CachingAdapter,
+        on_ingested: Callable[[Sequence[IngestItem]], None] = lambda _: None,
+        batch_interval: float = 0.05,
+        max_batch_size: int = 500,
+    ):
+        """
+        :param caching_adapter: the adapter to ingest the data into.
+        :param on_ingested: called on the writer thread with each batch of items after
+            it has been ingested.
+        :param batch_interval: how long (in seconds) to wait for more data before
+            ingesting a batch.
+        :param max_batch_size: the maximum number of items to ingest at once.
+        """
+        self.caching_adapter = caching_adapter
+        self.on_ingested = on_ingested
+        self.batch_interval = batch_interval
+        self.max_batch_size = max_batch_size
+
+        self._condition = threading.Condition()
+        self._pending: List[IngestItem] = []
+        # The number of items that have ever been put on the queue, and the number of
+        # those that have been ingested (or failed to be). A flush waits for the latter
+        # to catch up with the former.
+        self._put_count = 0
+        self._ingested_count = 0
+        self._waiting_flushes = 0
+        self._stopped = False
+        self.batches = 0
+
+        self._thread = threading.Thread(target=self._run, name="CacheIngestQueue", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def put(self, cache_key: CachingAdapter.CachedDataKey, param: Optional[str], data: Any):
+        with self._condition:
+            if self._stopped:
+                logging.warning(f"Ingest queue is shut down. Dropping {cache_key} {param}")
+                return
+            self._pending.append((cache_key, param, data))
+            self._put_count += 1
+            self._condition.notify_all()
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """
+        Wait until everything that was put on the queue before this call has been
+        ingested. The writer thread stops waiting for more data while anyone is
+        waiting for a flush.
+
+        :returns: ``False`` if the timeout expired first.
+        """
+        if threading.current_thread() is self._thread:
+            return True
+
+        with self._condition:
+            target = self._put_count
+            self._waiting_flushes += 1
+            self._condition.notify_all()
+            try:
+                return self._condition.wait_for(
+                    lambda: self._ingested_count >= target, timeout=timeout
+                )
+            finally:
+                self._waiting_flushes -= 1
+
+    def shutdown(self):
+        """
+        Ingest everything that is still on the queue and stop the writer thread.
+        """
+        with self._condition:
+            self._stopped = True
+            self._condition.notify_all()
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or self._stopped)
+                if not self._pending:
+                    return
+
+                # Give more data a chance to arrive, unless someone is waiting for it.
+                deadline = monotonic() + self.batch_interval
+                while (
+                    not (self._waiting_flushes or self._stopped)
+                    and len(self._pending) < self.max_batch_size
+                    and (remaining := deadline - monotonic()) > 0
+                ):
+                    self._condition.wait(remaining)
+
+                batch = self._pending[: self.max_batch_size]
+                del self._pending[: self.max_batch_size]
+
+            self._ingest(batch)
+            with self._condition:
+                self._ingested_count += len(batch)
+                self.batches += 1
+                self._condition.notify_all()
+
+    def _ingest(self, batch: List[IngestItem]):
+        try:
+            self.caching_adapter.ingest_new_data_batch(batch)
+        except Exception:
+            logging.exception(f"Failed to ingest a batch of {len(batch)} items")
+            # The whole transaction was rolled back. Ingest the items one at a time so
+            # that one bad item doesn't lose the rest of them.
+            if len(batch) > 1:
+                for cache_key, param, data in batch:
+                    try:
+                        self.caching_adapter.ingest_new_data(cache_key, param, data)
+                    except Exception:
+                        logging.exception(f"Failed to ingest {cache_key} {param}")
+
+        try:
+            self.on_ingested(batch)
+        except Exception:
+            logging.exception("Ingest queue callback failed")
@@ -3,21 +3,25 @@ import itertools
 import logging
 import os
 import random
+import shutil
 import tempfile
 import threading
-from concurrent.futures import Future, ThreadPoolExecutor
+from collections import OrderedDict, deque
+from concurrent.futures import CancelledError, Future
 from dataclasses import dataclass
-from datetime import timedelta
+from datetime import datetime, timedelta
 from enum import Enum
 from functools import partial
 from pathlib import Path
-from time import sleep
+from time import monotonic, sleep
 from typing import (
     Any,
     Callable,
+    Deque,
     Dict,
     Generic,
     Iterable,
+    Iterator,
     List,
     Optional,
     Sequence,
@@ -27,6 +31,7 @@ from typing import (
     Union,
     cast,
 )
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
 
 import requests
 
@@ -38,10 +43,16 @@ from .adapter_base import (
     AlbumSearchQuery,
     CacheMissError,
     CachingAdapter,
+    LibraryChanges,
     SongCacheStatus,
 )
 from .api_objects import Album, Artist, Directory, Genre, Playlist, PlayQueue, SearchResult, Song
+from .bandwidth import BandwidthLimiter
+from .executor import PriorityThreadPoolExecutor, TaskPriority
 from .filesystem import FilesystemAdapter
+from .ingest_queue import IngestQueue
+from .metrics import Metrics
+from .object_cache import ObjectCache
 from .subsonic import SubsonicAdapter
 
 REQUEST_DELAY: Optional[Tuple[float, float]] = None
@@ -63,6 +74,62 @@ if delay_str := os.environ.get("DOWNLOAD_BLOCK_DELAY"):
 T = TypeVar("T")
 
 
+def _chain_future(source: Future, on_cancelled: Callable[[], None] | None = None) -> Future:
+    """
+    Create a new :class:`concurrent.futures.Future` which resolves with the same result
+    (or exception) as ``source``. Cancelling the returned future does not cancel
+    ``source``, but calls ``on_cancelled`` (if given).
+    """
+    chained: Future = Future()
+
+    def on_source_done(f: Future):
+        if not chained.set_running_or_notify_cancel():
+            return
+        if f.cancelled():
+            chained.set_exception(CancelledError())
+        elif (exception := f.exception()) is not None:
+            chained.set_exception(exception)
+        else:
+            chained.set_result(f.result())
+
+    def on_chained_done(f: Future):
+        if f.cancelled() and on_cancelled:
+            on_cancelled()
+
+    source.add_done_callback(on_source_done)
+    chained.add_done_callback(on_chained_done)
+    return chained
+
+
+def _cache_miss_on_error(source: Future, partial_data: Any) -> Future:
+    """
+    Create a new :class:`concurrent.futures.Future` which resolves with the same result
+    as ``source``, or with a :class:`CacheMissError` containing ``partial_data`` if
+    ``source`` fails. Cancelling the returned future cancels ``source``.
+    """
+    chained: Future = Future()
+
+    def on_source_done(f: Future):
+        if not chained.set_running_or_notify_cancel():
+            return
+        if f.cancelled():
+            chained.set_exception(CancelledError())
+        elif (exception := f.exception()) is not None:
+            error = CacheMissError(partial_data=partial_data)
+            error.__cause__ = exception
+            chained.set_exception(error)
+        else:
+            chained.set_result(f.result())
+
+    def on_chained_done(f: Future):
+        if f.cancelled():
+            source.cancel()
+
+    source.add_done_callback(on_source_done)
+    chained.add_done_callback(on_chained_done)
+    return chained
+
+
 class Result(Generic[T]):
     """
     A result from a :class:`AdapterManager` function. This is effectively a wrapper
@@ -78,25 +145,30 @@ class Result(Generic[T]):
 
     def __init__(
         self,
-        data_resolver: Union[T, Callable[[], T]],
+        data_resolver: Union[T, Callable[[], T], Future],
         *args,
         is_download: bool = False,
         default_value: T | None = None,
         on_cancel: Callable[[], None] | None = None,
+        priority: TaskPriority = TaskPriority.VISIBLE,
     ):
         """
         Creates a :class:`Result` object.
 
-        :param data_resolver: the actual data, or a function that will return the actual
-            data. If the latter, the function will be executed by the thread pool.
+        :param data_resolver: the actual data, a function that will return the actual
+            data, or an existing :class:`concurrent.futures.Future`. If a function is
+            given, it will be executed by the thread pool.
         :param is_download: whether or not this result requires a file download. If it
             does, then it uses a separate executor.
+        :param priority: the :class:`TaskPriority` with which to schedule the function
+            on the executor.
         """
-        if callable(data_resolver):
-            if is_download:
-                self._future = AdapterManager.download_executor.submit(data_resolver, *args)
-            else:
-                self._future = AdapterManager.executor.submit(data_resolver, *args)
+        if isinstance(data_resolver, Future):
+            self._future = data_resolver
+            self._future.add_done_callback(self._on_future_complete)
+        elif callable(data_resolver):
+            executor = AdapterManager.download_executor if is_download else AdapterManager.executor
+            self._future = executor.submit(data_resolver, *args, priority=priority)
             self._future.add_done_callback(self._on_future_complete)
         else:
             self._data = data_resolver
@@ -186,31 +258,185 @@ class AdapterManager:
     available_adapters: Set[Any] = {FilesystemAdapter, SubsonicAdapter}
     current_download_ids: Set[str] = set()
     download_set_lock = threading.Lock()
-    executor: ThreadPoolExecutor = ThreadPoolExecutor()
-    download_executor: ThreadPoolExecutor = ThreadPoolExecutor()
+    executor: PriorityThreadPoolExecutor = PriorityThreadPoolExecutor()
+    download_executor: PriorityThreadPoolExecutor = PriorityThreadPoolExecutor()
     is_shutting_down: bool = False
     _offline_mode: bool = False
 
     _song_download_jobs: Dict[str, Result[str]] = {}
     _cancelled_song_ids: Set[str] = set()
 
+    # The futures for all of the downloads that are currently queued or running, keyed
+    # by the ID of the resource being downloaded.
+    _download_futures: Dict[str, Future] = {}
+
+    # How many times a download that is interrupted part way through is resumed before
+    # giving up.
+    max_download_resumes = 3
+
+    # Partial downloads that haven't been resumed for this many seconds are deleted on
+    # startup.
+    partial_download_max_age = 7 * 24 * 60 * 60.0
+
+    # Downloads are read in chunks of between min_download_chunk_size and
+    # max_download_chunk_size bytes. The chunk size grows while chunks arrive quickly
+    # and shrinks when they are slow, so that each one takes about
+    # download_chunk_duration seconds.
+    min_download_chunk_size = 16 * 1024
+    max_download_chunk_size = 1024 * 1024
+    download_chunk_duration = 0.25
+
+    # The progress of a download is reported (at most) once every this many bytes.
+    download_progress_interval = 100 * 1024
+
+    # Ground truth requests that are currently in flight, keyed by the function name,
+    # the parameter, and the keyword arguments. Identical concurrent requests share the
+    # same underlying future so that only one network request is made.
+    _in_flight_requests: Dict[Tuple[str, Optional[str], Tuple], Future] = {}
+    _in_flight_lock = threading.Lock()
+    # The number of callers that are still waiting on each in-flight request. Once all
+    # of them have cancelled their results, the request itself is cancelled.
+    _in_flight_waiters: Dict[Future, int] = {}
+
+    # In-memory cache of the objects most recently served by the caching adapter, keyed
+    # by (cache key, ID). It is kept up-to-date by the _ingest_new_data,
+    # _invalidate_data, and _delete_data helpers, so all changes to the caching adapter
+    # must go through those.
+    _object_cache: ObjectCache[Tuple[CachingAdapter.CachedDataKey, Optional[str]]] = ObjectCache()
+    _object_cache_keys = {
+        CachingAdapter.CachedDataKey.ALBUM,
+        CachingAdapter.CachedDataKey.ARTIST,
+        CachingAdapter.CachedDataKey.PLAYLIST_DETAILS,
+        CachingAdapter.CachedDataKey.SONG,
+    }
+
+    # When stale-while-revalidate is requested, cached data is revalidated against the
+    # ground truth adapter at most this often (in seconds) per request. Invalidated
+    # data is always revalidated.
+    revalidation_interval = 60.0
+    _last_revalidation_times: Dict[Tuple[str, Optional[str], Tuple], float] = {}
+
+    # A forced refresh of the artists, the root directory, or an album list first asks
+    # the ground truth adapter what changed since the last library sync, and only
+    # retrieves the data again if the library changed. The result of a library sync is
+    # reused for this many seconds.
+    library_sync_interval = 60.0
+    # The album lists that only change when the library does.
+    _library_album_query_types = {
+        AlbumSearchQuery.Type.NEWEST,
+        AlbumSearchQuery.Type.ALPHABETICAL_BY_NAME,
+        AlbumSearchQuery.Type.ALPHABETICAL_BY_ARTIST,
+        AlbumSearchQuery.Type.YEAR_RANGE,
+        AlbumSearchQuery.Type.GENRE,
+    }
+    _last_library_sync: Optional[Tuple[float, LibraryChanges]] = None
+    _library_sync_lock = threading.Lock()
+
+    # When mirroring the library, this many details requests are in flight at once, and
+    # the details are ingested into the cache this many at a time.
+    library_mirror_parallelism = 4
+    library_mirror_batch_size = 50
+    # Mirroring stops once this many details requests in a row have failed (or the
+    # server stops responding to pings), since the server is probably unreachable.
+    library_mirror_max_consecutive_failures = 5
+
+    # Data from the ground truth adapter that is only being cached (rather than data
+    # that a caller is about to read back) is ingested by a write-behind queue, which
+    # ingests everything that arrives within this many seconds in one transaction.
+    ingest_batch_interval = 0.05
+
+    # Latency histograms and counters for the requests served by the AdapterManager.
+    # These are written to _metrics_path by dump_metrics and on shutdown.
+    metrics = Metrics()
+    _metrics_path: Optional[Path] = None
+
+    # Limits the bandwidth used by all downloads. While a song is being streamed,
+    # enough bandwidth for it is reserved so that prefetching and background downloads
+    # don't starve the stream. The reservation is the average bit rate of the song times
+    # streaming_bandwidth_headroom (or streaming_bandwidth_share of the limit if the
+    # size or duration of the song is unknown).
+    bandwidth_limiter = BandwidthLimiter()
+    streaming_bandwidth_headroom = 1.25
+    streaming_bandwidth_share = 0.5
+
+    # The requests that have recently been served from the cache, most recently used
+    # last. Those with data that is about to expire are refreshed in the background by
+    # the expiry sweeper, which runs every expiry_sweep_interval seconds.
+    @dataclass
+    class _HotRequest:
+        function_name: str
+        param: Optional[Union[str, AlbumSearchQuery]]
+        cache_key: CachingAdapter.CachedDataKey
+        kwargs: Dict[str, Any]
+        last_access: float
+
+    _hot_requests: "OrderedDict[Tuple[str, Optional[str], Tuple], _HotRequest]" = OrderedDict()
+    max_hot_requests = 256
+    hot_request_window = 15 * 60.0
+    expiry_sweep_interval = 60.0
+
     @dataclass
     class _AdapterManagerInternal:
         ground_truth_adapter: Adapter
         on_song_download_progress: Callable[[str, DownloadProgress], None]
         caching_adapter: Optional[CachingAdapter] = None
         concurrent_download_limit: int = 5
+        download_dir_parent: Optional[Path] = None
+        download_dir_prefix = "downloads-"
 
         def __post_init__(self):
-            self._download_dir = tempfile.TemporaryDirectory()
+            # Keep the downloads on the same filesystem as the cache (if there is one)
+            # so that the caching adapter can move them into place instead of copying.
+            if self.download_dir_parent:
+                self.download_dir_parent.mkdir(parents=True, exist_ok=True)
+                # Clean up the temporary directories that were left behind if the app
+                # crashed.
+                for stale_dir in self.download_dir_parent.glob(f"{self.download_dir_prefix}*"):
+                    shutil.rmtree(stale_dir, ignore_errors=True)
+            self._download_dir = tempfile.TemporaryDirectory(
+                prefix=self.download_dir_prefix, dir=self.download_dir_parent
+            )
             self.download_path = Path(self._download_dir.name)
+            # Partial downloads are kept next to the cache rather than in the temporary
+            # directory so that they can still be resumed after a restart.
+            self.partial_download_path = (
+                self.download_dir_parent.joinpath("partial_downloads")
+                if self.download_dir_parent
+                else self.download_path
+            )
+            self.partial_download_path.mkdir(parents=True, exist_ok=True)
+            self.prune_partial_downloads(AdapterManager.partial_download_max_age)
             self.download_limiter_semaphore = threading.Semaphore(self.concurrent_download_limit)
+            self.expiry_sweeper_stop = threading.Event()
+            self.ingest_queue: Optional[IngestQueue] = None
+            if self.caching_adapter:
+                self.ingest_queue = IngestQueue(
+                    self.caching_adapter,
+                    on_ingested=AdapterManager._on_data_ingested,
+                    batch_interval=AdapterManager.ingest_batch_interval,
+                )
 
         def song_download_progress(self, file_id: str, progress: DownloadProgress):
             self.on_song_download_progress(file_id, progress)
 
+        def prune_partial_downloads(self, max_age: Optional[float] = None):
+            """
+            Delete the partial downloads that haven't been written to for ``max_age``
+            seconds, or all of them if ``max_age`` is ``None``.
+            """
+            now = datetime.now().timestamp()
+            for partial_file in self.partial_download_path.glob("*.part"):
+                try:
+                    if max_age is None or now - partial_file.stat().st_mtime > max_age:
+                        partial_file.unlink()
+                except OSError:
+                    logging.exception(f"Failed to delete {partial_file}")
+
         def shutdown(self):
+            self.expiry_sweeper_stop.set()
             self.ground_truth_adapter.shutdown()
+            if self.ingest_queue:
+                self.ingest_queue.shutdown()
             if self.caching_adapter:
                 self.caching_adapter.shutdown()
             self._download_dir.cleanup()
@@ -229,7 +455,44 @@ class AdapterManager:
     @staticmethod
     def initial_sync() -> Result[None]:
         assert AdapterManager._instance
-        return Result(AdapterManager._instance.ground_truth_adapter.initial_sync)
+        return Result(
+            AdapterManager._instance.ground_truth_adapter.initial_sync,
+            priority=TaskPriority.BACKGROUND,
+        )
+
+    @staticmethod
+    def sync_library() -> Result[Optional[LibraryChanges]]:
+        """
+        Find out what has changed in the library since the last library sync, cache the
+        new data, and invalidate the cached data that may be out of date.
+
+        :returns: the changes, or ``None`` if the library can't be synced incrementally.
+        """
+        return Result(
+            partial(AdapterManager._sync_library, max_age=0), priority=TaskPriority.BACKGROUND
+        )
+
+    @staticmethod
+    def mirror_library(
+        on_progress: Callable[[int, int, int], None] = lambda *_: None
+    ) -> Result[None]:
+        """
+        Cache the metadata for the entire library (the artists, albums, genres, and
+        playlists, and all of their details) so that it can be browsed and searched
+        without making any requests to the ground truth adapter.
+
+        Everything that is already cached is skipped, so if mirroring is interrupted,
+        calling this again resumes where it left off.
+
+        :param on_progress: called (on a worker thread) with the number of items whose
+            details have been mirrored so far, the number of items whose details
+            couldn't be retrieved, and the total number of items. If the server becomes
+            unreachable, mirroring stops before all of the items have been tried.
+        """
+        return Result(
+            partial(AdapterManager._mirror_library, on_progress),
+            priority=TaskPriority.BACKGROUND,
+        )
 
     @staticmethod
     def ground_truth_adapter_is_networked() -> bool:
@@ -244,6 +507,11 @@ class AdapterManager:
     @staticmethod
     def shutdown():
         logging.info("AdapterManager shutdown start")
+        try:
+            AdapterManager.dump_metrics()
+        except Exception:
+            logging.exception("Failed to dump metrics")
+
         AdapterManager.is_shutting_down = True
         for _, job in AdapterManager._song_download_jobs.items():
             job.cancel()
@@ -255,6 +523,49 @@ class AdapterManager:
 
         logging.info("AdapterManager shutdown complete")
 
+    @staticmethod
+    def dump_metrics(path: Path | None = None) -> Optional[Path]:
+        """
+        Write the current metrics, executor queue depths, and object cache statistics to
+        a JSON file.
+
+        :param path: the file to write to. Defaults to ``metrics.json`` in the data
+            directory of the current provider.
+        :returns: the path of the file that was written, or ``None`` if there is no path
+            to write to.
+        """
+        if not (path := path or AdapterManager._metrics_path):
+            return None
+
+        metrics = AdapterManager.metrics.to_dict()
+        metrics["queue_depths"] = {
+            executor_name: {priority.name: depth for priority, depth in depths.items()}
+            for executor_name, depths in AdapterManager.get_queue_depths().items()
+        }
+        metrics["object_cache"] = AdapterManager.get_object_cache_stats()
+        if AdapterManager._instance and (
+            session_pool := AdapterManager._instance.ground_truth_adapter.http_session_pool
+        ):
+            metrics["http_connections"] = session_pool.connection_stats()
+        if AdapterManager._instance and (
+            limiter := AdapterManager._instance.ground_truth_adapter.concurrency_limiter
+        ):
+            metrics["concurrency"] = limiter.stats()
+        Metrics.dump(path, metrics)
+        logging.info(f"Metrics written to {path}")
+        return path
+
+    @staticmethod
+    def get_queue_depths() -> Dict[str, Dict[TaskPriority, int]]:
+        """
+        :returns: the number of tasks waiting to be started in each priority class of
+            each of the executors.
+        """
+        return {
+            "executor": AdapterManager.executor.queue_depths(),
+            "download_executor": AdapterManager.download_executor.queue_depths(),
+        }
+
     @staticmethod
     def reset(
         config: Any,
@@ -268,13 +579,32 @@ class AdapterManager:
         if AdapterManager._instance:
             AdapterManager._instance.shutdown()
 
+        # If the AdapterManager was completely shut down, the executors can't accept any
+        # more work, so recreate them.
+        if AdapterManager.is_shutting_down:
+            AdapterManager.executor = PriorityThreadPoolExecutor()
+            AdapterManager.download_executor = PriorityThreadPoolExecutor()
+            AdapterManager.is_shutting_down = False
+
         AdapterManager._offline_mode = config.offline_mode
+        AdapterManager._object_cache.clear()
+        AdapterManager._last_revalidation_times.clear()
+        AdapterManager._last_library_sync = None
+        AdapterManager._hot_requests.clear()
 
         assert config.provider is not None
         assert isinstance(config.provider, ProviderConfiguration)
         assert config.cache_location
 
+        # Save the metrics for the previous provider before starting over.
+        try:
+            AdapterManager.dump_metrics()
+        except Exception:
+            logging.exception("Failed to dump metrics")
+
         source_data_dir = config.cache_location.joinpath(config.provider.id)
+        AdapterManager._metrics_path = source_data_dir.joinpath("metrics.json")
+        AdapterManager.metrics.reset()
         source_data_dir.joinpath("g").mkdir(parents=True, exist_ok=True)
         source_data_dir.joinpath("c").mkdir(parents=True, exist_ok=True)
 
@@ -297,7 +627,42 @@ class AdapterManager:
             on_song_download_progress,
             caching_adapter=caching_adapter,
             concurrent_download_limit=config.concurrent_download_limit,
+            download_dir_parent=source_data_dir if caching_adapter else None,
         )
+        AdapterManager.on_download_bandwidth_limit_change(config.download_bandwidth_limit)
+
+        if caching_adapter and caching_adapter.cache_ttls:
+            threading.Thread(
+                target=AdapterManager._run_expiry_sweeper,
+                args=(AdapterManager._instance,),
+                name="CacheExpirySweeper",
+                daemon=True,
+            ).start()
+
+    @staticmethod
+    def on_download_bandwidth_limit_change(limit: int):
+        """
+        :param limit: the maximum download bandwidth in KiB/s, or 0 for unlimited.
+        """
+        AdapterManager.bandwidth_limiter.set_rate(limit * 1024)
+
+    @staticmethod
+    def set_streaming_song(song: Optional[Song]):
+        """
+        Reserve download bandwidth for streaming the given song, or release the
+        reservation if ``song`` is ``None``.
+        """
+        if song is None:
+            AdapterManager.bandwidth_limiter.reserve(0)
+        elif song.size and song.duration:
+            bytes_per_second = song.size / song.duration.total_seconds()
+            AdapterManager.bandwidth_limiter.reserve(
+                bytes_per_second * AdapterManager.streaming_bandwidth_headroom
+            )
+        else:
+            AdapterManager.bandwidth_limiter.reserve(
+                AdapterManager.bandwidth_limiter.rate * AdapterManager.streaming_bandwidth_share
+            )
 
     @staticmethod
     def on_offline_mode_change(offline_mode: bool):
@@ -341,12 +706,25 @@ class AdapterManager:
         *params: Any,
         before_download: Callable[[], None] | None = None,
         partial_data: Any = None,
+        priority: TaskPriority = TaskPriority.VISIBLE,
         **kwargs,
     ) -> Result:
         """
         Creates a Result using the given ``function_name`` on the ground truth adapter.
         """
 
+        assert AdapterManager._instance
+        ground_truth_adapter = AdapterManager._instance.ground_truth_adapter
+        offline = AdapterManager._offline_mode and ground_truth_adapter.is_networked
+        if not offline and (
+            async_future := ground_truth_adapter.call_async(function_name, *params, **kwargs)
+        ):
+            # The adapter is making the request without blocking one of the executor's
+            # threads.
+            if before_download:
+                before_download()
+            return Result(_cache_miss_on_error(async_future, partial_data))
+
         def future_fn() -> Any:
             assert AdapterManager._instance
             if (
@@ -363,7 +741,7 @@ class AdapterManager:
             except Exception as e:
                 raise CacheMissError(partial_data=partial_data) from e
 
-        return Result(future_fn)
+        return Result(future_fn, priority=priority)
 
     @staticmethod
     def _create_download_result(
@@ -371,53 +749,62 @@ class AdapterManager:
         id: str,
         before_download: Callable[[], None] | None = None,
         expected_size: int | None = None,
+        on_downloaded: Callable[[str, str], None] | None = None,
         **result_args,
     ) -> Result[str]:
         """
         Create a function to download the given URI to a temporary file, and return the
-        filename. The returned function will spin-loop if the resource is already being
-        downloaded to prevent multiple requests for the same download.
+        filename. If the resource is already being downloaded, the returned result
+        shares the future of the existing download instead of starting a new one. Any
+        failure or cancellation of that download is propagated to every waiter.
+
+        If ``on_downloaded`` is given, it is called with the filename and the SHA-1 hash
+        of the file once the download finishes, before any of the waiters are notified.
+        It is only called once per download, so if this request joins an existing
+        download, ``on_downloaded`` is ignored.
         """
-        download_cancelled = False
-
-        def download_fn() -> str:
-            assert AdapterManager._instance
-            download_tmp_filename = AdapterManager._instance.download_path.joinpath(
-                hashlib.sha1(bytes(uri, "utf8")).hexdigest()
-            )
-
-            resource_downloading = False
-            with AdapterManager.download_set_lock:
-                if id in AdapterManager.current_download_ids:
-                    resource_downloading = True
-                AdapterManager.current_download_ids.add(id)
-
-            if before_download:
-                before_download()
-
-            expected_size_exists = expected_size is not None
-            if expected_size_exists:
-                AdapterManager._instance.song_download_progress(
-                    id,
-                    DownloadProgress(
-                        DownloadProgress.Type.PROGRESS,
-                        total_bytes=expected_size,
-                        current_bytes=0,
-                    ),
+        with AdapterManager.download_set_lock:
+            if (existing_download := AdapterManager._download_futures.get(id)) is not None:
+                logging.info(f"{uri} already being downloaded.")
+                if priority := result_args.get("priority"):
+                    # If the existing download hasn't started yet, and this request is
+                    # more important, don't make this request wait behind less
+                    # important work.
+                    AdapterManager.download_executor.promote(existing_download, priority)
+                if before_download:
+                    before_download()
+                return Result(_chain_future(existing_download), **result_args)
+
+            download_cancelled = False
+
+            def download_fn() -> str:
+                assert AdapterManager._instance
+                download_tmp_filename = AdapterManager._instance.download_path.joinpath(
+                    AdapterManager._download_tmp_name(uri)
+                )
+                # The file is downloaded to a ".part" file, which is kept if the download
+                # fails or is cancelled so that the next attempt can resume it.
+                partial_filename = AdapterManager._instance.partial_download_path.joinpath(
+                    download_tmp_filename.with_suffix(".part").name
                 )
 
-            # TODO (#122): figure out how to retry if the other request failed.
-            if resource_downloading:
-                logging.info(f"{uri} already being downloaded.")
+                with AdapterManager.download_set_lock:
+                    AdapterManager.current_download_ids.add(id)
+
+                if before_download:
+                    before_download()
+
+                expected_size_exists = expected_size is not None
+                if expected_size_exists:
+                    AdapterManager._instance.song_download_progress(
+                        id,
+                        DownloadProgress(
+                            DownloadProgress.Type.PROGRESS,
+                            total_bytes=expected_size,
+                            current_bytes=0,
+                        ),
+                    )
 
-                # The resource is already being downloaded. Busy loop until it has
-                # completed. Then, just return the path to the resource.
-                t = 0.0
-                while id in AdapterManager.current_download_ids and t < 20:
-                    sleep(0.2)
-                    t += 0.2
-                    # TODO (#122): handle the timeout
-            else:
                 logging.info(f"{uri} not found. Downloading...")
                 try:
                     if REQUEST_DELAY is not None:
@@ -428,51 +815,40 @@ class AdapterManager:
                     if NETWORK_ALWAYS_ERROR:
                         raise Exception("NETWORK_ALWAYS_ERROR enabled")
 
-                    # Wait 10 seconds to connect to the server and start downloading.
-                    # Then, for each of the blocks, give 5 seconds to download (which
-                    # should be more than enough for 1 KiB).
-                    request = requests.get(uri, stream=True, timeout=(10, 5))
-                    if "json" in request.headers.get("Content-Type", ""):
-                        raise Exception("Didn't expect JSON!")
-
-                    total_size = int(request.headers.get("Content-Length", 0))
-                    if expected_size_exists:
-                        if total_size != expected_size:
-                            raise Exception(
-                                f"Download content size ({total_size})is not the "
-                                f"expected size ({expected_size})."
+                    resumes_left = AdapterManager.max_download_resumes
+                    while True:
+                        start_size = (
+                            partial_filename.stat().st_size if partial_filename.exists() else 0
+                        )
+                        try:
+                            file_hash = AdapterManager._download_to_partial_file(
+                                uri,
+                                id,
+                                partial_filename,
+                                expected_size,
+                                lambda: download_cancelled,
+                                result_args.get("priority", TaskPriority.VISIBLE),
+                            )
+                            break
+                        except (
+                            requests.ConnectionError,
+                            requests.Timeout,
+                            requests.exceptions.ChunkedEncodingError,
+                        ) as e:
+                            # If the connection dropped part way through, resume the
+                            # download right away, as long as it is making progress.
+                            made_progress = (
+                                partial_filename.exists()
+                                and partial_filename.stat().st_size > start_size
                             )
+                            if download_cancelled or resumes_left <= 0 or not made_progress:
+                                raise
+                            resumes_left -= 1
+                            logging.warning(f"Download of {uri} interrupted ({e}). Resuming.")
 
-                    block_size = 1024  # 1 KiB
-                    total_consumed = 0
-
-                    with open(download_tmp_filename, "wb+") as f:
-                        for i, data in enumerate(request.iter_content(block_size)):
-                            total_consumed += len(data)
-                            f.write(data)
-
-                            if download_cancelled:
-                                AdapterManager._instance.song_download_progress(
-                                    id,
-                                    DownloadProgress(DownloadProgress.Type.CANCELLED),
-                                )
-                                raise Exception("Download Cancelled")
-
-                            if i % 100 == 0:
-                                # Only delay (if configured) and update the progress UI
-                                # every 100 KiB.
-                                if DOWNLOAD_BLOCK_DELAY is not None:
-                                    sleep(DOWNLOAD_BLOCK_DELAY)
-
-                                if expected_size_exists:
-                                    AdapterManager._instance.song_download_progress(
-                                        id,
-                                        DownloadProgress(
-                                            DownloadProgress.Type.PROGRESS,
-                                            total_bytes=total_size,
-                                            current_bytes=total_consumed,
-                                        ),
-                                    )
+                    partial_filename.replace(download_tmp_filename)
+                    if on_downloaded:
+                        on_downloaded(str(download_tmp_filename), file_hash)
 
                     # Everything succeeded.
                     if expected_size_exists:
@@ -494,32 +870,710 @@ class AdapterManager:
                     with AdapterManager.download_set_lock:
                         AdapterManager.current_download_ids.discard(id)
 
-            logging.info(f"{uri} downloaded. Returning.")
-            return str(download_tmp_filename)
+                logging.info(f"{uri} downloaded. Returning.")
+                return str(download_tmp_filename)
+
+            def on_download_cancel():
+                nonlocal download_cancelled
+                download_cancelled = True
+
+            result: Result[str] = Result(
+                download_fn, is_download=True, on_cancel=on_download_cancel, **result_args
+            )
+
+            # Register the download so that any other requests for the same resource
+            # wait on this future instead of starting a new download.
+            assert result._future
+            download_future = result._future
+            AdapterManager._download_futures[id] = download_future
+
+        def on_download_future_done(f: Future):
+            with AdapterManager.download_set_lock:
+                if AdapterManager._download_futures.get(id) is f:
+                    del AdapterManager._download_futures[id]
+
+        download_future.add_done_callback(on_download_future_done)
+        return result
+
+    # The query parameters that change on every request for the same resource (the
+    # Subsonic authentication salt and token).
+    _volatile_uri_params = {"s", "t"}
+
+    @staticmethod
+    def _download_tmp_name(uri: str) -> str:
+        """
+        :returns: the name of the file in the download directory that the given URI is
+            downloaded to. This is stable across requests for the same resource so that
+            an interrupted download can be resumed.
+        """
+        parsed = urlsplit(uri)
+        query = [
+            (k, v)
+            for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+            if k not in AdapterManager._volatile_uri_params
+        ]
+        stable_uri = urlunsplit(parsed._replace(query=urlencode(query)))
+        return hashlib.sha1(bytes(stable_uri, "utf8")).hexdigest()
+
+    @staticmethod
+    def _download_to_partial_file(
+        uri: str,
+        id: str,
+        partial_filename: Path,
+        expected_size: int | None,
+        is_cancelled: Callable[[], bool],
+        priority: TaskPriority,
+    ) -> str:
+        """
+        Download the given URI to ``partial_filename``. If the file already contains
+        the start of the resource from a previous attempt, only the rest of the resource
+        is requested (using an HTTP ``Range`` request) and appended to the file. The
+        download is throttled by the :class:`bandwidth_limiter` according to its
+        ``priority``.
+
+        :returns: the SHA-1 hash of the whole file.
+        :raises Exception: if the download fails, is cancelled, or the size of the
+            resource does not match ``expected_size``. Whatever was downloaded is kept
+            in ``partial_filename``.
+        """
+        assert AdapterManager._instance
+        offset = partial_filename.stat().st_size if partial_filename.exists() else 0
+        if expected_size is not None and offset >= expected_size:
+            # The partial file can't be the start of the expected resource.
+            offset = 0
+
+        # Wait 10 seconds to connect to the server and start downloading. Then, give up
+        # if the server sends nothing for 5 seconds.
+        headers = {"Range": f"bytes={offset}-"} if offset else {}
+        with AdapterManager._http_get(
+            uri, headers=headers, stream=True, timeout=(10, 5)
+        ) as request:
+            if "json" in request.headers.get("Content-Type", ""):
+                raise Exception("Didn't expect JSON!")
+
+            if offset and request.status_code == 416:
+                # The server can't satisfy the range, so the partial file is not the
+                # start of this resource. Start over.
+                logging.info(f"Unable to resume download of {uri}. Starting over.")
+                partial_filename.unlink()
+                return AdapterManager._download_to_partial_file(
+                    uri, id, partial_filename, expected_size, is_cancelled, priority
+                )
+
+            if offset and request.status_code == 206:
+                # Content-Range: bytes <start>-<end>/<total>
+                content_range = request.headers.get("Content-Range", "")
+                range_start, _, total = content_range.partition(" ")[2].partition("/")
+                if range_start.partition("-")[0] != str(offset) or not total.isdigit():
+                    raise Exception(f"Invalid Content-Range for {uri}: {content_range}")
+                total_size = int(total)
+                logging.info(f"Resuming download of {uri} at {offset}/{total_size} bytes.")
+            else:
+                # The server ignored the Range header (or there wasn't one), so it is
+                # sending the whole resource.
+                offset = 0
+                total_size = int(request.headers.get("Content-Length", 0))
+
+            if expected_size is not None and total_size != expected_size:
+                if offset:
+                    # The resource changed since the partial file was downloaded.
+                    partial_filename.unlink()
+                raise Exception(
+                    f"Download content size ({total_size}) is not the expected size "
+                    f"({expected_size})."
+                )
+
+            # Hash the file while it is being written so that the caching adapter
+            # doesn't have to read it again. If this is resuming a download, the part
+            # that was already downloaded has to be hashed first.
+            file_hash = hashlib.sha1()
+            if offset:
+                with open(partial_filename, "rb") as f:
+                    while chunk := f.read(AdapterManager.max_download_chunk_size):
+                        file_hash.update(chunk)
+
+            total_consumed = last_progress = offset
+            with open(partial_filename, "ab" if offset else "wb") as f:
+                for data in AdapterManager._iter_download_chunks(request, priority):
+                    total_consumed += len(data)
+                    f.write(data)
+                    file_hash.update(data)
+                    AdapterManager.metrics.add_bytes_downloaded(len(data))
+
+                    if is_cancelled():
+                        AdapterManager._instance.song_download_progress(
+                            id,
+                            DownloadProgress(DownloadProgress.Type.CANCELLED),
+                        )
+                        raise Exception("Download Cancelled")
+
+                    if total_consumed - last_progress < AdapterManager.download_progress_interval:
+                        continue
+
+                    # Only delay (if configured) and update the progress UI every 100 KiB.
+                    last_progress = total_consumed
+                    if DOWNLOAD_BLOCK_DELAY is not None:
+                        sleep(DOWNLOAD_BLOCK_DELAY)
+
+                    if expected_size is not None:
+                        AdapterManager._instance.song_download_progress(
+                            id,
+                            DownloadProgress(
+                                DownloadProgress.Type.PROGRESS,
+                                total_bytes=total_size,
+                                current_bytes=total_consumed,
+                            ),
+                        )
+
+            if total_size and total_consumed != total_size:
+                raise requests.exceptions.ChunkedEncodingError(
+                    f"Download of {uri} ended after {total_consumed} of {total_size} bytes."
+                )
+
+        return file_hash.hexdigest()
+
+    @staticmethod
+    def _http_get(uri: str, **kwargs) -> requests.Response:
+        """
+        Make a GET request, using the connection pool of the ground truth adapter if it
+        has one.
+        """
+        assert AdapterManager._instance
+        if session_pool := AdapterManager._instance.ground_truth_adapter.http_session_pool:
+            return session_pool.get(uri, **kwargs)
+        return requests.get(uri, **kwargs)
+
+    @staticmethod
+    def _iter_download_chunks(
+        response: requests.Response, priority: TaskPriority = TaskPriority.VISIBLE
+    ) -> Iterator[bytes]:
+        """
+        Iterate over the body of ``response`` in chunks. The chunk size adapts to the
+        speed of the connection so that each chunk takes about
+        ``download_chunk_duration`` seconds to arrive.
 
-        def on_download_cancel():
-            nonlocal download_cancelled
-            download_cancelled = True
+        The bandwidth for each chunk is acquired from the :class:`bandwidth_limiter`
+        before it is read. Whatever isn't used (because the chunk was short or the read
+        failed) is released again so that it doesn't throttle other downloads.
+        """
+        limiter = AdapterManager.bandwidth_limiter
+        max_chunk_size = AdapterManager.max_download_chunk_size
+        if rate := limiter.rate:
+            # Don't let a single chunk use up more than the limiter allows at once.
+            max_chunk_size = min(
+                max_chunk_size, int(rate * AdapterManager.download_chunk_duration)
+            )
+        max_chunk_size = max(max_chunk_size, AdapterManager.min_download_chunk_size)
 
-        return Result(download_fn, is_download=True, on_cancel=on_download_cancel, **result_args)
+        chunk_size = AdapterManager.min_download_chunk_size
+        while True:
+            limiter.acquire(chunk_size, priority)
+            start = monotonic()
+            try:
+                data = response.raw.read(chunk_size, decode_content=True)
+            except requests.RequestException:
+                limiter.release(chunk_size, priority)
+                raise
+            except Exception as e:
+                limiter.release(chunk_size, priority)
+                # Wrap the errors from urllib3 the same way that iter_content does so
+                # that interrupted downloads are resumed.
+                raise requests.exceptions.ChunkedEncodingError(e) from e
+            limiter.release(chunk_size - len(data), priority)
+
+            if not data:
+                return
+            yield data
+
+            elapsed = monotonic() - start
+            if len(data) == chunk_size and elapsed < AdapterManager.download_chunk_duration / 2:
+                chunk_size = min(chunk_size * 2, max_chunk_size)
+            elif elapsed > AdapterManager.download_chunk_duration * 2:
+                chunk_size = max(chunk_size // 2, AdapterManager.min_download_chunk_size)
 
     @staticmethod
     def _create_caching_done_callback(
-        cache_key: CachingAdapter.CachedDataKey, param: Optional[str]
+        cache_key: CachingAdapter.CachedDataKey,
+        param: Optional[str],
+        write_behind: bool = False,
     ) -> Callable[[Result], None]:
         """
         Create a function to let the caching_adapter ingest new data.
 
         :param cache_key: the cache key to ingest.
         :param params: the parameters to uniquely identify the cached item.
+        :param write_behind: whether the data can be ingested by the ingest queue. See
+            :class:`_ingest_new_data`.
         """
 
+        def future_finished(f: Result):
+            AdapterManager._ingest_new_data(
+                cache_key, param, f.result(), write_behind=write_behind
+            )
+
+        return future_finished
+
+    @staticmethod
+    def _create_page_ingester(
+        cache_key: CachingAdapter.CachedDataKey,
+        param: Optional[str],
+        on_page: Callable[[Sequence[Any]], None],
+        caching_done_callback: Callable[[Result], None],
+    ) -> Tuple[Callable[[Sequence[Any]], None], Callable[[Result], None]]:
+        """
+        Create functions to let the caching adapter ingest each page of new data as it
+        arrives, and to mark the data as complete once the last page has arrived.
+
+        :returns: a function to call with each page (which also calls ``on_page``) and a
+            function to call once the ground truth result is done. If the caching
+            adapter can't ingest pages, ``caching_done_callback`` is used to ingest all
+            of the data at once when the result is done.
+        """
+        num_ingested = 0
+        ingesting_pages = True
+
+        def on_ground_truth_page(page: Sequence[Any]):
+            nonlocal num_ingested, ingesting_pages
+            assert AdapterManager._instance
+            assert (caching_adapter := AdapterManager._instance.caching_adapter)
+            if ingesting_pages:
+                try:
+                    # Anything that is still queued for ingestion must not overwrite
+                    # the pages, so let the ingest queue catch up first.
+                    if num_ingested == 0:
+                        AdapterManager.flush_ingest_queue()
+                    ingesting_pages = caching_adapter.ingest_new_data_page(
+                        cache_key, param, page, num_ingested, is_last_page=False
+                    )
+                    AdapterManager._invalidate_object_cache(cache_key, param, page)
+                except Exception:
+                    logging.exception(f"Failed to ingest a page of {cache_key}")
+                    ingesting_pages = False
+                num_ingested += len(page)
+            on_page(page)
+
         def future_finished(f: Result):
             assert AdapterManager._instance
             assert AdapterManager._instance.caching_adapter
-            AdapterManager._instance.caching_adapter.ingest_new_data(cache_key, param, f.result())
+            data = f.result()
+            # If the ground truth adapter didn't return the data in pages, or if any of
+            # them couldn't be ingested, ingest all of the data at once.
+            if not ingesting_pages or num_ingested != len(data):
+                caching_done_callback(f)
+                return
 
-        return future_finished
+            AdapterManager.flush_ingest_queue()
+            AdapterManager._instance.caching_adapter.ingest_new_data_page(
+                cache_key, param, [], num_ingested, is_last_page=True
+            )
+            AdapterManager._invalidate_object_cache(cache_key, param)
+
+        return on_ground_truth_page, future_finished
+
+    @staticmethod
+    def _ingest_new_data(
+        cache_key: CachingAdapter.CachedDataKey,
+        param: Optional[str],
+        data: Any,
+        write_behind: bool = False,
+    ):
+        """
+        Ingest new data into the caching adapter.
+
+        :param write_behind: whether to put the data on the ingest queue and return
+            before it is ingested. Otherwise, the queue is flushed first (so that the
+            data is ingested after anything that is already queued), and the data can
+            be read back from the caching adapter as soon as this returns.
+        """
+        AdapterManager._ingest_new_data_batch([(cache_key, param, data)], write_behind)
+
+    @staticmethod
+    def _ingest_new_data_batch(
+        items: Sequence[Tuple[CachingAdapter.CachedDataKey, Optional[str], Any]],
+        write_behind: bool = False,
+    ):
+        assert AdapterManager._instance
+        assert (caching_adapter := AdapterManager._instance.caching_adapter)
+        ingest_queue = AdapterManager._instance.ingest_queue
+        if write_behind and ingest_queue:
+            for cache_key, param, data in items:
+                ingest_queue.put(cache_key, param, data)
+            return
+
+        if ingest_queue:
+            ingest_queue.flush()
+        if len(items) == 1:
+            caching_adapter.ingest_new_data(*items[0])
+        else:
+            caching_adapter.ingest_new_data_batch(items)
+        AdapterManager._on_data_ingested(items)
+
+    @staticmethod
+    def _on_data_ingested(
+        items: Sequence[Tuple[CachingAdapter.CachedDataKey, Optional[str], Any]]
+    ):
+        # This is also called by the ingest queue once it has ingested the data, so
+        # that objects read in the meantime aren't left in the object cache.
+        for cache_key, param, data in items:
+            AdapterManager._invalidate_object_cache(cache_key, param, data)
+
+    @staticmethod
+    def flush_ingest_queue(timeout: float | None = None) -> bool:
+        """
+        Wait until all of the data that has been queued for ingestion by the caching
+        adapter has been ingested. Call this before reading data back from the caching
+        adapter that must include everything that has been retrieved so far.
+
+        :returns: ``False`` if the timeout expired first.
+        """
+        if AdapterManager._instance and AdapterManager._instance.ingest_queue:
+            return AdapterManager._instance.ingest_queue.flush(timeout)
+        return True
+
+    @staticmethod
+    def _sync_library(max_age: float) -> Optional[LibraryChanges]:
+        assert AdapterManager._instance
+        caching_adapter = AdapterManager._instance.caching_adapter
+        if (
+            not caching_adapter
+            or AdapterManager._offline_mode
+            or not AdapterManager._ground_truth_can_do("get_library_changes")
+        ):
+            return None
+
+        # Only one sync happens at a time. Anyone else who needs one waits for it and
+        # uses its result.
+        with AdapterManager._library_sync_lock:
+            if (last_sync := AdapterManager._last_library_sync) and (
+                monotonic() - last_sync[0] < max_age
+            ):
+                return last_sync[1]
+
+            changes = AdapterManager._instance.ground_truth_adapter.get_library_changes(
+                caching_adapter.get_library_watermark()
+            )
+            AdapterManager._ingest_new_data(
+                CachingAdapter.CachedDataKey.LIBRARY_SYNC, None, changes
+            )
+            AdapterManager._last_library_sync = (monotonic(), changes)
+            logging.info(f"Library synced. Changed: {changes.changed}")
+            return changes
+
+    @staticmethod
+    def _library_may_have_changed() -> bool:
+        """
+        Sync the library (unless it was synced recently) and find out whether the
+        cached artists, album lists, and root directory may be out of date. If they
+        may be, a forced refresh has to go to the ground truth adapter.
+
+        Ingesting the library sync updates the cached data with the changes that the
+        sync found, and invalidates whatever it couldn't update, so once the library
+        has been synced, whatever is still valid in the cache can be used.
+        """
+        try:
+            changes = AdapterManager._sync_library(AdapterManager.library_sync_interval)
+        except Exception:
+            logging.exception("Failed to sync the library")
+            return True
+        return changes is None
+
+    @staticmethod
+    def _mirror_library(on_progress: Callable[[int, int, int], None]):
+        assert (instance := AdapterManager._instance)
+        caching_adapter = instance.caching_adapter
+        if not caching_adapter or (
+            AdapterManager._offline_mode and AdapterManager.ground_truth_adapter_is_networked()
+        ):
+            return
+
+        KEYS = CachingAdapter.CachedDataKey
+
+        # Mirror the lists first. These come from the cache if they are already cached.
+        if AdapterManager.can_get_genres():
+            AdapterManager.get_genres().result()
+
+        # The details that have to be mirrored: (cache key, function name, ID).
+        items: List[Tuple[CachingAdapter.CachedDataKey, str, str]] = []
+        if AdapterManager.can_get_artists():
+            items.extend(
+                (KEYS.ARTIST, "get_artist", a.id)
+                for a in AdapterManager.get_artists().result()
+                if a.id
+            )
+        if AdapterManager._ground_truth_can_do("get_albums"):
+            albums = AdapterManager.get_albums(
+                AlbumSearchQuery(AlbumSearchQuery.Type.ALPHABETICAL_BY_NAME)
+            ).result()
+            items.extend((KEYS.ALBUM, "get_album", a.id) for a in albums if a.id)
+        if AdapterManager.can_get_playlists():
+            items.extend(
+                (KEYS.PLAYLIST_DETAILS, "get_playlist_details", p.id)
+                for p in AdapterManager.get_playlists().result()
+            )
+
+        cached_getters = {
+            KEYS.ARTIST: caching_adapter.get_artist,
+            KEYS.ALBUM: caching_adapter.get_album,
+            KEYS.PLAYLIST_DETAILS: caching_adapter.get_playlist_details,
+        }
+        cached_ids = {key: caching_adapter.get_cached_params(key) for key in cached_getters}
+
+        def is_cached(cache_key: CachingAdapter.CachedDataKey, id_: str) -> bool:
+            if (ids := cached_ids[cache_key]) is not None:
+                return id_ in ids
+            try:
+                cached_getters[cache_key](id_)
+                return True
+            except CacheMissError:
+                return False
+
+        total = len(items)
+        missing = [item for item in items if not is_cached(item[0], item[2])]
+        done = total - len(missing)
+        failed = consecutive_failures = 0
+        on_progress(done, failed, total)
+        logging.info(f"Mirroring the details of {len(missing)} of {total} library items")
+
+        # Keep a bounded number of requests in flight, and ingest the results in
+        # batches. Each batch that is ingested is a checkpoint to resume from.
+        pending: Deque[Tuple[CachingAdapter.CachedDataKey, str, Result]] = deque()
+        batch: List[Tuple[CachingAdapter.CachedDataKey, Optional[str], Any]] = []
+        remaining = iter(missing)
+        while True:
+            while len(pending) < AdapterManager.library_mirror_parallelism and (
+                item := next(remaining, None)
+            ):
+                cache_key, function_name, id_ = item
+                pending.append(
+                    (
+                        cache_key,
+                        id_,
+                        AdapterManager._create_ground_truth_result(
+                            function_name, id_, priority=TaskPriority.BACKGROUND
+                        ),
+                    )
+                )
+            # Stop if the app is shutting down or the provider has changed.
+            if not pending or (
+                AdapterManager.is_shutting_down or AdapterManager._instance is not instance
+            ):
+                break
+
+            cache_key, id_, result = pending.popleft()
+            try:
+                batch.append((cache_key, id_, result.result()))
+                done += 1
+                consecutive_failures = 0
+            except Exception as e:
+                logging.warning(f"Failed to mirror {cache_key} {id_}: {e}")
+                failed += 1
+                consecutive_failures += 1
+                if (
+                    consecutive_failures >= AdapterManager.library_mirror_max_consecutive_failures
+                    or not instance.ground_truth_adapter.ping_status
+                ):
+                    logging.warning("The server is unreachable. Stopping the library mirror.")
+                    break
+
+            if len(batch) >= AdapterManager.library_mirror_batch_size:
+                AdapterManager._ingest_new_data_batch(batch, write_behind=True)
+                batch = []
+                on_progress(done, failed, total)
+
+        for _, _, result in pending:
+            result.cancel()
+        if AdapterManager._instance is instance:
+            if batch:
+                AdapterManager._ingest_new_data_batch(batch, write_behind=True)
+            on_progress(done, failed, total)
+        AdapterManager.flush_ingest_queue()
+
+    @staticmethod
+    def _invalidate_data(cache_key: CachingAdapter.CachedDataKey, param: Optional[str]):
+        assert AdapterManager._instance
+        assert AdapterManager._instance.caching_adapter
+        # Don't let queued data be ingested after it has been invalidated.
+        AdapterManager.flush_ingest_queue()
+        AdapterManager._instance.caching_adapter.invalidate_data(cache_key, param)
+        AdapterManager._invalidate_object_cache(cache_key, param)
+
+        # Invalidating an artist also invalidates all of its albums in the caching
+        # adapter, but we don't know which albums those are without a query.
+        if cache_key == CachingAdapter.CachedDataKey.ARTIST:
+            AdapterManager._object_cache.invalidate_where(
+                lambda k: k[0] == CachingAdapter.CachedDataKey.ALBUM
+            )
+
+    @staticmethod
+    def _delete_data(cache_key: CachingAdapter.CachedDataKey, param: Optional[str]):
+        assert AdapterManager._instance
+        assert AdapterManager._instance.caching_adapter
+        # Don't let queued data be ingested after it has been deleted.
+        AdapterManager.flush_ingest_queue()
+        AdapterManager._instance.caching_adapter.delete_data(cache_key, param)
+        AdapterManager._invalidate_object_cache(cache_key, param)
+
+    @staticmethod
+    def _invalidate_object_cache(
+        cache_key: CachingAdapter.CachedDataKey, param: Optional[str], data: Any = None
+    ):
+        """
+        Evict everything from the object cache that could have been changed by
+        ingesting, invalidating, or deleting the given data.
+        """
+        KEYS = CachingAdapter.CachedDataKey
+        object_cache = AdapterManager._object_cache
+
+        if cache_key == KEYS.EVERYTHING:
+            object_cache.clear()
+        elif cache_key == KEYS.ALL_SONGS:
+            object_cache.invalidate_where(lambda k: k[0] == KEYS.SONG)
+        elif cache_key == KEYS.PLAYLISTS:
+            object_cache.invalidate_where(lambda k: k[0] == KEYS.PLAYLIST_DETAILS)
+        elif cache_key in (KEYS.SONG_FILE, KEYS.SONG_FILE_PERMANENT, KEYS.SONG_RATING):
+            object_cache.invalidate((KEYS.SONG, param))
+        elif cache_key in AdapterManager._object_cache_keys:
+            object_cache.invalidate((cache_key, param))
+        elif cache_key == KEYS.LIBRARY_SYNC and data is not None:
+            # Syncing the library ingests the new albums and adds them to their artists.
+            data = cast(LibraryChanges, data).new_albums
+
+        # Ingesting an object also ingests all of the objects nested inside of it.
+        if data is not None:
+            for key in AdapterManager._nested_object_keys(data):
+                object_cache.invalidate(key)
+
+    @staticmethod
+    def _nested_object_keys(
+        data: Any, depth: int = 0
+    ) -> Iterable[Tuple[CachingAdapter.CachedDataKey, str]]:
+        KEYS = CachingAdapter.CachedDataKey
+        if data is None or depth > 3:
+            return
+
+        children: Iterable[Any] = ()
+        if isinstance(data, SearchResult):
+            children = itertools.chain(
+                data._artists.values(),
+                data._albums.values(),
+                data._songs.values(),
+                data._playlists.values(),
+            )
+        elif isinstance(data, Sequence) and not isinstance(data, str):
+            # Adapters can return any kind of sequence, not just lists.
+            children = data
+        elif isinstance(data, Song):
+            yield (KEYS.SONG, data.id)
+            children = (data.album, data.artist)
+        elif isinstance(data, Album):
+            if data.id:
+                yield (KEYS.ALBUM, data.id)
+            children = itertools.chain(data.songs or (), (data.artist,))
+        elif isinstance(data, Artist):
+            if data.id:
+                yield (KEYS.ARTIST, data.id)
+            children = data.albums or ()
+        elif isinstance(data, Playlist):
+            yield (KEYS.PLAYLIST_DETAILS, data.id)
+            children = data.songs or ()
+        elif isinstance(data, Directory):
+            children = data.children
+
+        for child in children:
+            yield from AdapterManager._nested_object_keys(child, depth + 1)
+
+    @staticmethod
+    def _get_object_cache_ttl(
+        cache_key: Optional[CachingAdapter.CachedDataKey],
+    ) -> Optional[float]:
+        """
+        Objects should not stay in the object cache for longer than the caching adapter
+        considers them valid.
+        """
+        assert AdapterManager._instance
+        if not (caching_adapter := AdapterManager._instance.caching_adapter) or not cache_key:
+            return None
+        if (ttl := caching_adapter.cache_ttls.get(cache_key)) is None:
+            return None
+        return ttl.total_seconds()
+
+    @staticmethod
+    def _record_hot_request(
+        request_key: Tuple[str, Optional[str], Tuple],
+        function_name: str,
+        param: Optional[Union[str, AlbumSearchQuery]],
+        cache_key: CachingAdapter.CachedDataKey,
+        kwargs: Dict[str, Any],
+    ):
+        with AdapterManager._in_flight_lock:
+            hot_requests = AdapterManager._hot_requests
+            hot_requests[request_key] = AdapterManager._HotRequest(
+                function_name, param, cache_key, kwargs, monotonic()
+            )
+            hot_requests.move_to_end(request_key)
+            while len(hot_requests) > AdapterManager.max_hot_requests:
+                hot_requests.popitem(last=False)
+
+    @staticmethod
+    def _run_expiry_sweeper(instance: _AdapterManagerInternal):
+        while not instance.expiry_sweeper_stop.wait(AdapterManager.expiry_sweep_interval):
+            try:
+                AdapterManager._refresh_expiring_data(instance)
+            except Exception:
+                logging.exception("Failed to refresh expiring data.")
+
+    @staticmethod
+    def _refresh_expiring_data(instance: _AdapterManagerInternal):
+        """
+        Refresh the data for the recently used requests that will expire before the next
+        time that the expiry sweeper runs.
+        """
+        if AdapterManager._offline_mode or AdapterManager._instance is not instance:
+            return
+        assert (caching_adapter := instance.caching_adapter)
+
+        now = monotonic()
+        with AdapterManager._in_flight_lock:
+            for request_key in [
+                k
+                for k, r in AdapterManager._hot_requests.items()
+                if now - r.last_access > AdapterManager.hot_request_window
+            ]:
+                del AdapterManager._hot_requests[request_key]
+            hot_requests = list(AdapterManager._hot_requests.items())
+
+        refresh_before = datetime.now() + timedelta(seconds=AdapterManager.expiry_sweep_interval)
+        for request_key, request in hot_requests:
+            if instance.expiry_sweeper_stop.is_set() or AdapterManager._offline_mode:
+                return
+            if not AdapterManager._ground_truth_can_do(request.function_name):
+                continue
+
+            expiration_time = caching_adapter.get_expiration_time(
+                request.cache_key, request_key[1]
+            )
+            if expiration_time is None or expiration_time > refresh_before:
+                continue
+
+            logging.info(f"Refreshing {request.function_name} before it expires.")
+            AdapterManager._create_coalesced_ground_truth_result(
+                request.function_name,
+                request.param,
+                request_key,
+                request.cache_key,
+                None,
+                None,
+                TaskPriority.BACKGROUND,
+                request.kwargs,
+            )
+
+    @staticmethod
+    def get_object_cache_stats() -> Dict[str, int]:
+        """
+        :returns: the size, hit, miss, and eviction counters of the in-memory object
+            cache.
+        """
+        return AdapterManager._object_cache.stats()
 
     @staticmethod
     def get_supported_artist_query_types() -> Set[AlbumSearchQuery.Type]:
@@ -537,6 +1591,9 @@ class AdapterManager:
         use_ground_truth_adapter: bool = False,
         allow_download: bool = True,
         on_result_finished: Callable[[Result], None] | None = None,
+        priority: TaskPriority = TaskPriority.VISIBLE,
+        on_revalidated: Callable[[Any], None] | None = None,
+        on_page: Callable[[Sequence[Any]], None] | None = None,
         **kwargs: Any,
     ) -> Result:
         """
@@ -552,27 +1609,101 @@ class AdapterManager:
         :param on_result_finished: A function to run after the result received from the
             ground truth adapter. (Has no effect if the result is from the caching
             adapter.)
+        :param priority: The :class:`TaskPriority` to use for the ground truth request.
+        :param on_revalidated: If given, use stale-while-revalidate: cached data (even
+            if it has been invalidated) is returned immediately, and the ground truth
+            adapter is queried in the background. If the data from the ground truth
+            adapter is different, this function is called with it.
+        :param on_page: If given, and the data is retrieved from the ground truth
+            adapter, this function is called (on a worker thread) with each page of the
+            data as soon as it arrives. The caching adapter ingests each page as well.
         :param kwargs: The keyword arguments to pass to the adapter function.
         """
         assert AdapterManager._instance
         logging.info(f"START: {function_name}")
+        start_time = monotonic()
+        metrics = AdapterManager.metrics
+        metrics_key = cache_key.name if cache_key else function_name
+
+        request_key = AdapterManager._request_key(function_name, param, kwargs)
+        if (
+            cache_key
+            and function_name.startswith("get_")
+            and (caching_adapter := AdapterManager._instance.caching_adapter)
+            and cache_key in caching_adapter.cache_ttls
+        ):
+            AdapterManager._record_hot_request(
+                request_key, function_name, param, cache_key, kwargs
+            )
+
+        if not allow_download and AdapterManager._instance.ground_truth_adapter.is_networked:
+            on_revalidated = None
+        revalidate = partial(
+            AdapterManager._revalidate,
+            function_name,
+            param,
+            request_key,
+            cache_key,
+            on_revalidated,
+            kwargs,
+        )
+
+        object_cache_key = None
+        if (
+            cache_key in AdapterManager._object_cache_keys
+            and isinstance(param, str)
+            and not kwargs
+            and AdapterManager._instance.caching_adapter
+        ):
+            object_cache_key = (cache_key, param)
+            if not use_ground_truth_adapter and (
+                cached_object := AdapterManager._object_cache.get(object_cache_key)
+            ):
+                logging.info(f"END: {function_name}: serving from object cache")
+                metrics.count_cache_lookup(metrics_key, "hit")
+                metrics.observe_latency(function_name, Metrics.CACHE_HIT, monotonic() - start_time)
+                revalidate(cached_object)
+                return Result(cached_object)
+
         partial_data = None
         if AdapterManager._can_use_cache(use_ground_truth_adapter, function_name):
             assert (caching_adapter := AdapterManager._instance.caching_adapter)
             try:
                 logging.info(f"END: {function_name}: serving from cache")
                 if param is None:
-                    return Result(getattr(caching_adapter, function_name)(**kwargs))
-                return Result(getattr(caching_adapter, function_name)(param, **kwargs))
+                    data = getattr(caching_adapter, function_name)(**kwargs)
+                else:
+                    generation = AdapterManager._object_cache.generation
+                    data = getattr(caching_adapter, function_name)(param, **kwargs)
+                    if object_cache_key:
+                        AdapterManager._object_cache.put(
+                            object_cache_key,
+                            data,
+                            generation,
+                            ttl=AdapterManager._get_object_cache_ttl(cache_key),
+                        )
+                metrics.count_cache_lookup(metrics_key, "hit")
+                metrics.observe_latency(function_name, Metrics.CACHE_HIT, monotonic() - start_time)
+                revalidate(data)
+                return Result(data)
             except CacheMissError as e:
                 partial_data = e.partial_data
+                metrics.count_cache_lookup(
+                    metrics_key, "partial" if partial_data is not None else "miss"
+                )
                 logging.info(f"Cache Miss on {function_name}.")
             except Exception:
                 logging.exception(f"Error on {function_name} retrieving from cache.")
 
-        param_str = param.strhash() if isinstance(param, AlbumSearchQuery) else param
+            if partial_data is not None and revalidate(partial_data, force=True):
+                logging.info(f"END: {function_name}: serving stale data from cache")
+                metrics.observe_latency(
+                    function_name, Metrics.PARTIAL_HIT, monotonic() - start_time
+                )
+                return Result(partial_data)
+
         if cache_key and AdapterManager._instance.caching_adapter and use_ground_truth_adapter:
-            AdapterManager._instance.caching_adapter.invalidate_data(cache_key, param_str)
+            AdapterManager._invalidate_data(cache_key, request_key[1])
 
         if (
             not allow_download and AdapterManager._instance.ground_truth_adapter.is_networked
@@ -584,27 +1715,275 @@ class AdapterManager:
 
             return Result(cache_miss_result)
 
-        result = AdapterManager._create_ground_truth_result(
+        result = AdapterManager._create_coalesced_ground_truth_result(
             function_name,
-            *((param,) if param is not None else ()),
-            before_download=before_download,
-            partial_data=partial_data,
-            **kwargs,
+            param,
+            request_key,
+            cache_key,
+            before_download,
+            partial_data,
+            priority,
+            kwargs,
+            on_page,
         )
 
-        if AdapterManager._instance.caching_adapter:
-            if cache_key:
-                result.add_done_callback(
-                    AdapterManager._create_caching_done_callback(cache_key, param_str)
-                )
+        if AdapterManager._instance.caching_adapter and on_result_finished:
+            result.add_done_callback(on_result_finished)
 
-            if on_result_finished:
-                result.add_done_callback(on_result_finished)
+        result.add_done_callback(
+            lambda _: metrics.observe_latency(
+                function_name, Metrics.GROUND_TRUTH, monotonic() - start_time
+            )
+        )
 
         logging.info(f"END: {function_name}")
         logging.debug(result)
         return result
 
+    @staticmethod
+    def _request_key(
+        function_name: str,
+        param: Optional[Union[str, AlbumSearchQuery]],
+        kwargs: Dict[str, Any],
+    ) -> Tuple[str, Optional[str], Tuple]:
+        """
+        :returns: the key that identifies identical requests to the ground truth adapter
+            (for coalescing and revalidating them): the function name, the parameter,
+            and the keyword arguments.
+        """
+        param_str = param.strhash() if isinstance(param, AlbumSearchQuery) else param
+        return (function_name, param_str, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+
+    @staticmethod
+    def _create_coalesced_ground_truth_result(
+        function_name: str,
+        param: Optional[Union[str, AlbumSearchQuery]],
+        request_key: Tuple[str, Optional[str], Tuple],
+        cache_key: CachingAdapter.CachedDataKey | None,
+        before_download: Callable[[], None] | None,
+        partial_data: Any,
+        priority: TaskPriority,
+        kwargs: Dict[str, Any],
+        on_page: Callable[[Sequence[Any]], None] | None = None,
+    ) -> Result:
+        """
+        Creates a Result for the given request on the ground truth adapter, joining the
+        identical request if one is already in flight. The caching adapter ingests the
+        data once it is returned.
+
+        If ``on_page`` is given, it is passed to the ground truth adapter function, and
+        the caching adapter ingests each page as it arrives. If the request is joined,
+        ``on_page`` is not called, and the caller only gets all of the data at the end.
+        """
+        assert AdapterManager._instance
+
+        # Only coalesce reads. Two identical concurrent writes (for example, creating
+        # two playlists with the same name) are still two separate requests.
+        coalesce = function_name.startswith("get_")
+
+        joined = False
+        with AdapterManager._in_flight_lock:
+            in_flight = AdapterManager._in_flight_requests.get(request_key) if coalesce else None
+            if in_flight is not None:
+                joined = True
+                AdapterManager.executor.promote(in_flight, priority)
+            else:
+                caching_done_callback = None
+                if AdapterManager._instance.caching_adapter and cache_key:
+                    # The data from reads is only cached, so it can be written behind.
+                    # The caller may read the results of writes back from the cache.
+                    caching_done_callback = AdapterManager._create_caching_done_callback(
+                        cache_key, request_key[1], write_behind=coalesce
+                    )
+                    if on_page:
+                        on_page, caching_done_callback = AdapterManager._create_page_ingester(
+                            cache_key, request_key[1], on_page, caching_done_callback
+                        )
+
+                shared_result = AdapterManager._create_ground_truth_result(
+                    function_name,
+                    *((param,) if param is not None else ()),
+                    before_download=before_download,
+                    partial_data=partial_data,
+                    priority=priority,
+                    **kwargs,
+                    **({"on_page": on_page} if on_page else {}),
+                )
+
+                # The cache only needs to ingest the data once, no matter how many
+                # callers are waiting on it.
+                if caching_done_callback:
+                    shared_result.add_done_callback(caching_done_callback)
+
+                assert shared_result._future
+                in_flight = shared_result._future
+                if coalesce:
+                    AdapterManager._in_flight_requests[request_key] = in_flight
+                    in_flight.add_done_callback(
+                        partial(AdapterManager._on_in_flight_request_done, request_key)
+                    )
+
+            if coalesce:
+                waiters = AdapterManager._in_flight_waiters
+                waiters[in_flight] = waiters.get(in_flight, 0) + 1
+
+        if joined:
+            logging.info(f"Joining in-flight request for {function_name}.")
+            if before_download:
+                before_download()
+
+        if not coalesce:
+            return shared_result
+
+        # Every caller gets its own future so that cancelling one caller's result does
+        # not cancel the request for everyone else. The request is only cancelled once
+        # nobody is waiting for it anymore.
+        return Result(
+            _chain_future(
+                in_flight,
+                partial(AdapterManager._on_in_flight_waiter_cancelled, request_key, in_flight),
+            )
+        )
+
+    @staticmethod
+    def _revalidate(
+        function_name: str,
+        param: Optional[Union[str, AlbumSearchQuery]],
+        request_key: Tuple[str, Optional[str], Tuple],
+        cache_key: CachingAdapter.CachedDataKey | None,
+        on_revalidated: Callable[[Any], None] | None,
+        kwargs: Dict[str, Any],
+        stale_data: Any,
+        force: bool = False,
+    ) -> bool:
+        """
+        Refresh data that was served from the cache in the background, and call
+        ``on_revalidated`` with the new data if it is different from ``stale_data``.
+
+        :param force: whether to revalidate even if the same request was revalidated
+            less than :class:`revalidation_interval` seconds ago.
+        :returns: whether or not the data will be revalidated.
+        """
+        assert AdapterManager._instance
+        if (
+            on_revalidated is None
+            or AdapterManager._offline_mode
+            or not AdapterManager._ground_truth_can_do(function_name)
+        ):
+            return False
+        callback = on_revalidated
+
+        now = monotonic()
+        with AdapterManager._in_flight_lock:
+            last_revalidation = AdapterManager._last_revalidation_times.get(request_key)
+            if (
+                not force
+                and last_revalidation is not None
+                and now - last_revalidation < AdapterManager.revalidation_interval
+            ):
+                return False
+            AdapterManager._last_revalidation_times[request_key] = now
+
+        logging.info(f"Revalidating {function_name}.")
+        result = AdapterManager._create_coalesced_ground_truth_result(
+            function_name,
+            param,
+            request_key,
+            cache_key,
+            None,
+            None,
+            TaskPriority.BACKGROUND,
+            kwargs,
+        )
+
+        def on_refreshed(f: Result):
+            try:
+                new_data = f.result()
+            except Exception:
+                logging.info(f"Failed to revalidate {function_name}.")
+                return
+
+            expected_type = AdapterManager._fingerprint_types.get(cache_key)
+            if AdapterManager._fingerprint(new_data, expected_type) != (
+                AdapterManager._fingerprint(stale_data, expected_type)
+            ):
+                callback(new_data)
+
+        result.add_done_callback(on_refreshed)
+        return True
+
+    # The type of the data stored under each cache key. This is used to determine which
+    # fields to compare when determining whether revalidated data has changed.
+    _fingerprint_types: Dict[Optional[CachingAdapter.CachedDataKey], type] = {
+        CachingAdapter.CachedDataKey.ALBUM: Album,
+        CachingAdapter.CachedDataKey.ALBUMS: Album,
+        CachingAdapter.CachedDataKey.ARTIST: Artist,
+        CachingAdapter.CachedDataKey.ARTISTS: Artist,
+        CachingAdapter.CachedDataKey.DIRECTORY: Directory,
+        CachingAdapter.CachedDataKey.GENRES: Genre,
+        CachingAdapter.CachedDataKey.PLAYLIST_DETAILS: Playlist,
+        CachingAdapter.CachedDataKey.PLAYLISTS: Playlist,
+        CachingAdapter.CachedDataKey.SONG: Song,
+    }
+    _fingerprint_field_types: Dict[str, type] = {
+        "albums": Album,
+        "similar_artists": Artist,
+        "songs": Song,
+    }
+
+    @staticmethod
+    def _fingerprint(data: Any, expected_type: type | None = None, depth: int = 0) -> Any:
+        """
+        Compute a hashable representation of the data that can be compared regardless
+        of whether it came from the caching adapter or the ground truth adapter. The
+        fields of ``expected_type`` are compared for top-level objects and the objects
+        in their lists (such as the songs of a playlist). Any other nested objects are
+        only compared by ID (or name if they don't have an ID).
+        """
+        if data is None or isinstance(data, (str, int, float, bool, datetime, timedelta)):
+            return data
+        if isinstance(data, (set, frozenset)):
+            return frozenset(data)
+        if isinstance(data, Iterable):
+            return tuple(AdapterManager._fingerprint(d, expected_type, depth) for d in data)
+        if expected_type is None or depth > 1:
+            return getattr(data, "id", None) or getattr(data, "name", None)
+
+        return tuple(
+            AdapterManager._fingerprint(
+                getattr(data, field, None),
+                AdapterManager._fingerprint_field_types.get(field),
+                depth + 1,
+            )
+            for field in expected_type.__annotations__
+        )
+
+    @staticmethod
+    def _on_in_flight_request_done(request_key: Tuple[str, Optional[str], Tuple], future: Future):
+        with AdapterManager._in_flight_lock:
+            if AdapterManager._in_flight_requests.get(request_key) is future:
+                del AdapterManager._in_flight_requests[request_key]
+            AdapterManager._in_flight_waiters.pop(future, None)
+
+    @staticmethod
+    def _on_in_flight_waiter_cancelled(
+        request_key: Tuple[str, Optional[str], Tuple], future: Future
+    ):
+        with AdapterManager._in_flight_lock:
+            if (waiters := AdapterManager._in_flight_waiters.get(future)) is None:
+                return  # The request is already done.
+            if waiters > 1:
+                AdapterManager._in_flight_waiters[future] = waiters - 1
+                return
+
+            # Nobody is waiting for the request anymore, so don't let any new callers
+            # join it.
+            del AdapterManager._in_flight_waiters[future]
+            if AdapterManager._in_flight_requests.get(request_key) is future:
+                del AdapterManager._in_flight_requests[request_key]
+
+        future.cancel()
+
     # Usage and Availability Properties
     # ==================================================================================
     @staticmethod
@@ -687,6 +2066,7 @@ class AdapterManager:
         before_download: Callable[[], None] = lambda: None,
         force: bool = False,  # TODO (#202): rename to use_ground_truth_adapter?
         allow_download: bool = True,
+        on_revalidated: Callable[[Sequence[Playlist]], None] | None = None,
     ) -> Result[Sequence[Playlist]]:
         return AdapterManager._get_from_cache_or_ground_truth(
             "get_playlists",
@@ -695,6 +2075,7 @@ class AdapterManager:
             before_download=before_download,
             use_ground_truth_adapter=force,
             allow_download=allow_download,
+            on_revalidated=on_revalidated,
         )
 
     @staticmethod
@@ -703,6 +2084,7 @@ class AdapterManager:
         before_download: Callable[[], None] = lambda: None,
         force: bool = False,  # TODO (#202): rename to use_ground_truth_adapter?
         allow_download: bool = True,
+        on_revalidated: Callable[[Playlist], None] | None = None,
     ) -> Result[Playlist]:
         return AdapterManager._get_from_cache_or_ground_truth(
             "get_playlist_details",
@@ -711,6 +2093,7 @@ class AdapterManager:
             before_download=before_download,
             use_ground_truth_adapter=force,
             allow_download=allow_download,
+            on_revalidated=on_revalidated,
         )
 
     @staticmethod
@@ -721,15 +2104,13 @@ class AdapterManager:
             assert AdapterManager._instance
             assert AdapterManager._instance.caching_adapter
             if playlist := f.result():
-                AdapterManager._instance.caching_adapter.ingest_new_data(
+                AdapterManager._ingest_new_data(
                     CachingAdapter.CachedDataKey.PLAYLIST_DETAILS,
                     playlist.id,
                     playlist,
                 )
             else:
-                AdapterManager._instance.caching_adapter.invalidate_data(
-                    CachingAdapter.CachedDataKey.PLAYLISTS, None
-                )
+                AdapterManager._invalidate_data(CachingAdapter.CachedDataKey.PLAYLISTS, None)
 
         return AdapterManager._get_from_cache_or_ground_truth(
             "create_playlist",
@@ -773,9 +2154,7 @@ class AdapterManager:
         ground_truth_adapter.delete_playlist(playlist_id)
 
         if AdapterManager._instance.caching_adapter:
-            AdapterManager._instance.caching_adapter.delete_data(
-                CachingAdapter.CachedDataKey.PLAYLIST_DETAILS, playlist_id
-            )
+            AdapterManager._delete_data(CachingAdapter.CachedDataKey.PLAYLIST_DETAILS, playlist_id)
 
     @staticmethod
     def set_song_rating(song: Song, rating: int | None) -> Result[None]:
@@ -796,7 +2175,7 @@ class AdapterManager:
                 assert AdapterManager._instance.caching_adapter
 
                 song.user_rating = rating
-                AdapterManager._instance.caching_adapter.ingest_new_data(
+                AdapterManager._ingest_new_data(
                     CachingAdapter.CachedDataKey.SONG_RATING, song.id, rating
                 )
 
@@ -820,6 +2199,7 @@ class AdapterManager:
         before_download: Callable[[], None] | None = None,
         force: bool = False,
         allow_download: bool = True,
+        priority: TaskPriority = TaskPriority.VISIBLE,
     ) -> Result[str]:
         existing_filename = str(resolve_path("adapters/images/default-album-art.png"))
         if not AdapterManager._ground_truth_can_do("get_cover_art_uri") or not cover_art_id:
@@ -854,7 +2234,7 @@ class AdapterManager:
 
             # If we are forcing, invalidate the existing cached data.
             if AdapterManager._instance.caching_adapter and force:
-                AdapterManager._instance.caching_adapter.invalidate_data(
+                AdapterManager._invalidate_data(
                     CachingAdapter.CachedDataKey.COVER_ART_FILE, cover_art_id
                 )
 
@@ -874,6 +2254,7 @@ class AdapterManager:
                 cover_art_id,
                 before_download,
                 default_value=existing_filename,
+                priority=priority,
             )
 
             if AdapterManager._instance.caching_adapter:
@@ -929,6 +2310,7 @@ class AdapterManager:
         on_song_download_complete: Callable[[str], None],
         one_at_a_time: bool = False,
         delay: float = 0.0,
+        priority: TaskPriority = TaskPriority.BACKGROUND,
     ) -> Result[None]:
         assert AdapterManager._instance
         if (
@@ -942,6 +2324,7 @@ class AdapterManager:
             return Result(None)
 
         cancelled = False
+        songs_details: Dict[str, Song] = {}
         AdapterManager._cancelled_song_ids -= set(song_ids)
 
         def do_download_song(song_id: str) -> Result:
@@ -977,9 +2360,19 @@ class AdapterManager:
                 # The song is not already cached.
                 before_download(song_id)
 
-                song = AdapterManager.get_song_details(song_id).result()
+                if not (song := songs_details.get(song_id)):
+                    song = AdapterManager.get_song_details(song_id, priority=priority).result()
 
-                # Download the song.
+                def ingest_song_file(song_tmp_filename: str, file_hash: str):
+                    AdapterManager._ingest_new_data(
+                        CachingAdapter.CachedDataKey.SONG_FILE,
+                        song_id,
+                        (None, song_tmp_filename, None, file_hash),
+                    )
+
+                # Download the song. If the song is already being downloaded (for
+                # example, by a prefetch), the download that is already in flight
+                # ingests the file.
                 song_tmp_filename_result: Result[str] = AdapterManager._create_download_result(
                     AdapterManager._instance.ground_truth_adapter.get_song_file_uri(
                         song_id, AdapterManager._get_networked_scheme()
@@ -987,19 +2380,16 @@ class AdapterManager:
                     song_id,
                     lambda: before_download(song_id),
                     expected_size=song.size,
+                    on_downloaded=ingest_song_file,
+                    priority=priority,
                 )
 
                 def on_download_done(f: Result):
                     assert AdapterManager._instance
-                    assert AdapterManager._instance.caching_adapter
                     AdapterManager._instance.download_limiter_semaphore.release()
 
                     try:
-                        AdapterManager._instance.caching_adapter.ingest_new_data(
-                            CachingAdapter.CachedDataKey.SONG_FILE,
-                            song_id,
-                            (None, f.result(), None),
-                        )
+                        f.result()
                     finally:
                         if AdapterManager._song_download_jobs.get(song_id):
                             del AdapterManager._song_download_jobs[song_id]
@@ -1024,6 +2414,15 @@ class AdapterManager:
                     DownloadProgress(DownloadProgress.Type.QUEUED),
                 )
 
+            # Get the details of all of the songs at once instead of one at a time for
+            # each download.
+            try:
+                songs_details.update(
+                    AdapterManager.get_songs_details(list(song_ids), priority=priority).result()
+                )
+            except Exception:
+                logging.exception("Failed to get the details of the songs to download.")
+
             for song_id in song_ids:
                 # Only allow a certain number of songs to be downloaded
                 # simultaneously.
@@ -1050,7 +2449,9 @@ class AdapterManager:
                     DownloadProgress(DownloadProgress.Type.CANCELLED),
                 )
 
-        return Result(do_batch_download_songs, is_download=True, on_cancel=on_cancel)
+        return Result(
+            do_batch_download_songs, is_download=True, on_cancel=on_cancel, priority=priority
+        )
 
     @staticmethod
     def cancel_download_songs(song_ids: Iterable[str]):
@@ -1090,9 +2491,7 @@ class AdapterManager:
 
         for song_id in song_ids:
             song = AdapterManager.get_song_details(song_id).result()
-            AdapterManager._instance.caching_adapter.delete_data(
-                CachingAdapter.CachedDataKey.SONG_FILE, song.id
-            )
+            AdapterManager._delete_data(CachingAdapter.CachedDataKey.SONG_FILE, song.id)
             on_song_delete(song_id)
 
     @staticmethod
@@ -1101,6 +2500,7 @@ class AdapterManager:
         allow_download: bool = True,
         before_download: Callable[[], None] = lambda: None,
         force: bool = False,
+        priority: TaskPriority = TaskPriority.VISIBLE,
     ) -> Result[Song]:
         return AdapterManager._get_from_cache_or_ground_truth(
             "get_song_details",
@@ -1109,8 +2509,138 @@ class AdapterManager:
             before_download=before_download,
             use_ground_truth_adapter=force,
             cache_key=CachingAdapter.CachedDataKey.SONG,
+            priority=priority,
         )
 
+    @staticmethod
+    def get_cached_songs_details(song_ids: Sequence[str]) -> Dict[str, Song]:
+        """
+        Get the details of all of the given songs that are validly cached. The songs are
+        looked up all together rather than one at a time.
+
+        :param song_ids: The IDs of the songs to get the details for.
+        :returns: A dictionary of song ID to :class:`Song` for the songs which are
+            cached.
+        """
+        assert AdapterManager._instance
+        if not AdapterManager._can_use_cache(False, "get_song_details"):
+            return {}
+
+        KEYS = CachingAdapter.CachedDataKey
+        object_cache = AdapterManager._object_cache
+        songs: Dict[str, Song] = {}
+        for song_id in song_ids:
+            if song := object_cache.get((KEYS.SONG, song_id)):
+                songs[song_id] = song
+
+        if missing := [song_id for song_id in song_ids if song_id not in songs]:
+            assert (caching_adapter := AdapterManager._instance.caching_adapter)
+            generation = object_cache.generation
+            try:
+                cached_songs = caching_adapter.get_songs_details(missing)
+            except Exception:
+                logging.exception("Error on get_songs_details retrieving from cache.")
+                cached_songs = {}
+
+            AdapterManager.metrics.count_cache_lookup(KEYS.SONG.name, "hit", len(cached_songs))
+            AdapterManager.metrics.count_cache_lookup(
+                KEYS.SONG.name, "miss", len(missing) - len(cached_songs)
+            )
+            for song_id, song in cached_songs.items():
+                object_cache.put(
+                    (KEYS.SONG, song_id),
+                    song,
+                    generation,
+                    ttl=AdapterManager._get_object_cache_ttl(KEYS.SONG),
+                )
+            songs.update(cached_songs)
+
+        return songs
+
+    @staticmethod
+    def get_songs_details(
+        song_ids: Sequence[str],
+        allow_download: bool = True,
+        priority: TaskPriority = TaskPriority.VISIBLE,
+    ) -> Result[Dict[str, Song]]:
+        """
+        Get the details of many songs at once. The cached songs are retrieved using
+        :class:`get_cached_songs_details`. The rest of the songs are requested from the
+        ground truth adapter in parallel (joining any identical requests that are
+        already in flight), and the ingest queue ingests them into the caching adapter
+        together.
+
+        :param song_ids: The IDs of the songs to get the details for.
+        :param allow_download: Whether or not to allow network requests to retrieve the
+            songs that aren't cached.
+        :param priority: The :class:`TaskPriority` to use for the ground truth requests.
+        :returns: A dictionary of song ID to :class:`Song` in the same order as
+            ``song_ids``. If the details of a song can't be retrieved from the ground
+            truth adapter, the invalidated data from the caching adapter is used
+            instead. If there is none, the song is left out.
+        """
+        assert AdapterManager._instance
+        start_time = monotonic()
+        song_ids = list(dict.fromkeys(song_ids))
+        songs = AdapterManager.get_cached_songs_details(song_ids)
+        missing = [song_id for song_id in song_ids if song_id not in songs]
+        if not missing:
+            AdapterManager.metrics.observe_latency(
+                "get_songs_details", Metrics.CACHE_HIT, monotonic() - start_time
+            )
+            return Result({song_id: songs[song_id] for song_id in song_ids})
+
+        can_download = (
+            allow_download or not AdapterManager._instance.ground_truth_adapter.is_networked
+        ) and AdapterManager._ground_truth_can_do("get_song_details")
+
+        def get_partial_song(song_id: str) -> Optional[Song]:
+            assert AdapterManager._instance
+            if not (caching_adapter := AdapterManager._instance.caching_adapter):
+                return None
+            try:
+                return caching_adapter.get_song_details(song_id)
+            except CacheMissError as e:
+                return e.partial_data
+            except Exception:
+                return None
+
+        def do_get_songs_details() -> Dict[str, Song]:
+            assert AdapterManager._instance
+            song_results = {
+                song_id: AdapterManager._create_coalesced_ground_truth_result(
+                    "get_song_details",
+                    song_id,
+                    request_key=AdapterManager._request_key("get_song_details", song_id, {}),
+                    cache_key=CachingAdapter.CachedDataKey.SONG,
+                    before_download=None,
+                    partial_data=None,
+                    priority=priority,
+                    kwargs={},
+                )
+                for song_id in (missing if can_download else [])
+            }
+
+            new_songs: Dict[str, Song] = {}
+            for song_id in missing:
+                try:
+                    if song_result := song_results.get(song_id):
+                        new_songs[song_id] = song_result.result()
+                        continue
+                except CacheMissError:
+                    logging.info(f"Cache Miss on get_song_details for {song_id}.")
+
+                if song := get_partial_song(song_id):
+                    songs[song_id] = song
+
+            songs.update(new_songs)
+            AdapterManager.metrics.observe_latency(
+                "get_songs_details", Metrics.GROUND_TRUTH, monotonic() - start_time
+            )
+            return {song_id: songs[song_id] for song_id in song_ids if song_id in songs}
+
+        return Result(do_get_songs_details, priority=priority)
+
     @staticmethod
     def get_genres(force: bool = False) -> Result[Sequence[Genre]]:
         return AdapterManager._get_from_cache_or_ground_truth(
@@ -1127,19 +2657,30 @@ class AdapterManager:
 
     @staticmethod
     def get_artists(
-        force: bool = False, before_download: Callable[[], None] = lambda: None
+        force: bool = False,
+        before_download: Callable[[], None] = lambda: None,
+        on_revalidated: Callable[[Sequence[Artist]], None] | None = None,
     ) -> Result[Sequence[Artist]]:
-        def do_get_artists() -> Sequence[Artist]:
+        def sort_artists(artists: Iterable[Artist]) -> Sequence[Artist]:
             return AdapterManager.sort_by_ignored_articles(
+                artists, key=lambda a: a.name, use_ground_truth_adapter=force
+            )
+
+        def on_artists_revalidated(artists: Sequence[Artist]):
+            if on_revalidated:
+                on_revalidated(sort_artists(artists))
+
+        def do_get_artists() -> Sequence[Artist]:
+            use_ground_truth_adapter = force and AdapterManager._library_may_have_changed()
+            return sort_artists(
                 AdapterManager._get_from_cache_or_ground_truth(
                     "get_artists",
                     None,
-                    use_ground_truth_adapter=force,
+                    use_ground_truth_adapter=use_ground_truth_adapter,
                     before_download=before_download,
                     cache_key=CachingAdapter.CachedDataKey.ARTISTS,
-                ).result(),
-                key=lambda a: a.name,
-                use_ground_truth_adapter=force,
+                    on_revalidated=on_artists_revalidated if on_revalidated else None,
+                ).result()
             )
 
         return Result(do_get_artists)
@@ -1191,6 +2732,7 @@ class AdapterManager:
         artist_id: str,
         before_download: Callable[[], None] = lambda: None,
         force: bool = False,
+        on_revalidated: Callable[[Artist], None] | None = None,
     ) -> Result[Artist]:
         def on_result_finished(f: Result[Artist]):
             if not force:
@@ -1200,9 +2742,7 @@ class AdapterManager:
             assert AdapterManager._instance.caching_adapter
             if artist := f.result():
                 for album in artist.albums or []:
-                    AdapterManager._instance.caching_adapter.invalidate_data(
-                        CachingAdapter.CachedDataKey.ALBUM, album.id
-                    )
+                    AdapterManager._invalidate_data(CachingAdapter.CachedDataKey.ALBUM, album.id)
 
         return AdapterManager._get_from_cache_or_ground_truth(
             "get_artist",
@@ -1211,6 +2751,7 @@ class AdapterManager:
             use_ground_truth_adapter=force,
             cache_key=CachingAdapter.CachedDataKey.ARTIST,
             on_result_finished=on_result_finished,
+            on_revalidated=on_revalidated,
         )
 
     # Albums
@@ -1220,21 +2761,43 @@ class AdapterManager:
         sort_direction: str = "ascending",
         before_download: Callable[[], None] = lambda: None,
         use_ground_truth_adapter: bool = False,
+        on_revalidated: Callable[[Sequence[Album]], None] | None = None,
+        on_page: Callable[[Sequence[Album]], None] | None = None,
     ) -> Result[Sequence[Album]]:
-        return AdapterManager._get_from_cache_or_ground_truth(
-            "get_albums",
-            query,
-            sort_direction=sort_direction,
-            cache_key=CachingAdapter.CachedDataKey.ALBUMS,
-            before_download=before_download,
-            use_ground_truth_adapter=use_ground_truth_adapter,
-        )
+        """
+        Get the albums matching the query.
+
+        :param on_page: If the albums have to be retrieved from the ground truth
+            adapter, this function is called (on a worker thread) with each page of
+            albums, in order, as soon as it arrives, so that the albums can be shown
+            before all of them have been retrieved. The result still has all of the
+            albums once they have all been retrieved.
+        """
+
+        def do_get_albums(use_ground_truth_adapter: bool) -> Result[Sequence[Album]]:
+            return AdapterManager._get_from_cache_or_ground_truth(
+                "get_albums",
+                query,
+                sort_direction=sort_direction,
+                cache_key=CachingAdapter.CachedDataKey.ALBUMS,
+                before_download=before_download,
+                use_ground_truth_adapter=use_ground_truth_adapter,
+                on_revalidated=on_revalidated,
+                on_page=on_page,
+            )
+
+        if use_ground_truth_adapter and query.type in AdapterManager._library_album_query_types:
+            return Result(
+                lambda: do_get_albums(AdapterManager._library_may_have_changed()).result()
+            )
+        return do_get_albums(use_ground_truth_adapter)
 
     @staticmethod
     def get_album(
         album_id: str,
         before_download: Callable[[], None] = lambda: None,
         force: bool = False,
+        on_revalidated: Callable[[Album], None] | None = None,
     ) -> Result[Album]:
         return AdapterManager._get_from_cache_or_ground_truth(
             "get_album",
@@ -1242,6 +2805,7 @@ class AdapterManager:
             before_download=before_download,
             use_ground_truth_adapter=force,
             cache_key=CachingAdapter.CachedDataKey.ALBUM,
+            on_revalidated=on_revalidated,
         )
 
     # Browse
@@ -1252,11 +2816,14 @@ class AdapterManager:
         force: bool = False,
     ) -> Result[Directory]:
         def do_get_directory() -> Directory:
+            use_ground_truth_adapter = force
+            if force and directory_id == "root":
+                use_ground_truth_adapter = AdapterManager._library_may_have_changed()
             directory: Directory = AdapterManager._get_from_cache_or_ground_truth(
                 "get_directory",
                 directory_id,
                 before_download=before_download,
-                use_ground_truth_adapter=force,
+                use_ground_truth_adapter=use_ground_truth_adapter,
                 cache_key=CachingAdapter.CachedDataKey.DIRECTORY,
             ).result()
             directory.children = AdapterManager.sort_by_ignored_articles(
@@ -1350,10 +2917,11 @@ class AdapterManager:
                 logging.exception("Failed getting search results from server for query '{query}'")
 
             if AdapterManager._instance.caching_adapter:
-                AdapterManager._instance.caching_adapter.ingest_new_data(
+                AdapterManager._ingest_new_data(
                     CachingAdapter.CachedDataKey.SEARCH_RESULTS,
                     None,
                     ground_truth_search_results,
+                    write_behind=True,
                 )
 
             return False
@@ -1364,7 +2932,7 @@ class AdapterManager:
             nonlocal cancelled
             cancelled = True
 
-        return Result(do_search, on_cancel=on_cancel)
+        return Result(do_search, on_cancel=on_cancel, priority=TaskPriority.INTERACTIVE)
 
     # Cache Status Methods
     # ==================================================================================
@@ -1390,15 +2958,13 @@ class AdapterManager:
         assert AdapterManager._instance
         if not AdapterManager._instance.caching_adapter:
             return
-        AdapterManager._instance.caching_adapter.delete_data(
-            CachingAdapter.CachedDataKey.ALL_SONGS, None
-        )
+        AdapterManager._delete_data(CachingAdapter.CachedDataKey.ALL_SONGS, None)
+        AdapterManager._instance.prune_partial_downloads()
 
     @staticmethod
     def clear_entire_cache():
         assert AdapterManager._instance
         if not AdapterManager._instance.caching_adapter:
             return
-        AdapterManager._instance.caching_adapter.delete_data(
-            CachingAdapter.CachedDataKey.EVERYTHING, None
-        )
+        AdapterManager._delete_data(CachingAdapter.CachedDataKey.EVERYTHING, None)
+        AdapterManager._instance.prune_partial_downloads()
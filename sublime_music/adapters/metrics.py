@@ -0,0 +1,134 @@
+import bisect
+import json
+import threading
+from collections import defaultdict
+from pathlib import Path
+from typing import Any, DefaultDict, Dict, Tuple
+
+
+class LatencyHistogram:
+    """
+    A histogram of latencies (in seconds) with fixed bucket boundaries.
+    """
+
+    # The upper bounds of the buckets, in seconds. Anything larger than the last
+    # boundary goes into an overflow bucket.
+    BUCKETS: Tuple[float, ...] = (
+        0.001,
+        0.0025,
+        0.005,
+        0.01,
+        0.025,
+        0.05,
+        0.1,
+        0.25,
+        0.5,
+        1,
+        2.5,
+        5,
+        10,
+        30,
+    )
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> Dict[str, Any]:
+        bucket_names = [f"le_{b}" for b in self.BUCKETS] + ["le_inf"]
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "max": self.max,
+            "buckets": dict(zip(bucket_names, self.counts)),
+        }
+
+
+class Metrics:
+    """
+    A thread-safe collection of the counters and latency histograms that the
+    :class:`AdapterManager` keeps about the requests that it serves.
+    """
+
+    # The sources that a request can be served from.
+    CACHE_HIT = "cache_hit"
+    PARTIAL_HIT = "partial_hit"
+    GROUND_TRUTH = "ground_truth"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._latencies: DefaultDict[str, DefaultDict[str, LatencyHistogram]] = defaultdict(
+            lambda: defaultdict(LatencyHistogram)
+        )
+        self._cache_lookups: DefaultDict[str, DefaultDict[str, int]] = defaultdict(
+            lambda: defaultdict(int)
+        )
+        self.bytes_downloaded = 0
+
+    def observe_latency(self, method: str, source: str, seconds: float):
+        """
+        Record the latency of a request.
+
+        :param method: the name of the adapter method.
+        :param source: where the request was served from. One of ``CACHE_HIT``,
+            ``PARTIAL_HIT``, or ``GROUND_TRUTH``.
+        :param seconds: how long it took to get the data.
+        """
+        with self._lock:
+            self._latencies[method][source].observe(seconds)
+
+    def count_cache_lookup(self, cache_key: str, outcome: str, count: int = 1):
+        """
+        Count lookups in the caching adapter.
+
+        :param cache_key: the name of the ``CachedDataKey`` that was looked up.
+        :param outcome: ``"hit"``, ``"partial"`` (only invalid or expired data was
+            available), or ``"miss"``.
+        :param count: the number of lookups with this outcome.
+        """
+        with self._lock:
+            self._cache_lookups[cache_key][outcome] += count
+
+    def add_bytes_downloaded(self, num_bytes: int):
+        with self._lock:
+            self.bytes_downloaded += num_bytes
+
+    def reset(self):
+        with self._lock:
+            self._latencies.clear()
+            self._cache_lookups.clear()
+            self.bytes_downloaded = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "latencies": {
+                    method: {source: h.to_dict() for source, h in histograms.items()}
+                    for method, histograms in self._latencies.items()
+                },
+                "cache_lookups": {
+                    cache_key: dict(outcomes)
+                    for cache_key, outcomes in self._cache_lookups.items()
+                },
+                "bytes_downloaded": self.bytes_downloaded,
+            }
+
+    @staticmethod
+    def dump(path: Path, metrics: Dict[str, Any]):
+        """
+        Write the given metrics to ``path`` as JSON.
+        """
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(".tmp")
+        with open(tmp_path, "w+") as f:
+            json.dump(metrics, f, indent=2, default=str)
+        tmp_path.replace(path)
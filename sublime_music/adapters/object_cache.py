@@ -0,0 +1,96 @@
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Any, Callable, Dict, Generic, Hashable, Optional, Tuple, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class ObjectCache(Generic[K]):
+    """
+    A thread-safe, size-bounded, least-recently-used cache of hydrated objects. This is
+    used by the :class:`AdapterManager` to avoid going to the caching adapter (and its
+    database) for objects that are read over and over again.
+
+    Every invalidation bumps the cache's ``generation``. A caller that reads an object
+    from the underlying store should capture the generation before the read and pass it
+    to :class:`put` so that an object read before a concurrent invalidation is not put
+    back into the cache.
+
+    Objects can also be put into the cache with a time-to-live, after which they are
+    treated as if they were not in the cache.
+    """
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[K, Tuple[Any, Optional[float]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.generation = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: K) -> Optional[Any]:
+        with self._lock:
+            if (entry := self._entries.get(key)) is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = entry
+            if expires_at is not None and monotonic() >= expires_at:
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(
+        self,
+        key: K,
+        value: Any,
+        generation: int | None = None,
+        ttl: float | None = None,
+    ):
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+
+            self._entries[key] = (value, monotonic() + ttl if ttl is not None else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key: K):
+        with self._lock:
+            self.generation += 1
+            self._entries.pop(key, None)
+
+    def invalidate_where(self, predicate: Callable[[K], bool]):
+        with self._lock:
+            self.generation += 1
+            for key in [k for k in self._entries if predicate(k)]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self.generation += 1
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
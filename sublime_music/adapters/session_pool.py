@@ -0,0 +1,92 @@
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter, Retry
+
+
+class HTTPSessionPool:
+    """
+    A pool of keep-alive HTTP connections, shared by all of the requests that are made
+    to a provider's server (API calls as well as song and cover art downloads), so that
+    each request doesn't have to do a new TCP and TLS handshake.
+
+    Failed connection attempts and ``502``, ``503``, and ``504`` responses are retried
+    with exponential backoff.
+    """
+
+    def __init__(self, pool_size: int = 10, max_retries: int = 2, verify: bool = True):
+        """
+        :param pool_size: the maximum number of connections to keep open to each host.
+        :param max_retries: the number of times to retry a failed request.
+        :param verify: whether or not to verify the SSL certificate of the server.
+        """
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.verify = verify
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._adapter: Optional[HTTPAdapter] = None
+        self._pid: Optional[int] = None
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            # Connections can't be shared with a forked process (such as the ping
+            # process of the Subsonic adapter), so it gets its own session.
+            if self._session is None or self._pid != os.getpid():
+                self._session = self._create_session()
+                self._pid = os.getpid()
+            return self._session
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        return self.session.get(url, **kwargs)
+
+    def close(self):
+        with self._lock:
+            if self._session is not None and self._pid == os.getpid():
+                self._session.close()
+            self._session = None
+            self._adapter = None
+
+    def connection_stats(self) -> Dict[str, Dict[str, int]]:
+        """
+        :returns: the number of connections that have been opened to each host, the
+            number of requests that have been made to it, and how many of those
+            requests reused an existing connection.
+        """
+        stats: Dict[str, Dict[str, int]] = {}
+        with self._lock:
+            if self._adapter is None or self._pid != os.getpid():
+                return stats
+            pools: Any = self._adapter.poolmanager.pools
+
+        for key in list(pools.keys()):
+            if (pool := pools.get(key)) is None:
+                continue
+            host_stats = stats.setdefault(
+                f"{key.key_scheme}://{key.key_host}:{key.key_port}",
+                {"connections": 0, "requests": 0, "reused": 0},
+            )
+            host_stats["connections"] += pool.num_connections
+            host_stats["requests"] += pool.num_requests
+            host_stats["reused"] += max(0, pool.num_requests - pool.num_connections)
+        return stats
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        session.verify = self.verify
+        self._adapter = adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=self.pool_size,
+            max_retries=Retry(
+                total=self.max_retries,
+                backoff_factor=0.5,
+                status_forcelist=(502, 503, 504),
+                raise_on_status=False,
+            ),
+        )
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import json
 import logging
@@ -8,10 +9,24 @@ import pickle
 import random
 import string
 import tempfile
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime, timedelta
 from pathlib import Path
 from time import sleep
-from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union, cast
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+    cast,
+)
 from urllib.parse import urlencode, urlparse
 
 import requests
@@ -22,14 +37,19 @@ from sublime_music.util import resolve_path
 
 from .. import (
     Adapter,
+    AdaptiveConcurrencyLimiter,
     AlbumSearchQuery,
     ConfigParamDescriptor,
     ConfigurationStore,
     ConfigureServerForm,
+    LibraryChanges,
     UIInfo,
     api_objects as API,
 )
-from .api_objects import Directory, Response
+from ..session_pool import HTTPSessionPool
+from .api_objects import Directory, Indexes, Response
+from .async_engine import AsyncNetworkEngine, aiohttp_imported
+from .decoder import decode, parse_iso8601
 
 try:
     import gi
@@ -55,6 +75,9 @@ NETWORK_ALWAYS_ERROR: bool = False
 if always_error := os.environ.get("NETWORK_ALWAYS_ERROR"):
     NETWORK_ALWAYS_ERROR = True
 
+# Responses with these status codes mean that the server is overloaded.
+OVERLOADED_STATUS_CODES = {429, 500, 502, 503, 504}
+
 
 class ServerError(Exception):
     def __init__(self, status_code: int, message: str):
@@ -108,8 +131,29 @@ class SubsonicAdapter(Adapter):
                 "instead of the plain password in the request urls (only supported on "
                 "Subsonic API 1.13.0+)",
             ),
+            "connection_pool_size": ConfigParamDescriptor(
+                int,
+                "Connection Pool Size",
+                default=10,
+                advanced=True,
+                numeric_bounds=(1, 64),
+                helptext="The maximum number of connections to keep open to the "
+                "server. Reusing connections avoids having to connect to the server "
+                "for every request.",
+            ),
         }
 
+        if aiohttp_imported:
+            configs["use_async_network_engine"] = ConfigParamDescriptor(
+                bool,
+                "Use Asynchronous Networking",
+                default=False,
+                advanced=True,
+                helptext="If toggled, Sublime Music will request song, album, and "
+                "playlist details from the server using a single background thread, "
+                "which allows many more requests to be in flight at once.",
+            )
+
         if networkmanager_imported:
             configs.update(
                 {
@@ -199,6 +243,8 @@ class SubsonicAdapter(Adapter):
     def migrate_configuration(config_store: ConfigurationStore):
         if "salt_auth" not in config_store:
             config_store["salt_auth"] = True
+        if "connection_pool_size" not in config_store:
+            config_store["connection_pool_size"] = 10
 
     def __init__(self, config: ConfigurationStore, data_directory: Path):
         self.data_directory = data_directory
@@ -236,6 +282,16 @@ class SubsonicAdapter(Adapter):
         self.password = cast(str, config.get_secret("password"))
         self.verify_cert = config["verify_cert"]
         self.use_salt_auth = config["salt_auth"]
+        self._session_pool = HTTPSessionPool(
+            pool_size=config.get("connection_pool_size", 10), verify=self.verify_cert
+        )
+        # There's no point in allowing more requests at once than there are connections.
+        self._concurrency_limiter = AdaptiveConcurrencyLimiter(
+            max_limit=self._session_pool.pool_size
+        )
+        self._async_engine: Optional[AsyncNetworkEngine] = None
+        if config.get("use_async_network_engine") and aiohttp_imported:
+            self._async_engine = AsyncNetworkEngine(verify=self.verify_cert)
 
         self.is_shutting_down = False
         self._ping_process: Optional[multiprocessing.Process] = None
@@ -251,6 +307,9 @@ class SubsonicAdapter(Adapter):
     def shutdown(self):
         if self._ping_process:
             self._ping_process.terminate()
+        self._session_pool.close()
+        if self._async_engine:
+            self._async_engine.close()
 
     # Availability Properties
     # ==================================================================================
@@ -297,6 +356,14 @@ class SubsonicAdapter(Adapter):
     def on_offline_mode_change(self, offline_mode: bool):
         self._offline_mode = offline_mode
 
+    @property
+    def http_session_pool(self) -> HTTPSessionPool:
+        return self._session_pool
+
+    @property
+    def concurrency_limiter(self) -> AdaptiveConcurrencyLimiter:
+        return self._concurrency_limiter
+
     @property
     def ping_status(self) -> bool:
         # typing doesn't support multiprocessing.Value very well
@@ -311,6 +378,7 @@ class SubsonicAdapter(Adapter):
     can_get_cover_art_uri = True
     can_get_directory = True
     can_get_ignored_articles = True
+    can_get_library_changes = True
     can_get_playlist_details = True
     can_get_playlists = True
     can_get_song_details = True
@@ -322,6 +390,33 @@ class SubsonicAdapter(Adapter):
     can_stream = True
     can_update_playlist = True
 
+    # The methods that can be run on the asyncio network engine (if it is enabled): the
+    # endpoint to request, and a function to get the result from the response.
+    _async_methods: Dict[str, Tuple[str, Callable[[Response], Any]]] = {
+        "get_album": ("getAlbum", lambda r: r.album),
+        "get_playlist_details": ("getPlaylist", lambda r: r.playlist),
+        "get_song_details": ("getSong", lambda r: r.song),
+    }
+
+    def call_async(self, function_name: str, *args, **kwargs) -> Optional[Future]:
+        if (
+            not self._async_engine
+            or function_name not in self._async_methods
+            or len(args) != 1
+            or kwargs
+        ):
+            return None
+
+        endpoint, get_result = self._async_methods[function_name]
+        item_id = args[0]
+
+        async def do_request() -> Any:
+            result = get_result(await self._get_json_async(self._make_url(endpoint), id=item_id))
+            assert result, f"Error getting {endpoint} {item_id}"
+            return result
+
+        return self._async_engine.submit(do_request())
+
     def version_at_least(self, version: str) -> bool:
         # typing doesn't support multiprocessing.Value very well
         if v := self._version.value:  # type: ignore
@@ -405,8 +500,6 @@ class SubsonicAdapter(Adapter):
     def _make_url(self, endpoint: str) -> str:
         return f"{self.hostname}/rest/{endpoint}.view"
 
-    # TODO (#196) figure out some way of rate limiting requests. They often come in too
-    # fast.
     def _get(
         self,
         url: str,
@@ -414,7 +507,13 @@ class SubsonicAdapter(Adapter):
         is_exponential_backoff_ping: bool = False,
         **params,
     ) -> Any:
-        params = {**self._get_params(), **params}
+        """
+        Make a get request. Requests often come in faster than the server can handle
+        them, so the number of requests in flight at once is limited by the
+        :class:`AdaptiveConcurrencyLimiter` (except for the pings, since they are how
+        the adapter finds out that the server is available again).
+        """
+        params = self._get_request_params(params)
         logging.info(f"[START] get: {url}")
 
         try:
@@ -433,67 +532,133 @@ class SubsonicAdapter(Adapter):
             if NETWORK_ALWAYS_ERROR:
                 raise ServerError(69, "NETWORK_ALWAYS_ERROR enabled")
 
-            # Deal with datetime parameters (convert to milliseconds since 1970)
-            for k, v in params.items():
-                if isinstance(v, datetime):
-                    params[k] = int(v.timestamp() * 1000)
-
             if self._is_mock:
                 logging.info("Using mock data")
                 result = self._get_mock_data()
+            elif is_exponential_backoff_ping:
+                result = self._do_get(url, params, timeout)
             else:
-                if url.startswith("http://") or url.startswith("https://"):
-                    result = requests.get(
-                        url,
-                        params=params,
-                        verify=self.verify_cert,
-                        timeout=timeout,
-                    )
-                else:
-                    # if user creates a serverconf address w/o protocol, we'll
-                    # attempt to fix it and store it in hostname
-                    # TODO (#305) #hostname currently preprends https:// if
-                    # protocol isn't defined this might be able to be taken out
-                    try:
-                        logging.info("Hostname: %r has no protocol", self.hostname)
-                        result = requests.get(
-                            "https://" + url,
-                            params=params,
-                            verify=self.verify_cert,
-                            timeout=timeout,
-                        )
-                        self.hostname = "https://" + url.split("/")[0]
-                    except Exception:
-                        result = requests.get(
-                            "http://" + url,
-                            params=params,
-                            verify=self.verify_cert,
-                            timeout=timeout,
-                        )
+                start_time = self._concurrency_limiter.acquire()
+                overloaded = False
+                try:
+                    result = self._do_get(url, params, timeout)
+                    overloaded = result.status_code in OVERLOADED_STATUS_CODES
+                except (requests.Timeout, requests.ConnectionError):
+                    overloaded = True
+                    raise
+                finally:
+                    self._concurrency_limiter.release(start_time, overloaded)
+
+            self._on_request_succeeded(url, result)
+        except Exception:
+            self._on_request_failed(url, is_exponential_backoff_ping)
+            raise
 
-                        self.hostname = "http://" + url.split("/")[0]
+        logging.info(f"[FINISH] get: {url}")
+        return result
 
-            if result.status_code != 200:
-                raise ServerError(
-                    result.status_code, f"{url} returned status={result.status_code}."
-                )
-            # Any time that a server request succeeds, then we win.
-            # typing doesn't support multiprocessing.Value very well
-            self._server_available.value = True  # type: ignore
-            self._last_ping_timestamp.value = datetime.now().timestamp()  # type: ignore
+    def _do_get(
+        self, url: str, params: Dict[str, Any], timeout: Union[float, Tuple[float, float], None]
+    ) -> Any:
+        if url.startswith("http://") or url.startswith("https://"):
+            return self._session_pool.get(
+                url,
+                params=params,
+                verify=self.verify_cert,
+                timeout=timeout,
+            )
 
+        # if user creates a serverconf address w/o protocol, we'll
+        # attempt to fix it and store it in hostname
+        # TODO (#305) #hostname currently preprends https:// if
+        # protocol isn't defined this might be able to be taken out
+        try:
+            logging.info("Hostname: %r has no protocol", self.hostname)
+            result = self._session_pool.get(
+                "https://" + url,
+                params=params,
+                verify=self.verify_cert,
+                timeout=timeout,
+            )
+            self.hostname = "https://" + url.split("/")[0]
         except Exception:
-            logging.exception(f"[FAIL] get: {url} failed")
-            # typing doesn't support multiprocessing.Value very well
-            self._server_available.value = False  # type: ignore
-            self._last_ping_timestamp.value = datetime.now().timestamp()  # type: ignore
-            if not is_exponential_backoff_ping:
-                self._exponential_backoff(5)
+            result = self._session_pool.get(
+                "http://" + url,
+                params=params,
+                verify=self.verify_cert,
+                timeout=timeout,
+            )
+
+            self.hostname = "http://" + url.split("/")[0]
+        return result
+
+    async def _get_async(
+        self,
+        url: str,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        **params,
+    ) -> Any:
+        """
+        The same as :class:`_get`, but the request is made on the asyncio network
+        engine. This must be awaited on the event loop of the engine.
+        """
+        assert self._async_engine
+        params = self._get_request_params(params)
+        logging.info(f"[START] async get: {url}")
+
+        try:
+            if REQUEST_DELAY is not None:
+                delay = random.uniform(*REQUEST_DELAY)
+                logging.info(f"REQUEST_DELAY enabled. Pausing for {delay} seconds")
+                await asyncio.sleep(delay)
+
+            if NETWORK_ALWAYS_ERROR:
+                raise ServerError(69, "NETWORK_ALWAYS_ERROR enabled")
+
+            if self._is_mock:
+                logging.info("Using mock data")
+                result = self._get_mock_data()
+            else:
+                result = await self._async_engine.get(url, params, timeout=timeout)
+
+            self._on_request_succeeded(url, result)
+        except Exception:
+            self._on_request_failed(url, False)
             raise
 
-        logging.info(f"[FINISH] get: {url}")
+        logging.info(f"[FINISH] async get: {url}")
         return result
 
+    def _get_request_params(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        params = {**self._get_params(), **params}
+
+        # Deal with datetime parameters (convert to milliseconds since 1970)
+        for k, v in params.items():
+            if isinstance(v, datetime):
+                params[k] = int(v.timestamp() * 1000)
+
+        return params
+
+    def _on_request_succeeded(self, url: str, result: Any):
+        if result.status_code != 200:
+            raise ServerError(result.status_code, f"{url} returned status={result.status_code}.")
+        # Any time that a server request succeeds, then we win.
+        # typing doesn't support multiprocessing.Value very well
+        self._server_available.value = True  # type: ignore
+        self._last_ping_timestamp.value = datetime.now().timestamp()  # type: ignore
+
+    def _on_request_failed(self, url: str, is_exponential_backoff_ping: bool):
+        logging.exception(f"[FAIL] get: {url} failed")
+        # typing doesn't support multiprocessing.Value very well
+        self._server_available.value = False  # type: ignore
+        self._last_ping_timestamp.value = datetime.now().timestamp()  # type: ignore
+
+        # If the pings are already running, don't restart them for every request that
+        # fails while they are running.
+        if is_exponential_backoff_ping or (self._ping_process and self._ping_process.is_alive()):
+            return
+        self._exponential_backoff(5)
+
     def _get_json(
         self,
         url: str,
@@ -514,6 +679,22 @@ class SubsonicAdapter(Adapter):
             is_exponential_backoff_ping=is_exponential_backoff_ping,
             **params,
         )
+        return self._parse_json_response(url, result)
+
+    async def _get_json_async(
+        self,
+        url: str,
+        timeout: Union[float, Tuple[float, float], None] = None,
+        **params: Union[None, str, datetime, int, Sequence[int], Sequence[str]],
+    ) -> Response:
+        """
+        The same as :class:`_get_json`, but the request is made on the asyncio network
+        engine. This must be awaited on the event loop of the engine.
+        """
+        result = await self._get_async(url, timeout=timeout, **params)
+        return self._parse_json_response(url, result)
+
+    def _parse_json_response(self, url: str, result: Any) -> Response:
         subsonic_response = result.json().get("subsonic-response")
 
         if not subsonic_response:
@@ -529,7 +710,7 @@ class SubsonicAdapter(Adapter):
         self._version.value = subsonic_response["version"].encode()  # type: ignore
 
         logging.debug(f"Response from {url}: {subsonic_response}")
-        return Response.from_dict(subsonic_response)
+        return decode(Response, subsonic_response)
 
     # Helper Methods for Testing
     _get_mock_data: Any = None
@@ -682,8 +863,14 @@ class SubsonicAdapter(Adapter):
 
         return set(ignored_articles.split())
 
+    # The maximum number of getAlbumList2 pages to request at once.
+    max_album_pages_in_flight = 6
+
     def get_albums(
-        self, query: AlbumSearchQuery, sort_direction: str = "ascending"
+        self,
+        query: AlbumSearchQuery,
+        sort_direction: str = "ascending",
+        on_page: Optional[Callable[[Sequence[API.Album]], None]] = None,
     ) -> Sequence[API.Album]:
         type_ = {
             AlbumSearchQuery.Type.RANDOM: "random",
@@ -706,9 +893,7 @@ class SubsonicAdapter(Adapter):
         elif query.type == AlbumSearchQuery.Type.GENRE:
             extra_args = {"genre": query.genre.name}
 
-        albums: List[API.Album] = []
         page_size = 50 if query.type == AlbumSearchQuery.Type.RANDOM else 500
-        offset = 0
 
         def get_page(offset: int) -> Sequence[API.Album]:
             album_list = self._get_json(
@@ -720,12 +905,35 @@ class SubsonicAdapter(Adapter):
             ).albums
             return album_list.album if album_list else []
 
-        # Get all pages.
-        while len(next_page := get_page(offset)) > 0:
-            albums.extend(next_page)
-            if query.type == AlbumSearchQuery.Type.RANDOM:
-                break
-            offset += page_size
+        if query.type == AlbumSearchQuery.Type.RANDOM:
+            random_albums = get_page(0)
+            if on_page:
+                on_page(random_albums)
+            return random_albums
+
+        # Get all pages. Several pages are requested at once, and they are stitched back
+        # together in order. As soon as a page comes back that isn't full, that's the
+        # last page, and any pages after it that are still pending are cancelled.
+        albums: List[API.Album] = []
+        window = max(1, min(self.max_album_pages_in_flight, self._session_pool.pool_size))
+        with ThreadPoolExecutor(
+            max_workers=window, thread_name_prefix="SubsonicAlbumPages"
+        ) as executor:
+            pages: deque = deque(executor.submit(get_page, i * page_size) for i in range(window))
+            next_offset = window * page_size
+            try:
+                while pages:
+                    next_page = pages.popleft().result()
+                    albums.extend(next_page)
+                    if on_page:
+                        on_page(next_page)
+                    if len(next_page) < page_size:
+                        break
+                    pages.append(executor.submit(get_page, next_offset))
+                    next_offset += page_size
+            finally:
+                for page in pages:
+                    page.cancel()
 
         return albums
 
@@ -737,6 +945,9 @@ class SubsonicAdapter(Adapter):
     def _get_indexes(self) -> API.Directory:
         indexes = self._get_json(self._make_url("getIndexes")).indexes
         assert indexes, "Error getting indexes"
+        return self._indexes_to_directory(indexes)
+
+    def _indexes_to_directory(self, indexes: Indexes) -> API.Directory:
         with open(self.ignored_articles_cache_file, "wb+") as f:
             pickle.dump(indexes.ignored_articles, f)
 
@@ -754,6 +965,84 @@ class SubsonicAdapter(Adapter):
         assert directory, f"Error getting directory {directory_id}"
         return directory
 
+    # The most new albums to retrieve in a library sync. If more albums than this have
+    # been added, the rest are retrieved with the album lists.
+    max_library_sync_albums = 500
+
+    def get_library_changes(self, watermark: Optional[str]) -> LibraryChanges:
+        last_sync = json.loads(watermark) if watermark else {}
+        last_modified = last_sync.get("indexes_last_modified")
+
+        # The server only returns the indexes if something has changed since
+        # ifModifiedSince (but it always returns when the library last changed).
+        indexes = self._get_json(
+            self._make_url("getIndexes"), ifModifiedSince=last_modified
+        ).indexes
+        if (
+            watermark
+            and last_modified is not None
+            and indexes
+            and indexes.last_modified == last_modified
+        ):
+            return LibraryChanges(watermark=watermark, changed=False)
+
+        # Find the albums that have been added since the last sync using the newest
+        # album list.
+        newest_album_created = last_sync.get("newest_album_created")
+        new_albums, newest, new_albums_complete = self._get_albums_created_after(
+            parse_iso8601(newest_album_created) if newest_album_created else None
+        )
+
+        return LibraryChanges(
+            watermark=json.dumps(
+                {
+                    "indexes_last_modified": indexes.last_modified if indexes else None,
+                    "newest_album_created": newest.isoformat() if newest else None,
+                }
+            ),
+            changed=True,
+            new_albums=new_albums,
+            new_albums_complete=new_albums_complete,
+            root_directory=(
+                self._indexes_to_directory(indexes) if indexes and indexes.index else None
+            ),
+        )
+
+    def _get_albums_created_after(
+        self, created_after: Optional[datetime]
+    ) -> Tuple[List[API.Album], Optional[datetime], bool]:
+        """
+        Get the albums that were created after the given time, newest first.
+
+        :returns: the albums, when the newest album in the library was created, and
+            whether or not the albums are all of the albums created after the given
+            time.
+        """
+        # If there's nothing to compare to, only the newest album is needed.
+        page_size = 50 if created_after else 1
+        albums: List[API.Album] = []
+        newest: Optional[datetime] = None
+        while True:
+            album_list = self._get_json(
+                self._make_url("getAlbumList2"),
+                type="newest",
+                size=page_size,
+                offset=len(albums),
+            ).albums
+            page = album_list.album if album_list else []
+            for album in page:
+                newest = newest or album.created
+                if not created_after or not album.created:
+                    return albums, newest, False
+                if album.created <= created_after:
+                    return albums, newest, True
+                if len(albums) >= self.max_library_sync_albums:
+                    return albums, newest, False
+                albums.append(album)
+            if len(page) < page_size:
+                # Every album in the library is new.
+                return albums, newest, True
+
     def get_genres(self) -> Sequence[API.Genre]:
         if genres := self._get_json(self._make_url("getGenres")).genres:
             return genres.genre
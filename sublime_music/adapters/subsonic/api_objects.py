@@ -4,18 +4,18 @@ These are the API objects that are returned by Subsonic.
 
 from dataclasses import dataclass, field
 from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
+from typing import Any, Dict, List, Optional, Sequence, Union
 
 import dataclasses_json
 from dataclasses_json import DataClassJsonMixin, LetterCase, config, dataclass_json
-from dateutil import parser
 
 from .. import api_objects as SublimeAPI
+from .decoder import LazyList, decode, parse_iso8601
 
 # Translation map for encoding/decoding API results. For instance some servers
 # may return a string where an integer is required.
 decoder_functions = {
-    datetime: (lambda s: parser.parse(s) if s else None),
+    datetime: (lambda s: parse_iso8601(s) if s else None),
     timedelta: (lambda s: timedelta(seconds=float(s)) if s else None),
     int: (lambda s: int(s) if s else None),
 }
@@ -143,7 +143,7 @@ class Directory(SublimeAPI.Directory, DataClassJsonMixin):
     title: Optional[str] = None
     parent_id: Optional[str] = field(default=None, metadata=config(field_name="parent"))
 
-    children: List[Union["Directory", "Song"]] = field(init=False)
+    children: Sequence[Union["Directory", "Song"]] = field(init=False)
     _children: List[Dict[str, Any]] = field(
         default_factory=list, metadata=config(field_name="child")
     )
@@ -154,9 +154,9 @@ class Directory(SublimeAPI.Directory, DataClassJsonMixin):
         self.parent_id = (self.parent_id or "root") if self.id != "root" else None
 
         self.name = self.name or self.title
-        self.children = [
-            Directory.from_dict(c) if c.get("isDir") else Song.from_dict(c) for c in self._children
-        ]
+        self.children = LazyList(
+            self._children, lambda c: decode(Directory, c) if c.get("isDir") else decode(Song, c)
+        )
 
 
 @dataclass_json(letter_case=LetterCase.CAMEL)
@@ -289,6 +289,8 @@ class Genres:
 class Indexes:
     ignored_articles: Optional[str] = None
     index: List[Index] = field(default_factory=list)
+    # In milliseconds since the epoch.
+    last_modified: Optional[int] = None
 
 
 @dataclass_json(letter_case=LetterCase.CAMEL)
@@ -0,0 +1,123 @@
+import asyncio
+import json
+import logging
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, List, Optional, Sequence, Tuple, Union
+
+try:
+    import aiohttp
+
+    aiohttp_imported = True
+except Exception:
+    # The asyncio network engine is optional.
+    aiohttp_imported = False
+
+
+class AsyncResponse:
+    """
+    The parts of an HTTP response that the :class:`SubsonicAdapter` uses, with the same
+    interface as :class:`requests.Response`.
+    """
+
+    def __init__(self, status_code: int, content: bytes):
+        self.status_code = status_code
+        self.content = content
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+
+class AsyncNetworkEngine:
+    """
+    Makes HTTP requests on a single asyncio event loop thread instead of blocking a
+    thread for each request. This allows a large number of requests to be in flight at
+    once, and requests can be cancelled while they are in flight by cancelling the
+    :class:`concurrent.futures.Future` returned by :class:`submit`.
+    """
+
+    def __init__(self, connection_limit: int = 100, verify: bool = True):
+        """
+        :param connection_limit: the maximum number of connections to keep open at once.
+            Requests beyond this are queued by the event loop.
+        :param verify: whether or not to verify the SSL certificate of the server.
+        """
+        assert aiohttp_imported, "aiohttp is required for the asyncio network engine"
+        self.connection_limit = connection_limit
+        self.verify = verify
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self._run_loop, name="SubsonicEventLoop", daemon=True
+        )
+        self._thread.start()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self._loop)
+        self._loop.run_forever()
+
+    def submit(self, coroutine: Coroutine) -> Future:
+        """
+        Run the given coroutine on the event loop.
+
+        :returns: a future for the result of the coroutine. Cancelling the future
+            cancels the coroutine.
+        """
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop)
+
+    async def get(
+        self,
+        url: str,
+        params: dict,
+        timeout: Union[float, Tuple[float, float], None] = None,
+    ) -> AsyncResponse:
+        """
+        Make a GET request. This must be awaited on the event loop of the engine.
+
+        :param timeout: the same as the ``timeout`` argument of :class:`requests.get`.
+            Either the number of seconds to wait for the server, or a tuple of the
+            number of seconds to wait to connect and the number of seconds to wait for
+            each read.
+        """
+        if self._session is None:
+            # Older versions of aiohttp don't verify the certificate if ssl=True.
+            if self.verify:
+                connector = aiohttp.TCPConnector(limit=self.connection_limit)
+            else:
+                connector = aiohttp.TCPConnector(limit=self.connection_limit, ssl=False)
+            self._session = aiohttp.ClientSession(connector=connector)
+
+        if isinstance(timeout, tuple):
+            client_timeout = aiohttp.ClientTimeout(sock_connect=timeout[0], sock_read=timeout[1])
+        else:
+            client_timeout = aiohttp.ClientTimeout(sock_connect=timeout, sock_read=timeout)
+
+        async with self._session.get(
+            url, params=self._encode_params(params), timeout=client_timeout
+        ) as response:
+            return AsyncResponse(response.status, await response.read())
+
+    def close(self):
+        async def close_session():
+            if self._session:
+                await self._session.close()
+
+        if not self._loop.is_running():
+            return
+        try:
+            self.submit(close_session()).result(timeout=5)
+        except Exception:
+            logging.exception("Failed to close the asyncio network engine session")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    @staticmethod
+    def _encode_params(params: dict) -> List[Tuple[str, str]]:
+        # Encode the parameters the same way that requests does: sequences become
+        # repeated parameters and None values are dropped.
+        encoded = []
+        for key, value in params.items():
+            values: Sequence[Any] = value if isinstance(value, (list, tuple)) else [value]
+            for v in values:
+                if v is not None:
+                    encoded.append((key, str(v)))
+        return encoded
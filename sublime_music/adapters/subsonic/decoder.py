@@ -0,0 +1,283 @@
+"""
+A fast path for decoding the JSON returned by Subsonic into the API objects.
+
+``dataclasses_json`` inspects the type hints and configuration of a dataclass every
+time that it decodes an instance of it, which is most of the time spent decoding large
+responses. The decoders here do the inspection once per dataclass, and give the same
+result as ``from_dict``.
+
+Lists of objects (such as the songs of an album) are decoded lazily: each object is
+only built the first time that it is accessed, so callers that only need part of a
+large response don't pay for decoding all of it.
+"""
+
+import re
+import threading
+from collections.abc import Collection, Mapping, Sequence
+from dataclasses import MISSING, fields, is_dataclass
+from datetime import datetime, timezone, tzinfo
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    get_type_hints,
+)
+
+import dataclasses_json
+from dateutil import parser, tz
+
+T = TypeVar("T")
+Decoder = Callable[[Any], Any]
+
+_ISO8601_RE = re.compile(
+    r"(\d{4})-(\d{2})-(\d{2})[T ](\d{2}):(\d{2}):(\d{2})(?:[.,](\d+))?"
+    r"(?:(Z)|([+-])(\d{2}):?(\d{2}))?$"
+)
+
+
+def parse_iso8601(s: str) -> datetime:
+    """
+    Parse a timestamp in the ISO 8601 format that Subsonic servers use (for example,
+    ``2020-03-27T05:32:31.000Z``). The result is equal to the result of
+    :class:`dateutil.parser.parse`, which is used for anything in another format.
+    """
+    if not (match := _ISO8601_RE.match(s)):
+        return parser.parse(s)
+
+    year, month, day, hour, minute, second, fraction, utc, sign, tz_h, tz_m = match.groups()
+    zone: Optional[tzinfo] = None
+    if utc:
+        zone = tz.UTC
+    elif sign:
+        offset = (int(tz_h) * 60 + int(tz_m)) * 60 * (-1 if sign == "-" else 1)
+        zone = tz.UTC if offset == 0 else tz.tzoffset(None, offset)
+
+    try:
+        return datetime(
+            int(year),
+            int(month),
+            int(day),
+            int(hour),
+            int(minute),
+            int(second),
+            int(fraction[:6].ljust(6, "0")) if fraction else 0,
+            tzinfo=zone,
+        )
+    except ValueError:
+        return parser.parse(s)
+
+
+class LazyList(Sequence):
+    """
+    A list of objects that are decoded from their JSON the first time that they are
+    accessed. Once an object has been decoded, the same instance is returned every
+    time that it is accessed, and its JSON is no longer referenced.
+
+    This compares equal to a list of the decoded objects.
+    """
+
+    def __init__(self, items: Sequence[Any], decode_item: Decoder):
+        self._items = list(items)
+        self._decoded = bytearray(len(self._items))
+        self._decode_item = decode_item
+        self._lock = threading.Lock()
+
+    def _get(self, index: int) -> Any:
+        if self._decoded[index]:
+            return self._items[index]
+
+        with self._lock:
+            if not self._decoded[index]:
+                item = self._items[index]
+                self._items[index] = None if item is None else self._decode_item(item)
+                self._decoded[index] = 1
+            return self._items[index]
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            return [self._get(i) for i in range(*index.indices(len(self._items)))]
+        return self._get(range(len(self._items))[index])
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __iter__(self) -> Iterator[Any]:
+        for i in range(len(self._items)):
+            yield self._get(i)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Sequence) or isinstance(other, (str, bytes)):
+            return NotImplemented
+        return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+
+def decode(cls: Type[T], data: Dict[str, Any]) -> T:
+    """
+    Decode ``data`` into an instance of the dataclass ``cls``. This gives the same
+    result as ``cls.from_dict(data)``.
+    """
+    return _dataclass_decoder(cls)(data)
+
+
+_decoders: Dict[type, Decoder] = {}
+_compile_lock = threading.RLock()
+# The decoders that are being compiled by the thread holding _compile_lock. These are
+# only used for dataclasses that (indirectly) contain themselves.
+_compiling: Dict[type, Decoder] = {}
+
+
+def _dataclass_decoder(cls: type) -> Decoder:
+    if (decoder := _decoders.get(cls)) is not None:
+        return decoder
+
+    with _compile_lock:
+        if (decoder := _decoders.get(cls) or _compiling.get(cls)) is not None:
+            return decoder
+
+        # The JSON key for each field, and the field name that it decodes to.
+        names: Dict[str, str] = {}
+        field_decoders: List[Tuple[str, Decoder, Any, Any]] = []
+
+        def decode_dataclass(kvs: Any) -> Any:
+            if isinstance(kvs, cls):
+                return kvs
+
+            values = {names.get(k, k): v for k, v in kvs.items()}
+            kwargs = {}
+            for name, decode_field, default, default_factory in field_decoders:
+                if name in values:
+                    value = values[name]
+                elif default is not MISSING:
+                    value = default
+                elif default_factory is not MISSING:
+                    value = default_factory()
+                else:
+                    raise KeyError(name)
+                kwargs[name] = None if value is None else decode_field(value)
+            return cls(**kwargs)
+
+        _compiling[cls] = decode_dataclass
+        try:
+            class_config = getattr(cls, "dataclass_json_config", None) or {}
+            global_decoders = dataclasses_json.cfg.global_config.decoders
+            types = get_type_hints(cls)
+            for field in fields(cls):
+                field_config = {**class_config, **field.metadata.get("dataclasses_json", {})}
+                if letter_case := field_config.get("letter_case"):
+                    names[letter_case(field.name)] = field.name
+                if not field.init:
+                    continue
+
+                field_type = types[field.name]
+                override = field_config.get("decoder") or global_decoders.get(field.type)
+                if override:
+                    decode_field = _override_decoder(field_type, override)
+                elif is_dataclass(field_type):
+                    decode_field = _dataclass_decoder(field_type)
+                elif _is_supported_generic(field_type) and field_type != str:
+                    decode_field = _generic_decoder(field_type)
+                else:
+                    decode_field = _extended_type_decoder(field_type)
+
+                field_decoders.append(
+                    (field.name, decode_field, field.default, field.default_factory)
+                )
+        finally:
+            del _compiling[cls]
+
+        _decoders[cls] = decode_dataclass
+        return decode_dataclass
+
+
+def _override_decoder(field_type: Any, override: Decoder) -> Decoder:
+    def decode_override(value: Any) -> Any:
+        # Values that already have the right type aren't decoded again.
+        return value if type(value) is field_type else override(value)
+
+    return decode_override
+
+
+def _is_optional(type_: Any) -> bool:
+    return type_ is Any or (
+        getattr(type_, "__origin__", None) is Union and type(None) in type_.__args__
+    )
+
+
+def _is_collection(type_: Any) -> bool:
+    origin = getattr(type_, "__origin__", None)
+    return isinstance(origin, type) and issubclass(origin, Collection)
+
+
+def _is_supported_generic(type_: Any) -> bool:
+    return (
+        (_is_collection(type_) and not issubclass(type_.__origin__, str))
+        or _is_optional(type_)
+        or getattr(type_, "__origin__", None) is Union
+    )
+
+
+def _identity(value: Any) -> Any:
+    return value
+
+
+def _items_decoder(type_: Any) -> Decoder:
+    if is_dataclass(type_):
+        return _dataclass_decoder(type_)
+    if _is_supported_generic(type_):
+        return _generic_decoder(type_)
+    return _identity
+
+
+def _generic_decoder(type_: Any) -> Decoder:
+    if _is_collection(type_):
+        origin = type_.__origin__
+        if issubclass(origin, Mapping):
+            type_args: Tuple[Any, Any] = getattr(type_, "__args__", (Any, Any))
+            key_type, value_type = type_args
+            decode_key: Decoder = _identity if key_type in (None, Any) else key_type
+            decode_value = _items_decoder(value_type)
+            return lambda value: origin(
+                (decode_key(k), None if v is None else decode_value(v)) for k, v in value.items()
+            )
+
+        item_type = type_.__args__[0]
+        decode_item = _items_decoder(item_type)
+        if origin is list and is_dataclass(item_type):
+            return lambda value: LazyList(value, decode_item)
+        return lambda value: origin(None if item is None else decode_item(item) for item in value)
+
+    args = getattr(type_, "__args__", None)
+    if not args or not _is_optional(type_) or len(args) != 2:
+        # Any or a Union, so just accept the value.
+        return _identity
+
+    type_arg = args[0]
+    if is_dataclass(type_arg):
+        return _dataclass_decoder(type_arg)
+    if _is_supported_generic(type_arg):
+        return _generic_decoder(type_arg)
+    return _extended_type_decoder(type_arg)
+
+
+def _extended_type_decoder(type_: Any) -> Decoder:
+    if isinstance(type_, type) and issubclass(type_, datetime):
+
+        def decode_datetime(value: Any) -> datetime:
+            if isinstance(value, datetime):
+                return value
+            local_tz = datetime.now(timezone.utc).astimezone().tzinfo
+            return datetime.fromtimestamp(value, tz=local_tz)
+
+        return decode_datetime
+
+    return _identity
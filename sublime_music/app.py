@@ -2,6 +2,7 @@ import logging
 import os
 import random
 import shutil
+import signal
 import sys
 from concurrent.futures import Future
 from datetime import timedelta
@@ -41,6 +42,7 @@ from .adapters import (
     DownloadProgress,
     Result,
     SongCacheStatus,
+    TaskPriority,
 )
 from .adapters.api_objects import Playlist, PlayQueue, Song
 from .config import AppConfiguration, ProviderConfiguration
@@ -111,6 +113,11 @@ class SublimeMusicApp(Gtk.Application):
             lambda a, p: self.update_play_state_from_server(),
         )
 
+        # Write the AdapterManager metrics to disk. This can be triggered over D-Bus
+        # (using the app.dump-metrics action) or by sending the process SIGUSR1.
+        add_action("dump-metrics", lambda *a: self.on_dump_metrics())
+        GLib.unix_signal_add(GLib.PRIORITY_DEFAULT, signal.SIGUSR1, self.on_dump_metrics)
+
         if tap_imported:
             self.tap = osxmmkeys.Tap()
             self.tap.on("play_pause", self.on_play_pause)
@@ -118,6 +125,15 @@ class SublimeMusicApp(Gtk.Application):
             self.tap.on("prev_track", self.on_prev_track)
             self.tap.start()
 
+    def on_dump_metrics(self) -> bool:
+        try:
+            AdapterManager.dump_metrics()
+        except Exception:
+            logging.exception("Failed to dump metrics")
+
+        # Keep the signal handler installed.
+        return True
+
     def do_activate(self):
         # We only allow a single window and raise any existing ones
         if self.window:
@@ -314,6 +330,9 @@ class SublimeMusicApp(Gtk.Application):
             if AdapterManager.can_get_playlists():
                 AdapterManager.get_playlists()
 
+            if self.app_config.mirror_library_metadata:
+                GLib.idle_add(self.mirror_library)
+
         inital_sync_result = AdapterManager.initial_sync()
         inital_sync_result.add_done_callback(after_initial_sync)
 
@@ -545,6 +564,10 @@ class SublimeMusicApp(Gtk.Application):
                 setattr(self.app_config, k, v)
             if (offline_mode := settings.get("offline_mode")) is not None:
                 AdapterManager.on_offline_mode_change(offline_mode)
+            if (bandwidth_limit := settings.get("download_bandwidth_limit")) is not None:
+                AdapterManager.on_download_bandwidth_limit_change(bandwidth_limit)
+            if settings.get("mirror_library_metadata"):
+                self.mirror_library()
 
             del state_updates["__settings__"]
             self.app_config.save()
@@ -1103,6 +1126,48 @@ class SublimeMusicApp(Gtk.Application):
         play_queue_future = AdapterManager.get_play_queue()
         play_queue_future.add_done_callback(lambda f: GLib.idle_add(do_update, f))
 
+    library_mirror_job: Optional[Result] = None
+
+    def mirror_library(self):
+        if self.library_mirror_job or self.app_config.offline_mode:
+            return
+
+        notification: Optional[UIState.UINotification] = None
+        progress = (0, 0, 0)
+
+        def show_progress(done: int, failed: int, total: int, finished: bool = False):
+            nonlocal notification, progress
+            progress = (done, failed, total)
+            # Don't replace any other notification.
+            if self.app_config.state.current_notification not in (None, notification):
+                return
+            notification = None
+            if not finished and done + failed < total:
+                notification = UIState.UINotification(
+                    markup=f"<b>Caching library for offline browsing:</b> {done} of {total}",
+                    icon="folder-download-symbolic",
+                )
+            elif finished and done < total:
+                notification = UIState.UINotification(
+                    markup=(
+                        "<b>Unable to cache the entire library for offline browsing:</b> "
+                        f"{done} of {total} cached"
+                    ),
+                    actions=(("Retry", self.mirror_library),),
+                    icon="dialog-error",
+                )
+            self.app_config.state.current_notification = notification
+            self.update_window()
+
+        def on_done(f: Result):
+            self.library_mirror_job = None
+            GLib.idle_add(lambda: show_progress(*progress, finished=True))
+
+        self.library_mirror_job = AdapterManager.mirror_library(
+            on_progress=lambda *a: GLib.idle_add(show_progress, *a)
+        )
+        self.library_mirror_job.add_done_callback(on_done)
+
     song_playing_order_token = 0
     batch_download_jobs: Set[Result] = set()
 
@@ -1163,6 +1228,8 @@ class SublimeMusicApp(Gtk.Application):
             if order_token != self.song_playing_order_token:
                 return
 
+            # Make sure that prefetching doesn't starve the stream.
+            AdapterManager.set_streaming_song(None if urlparse(uri).scheme == "file" else song)
             self.player_manager.play_media(
                 uri,
                 timedelta(0) if reset else self.app_config.state.song_progress,
@@ -1260,6 +1327,7 @@ class SublimeMusicApp(Gtk.Application):
                     # For example, MPV can is barely noticable whereas there's quite a
                     # delay with Chromecast.
                     if self.player_manager.can_start_playing_with_no_latency:
+                        AdapterManager.set_streaming_song(None)
                         self.player_manager.play_media(
                             AdapterManager.get_song_file_uri(song),
                             self.app_config.state.song_progress,
@@ -1313,6 +1381,7 @@ class SublimeMusicApp(Gtk.Application):
                         on_song_download_complete=on_song_download_complete,
                         one_at_a_time=True,
                         delay=5,
+                        priority=TaskPriority.PREFETCH,
                     )
                 )
 
@@ -1409,7 +1478,8 @@ class SublimeMusicApp(Gtk.Application):
                 return
 
         song_details_future = AdapterManager.get_song_details(
-            self.app_config.state.play_queue[self.app_config.state.current_song_index]
+            self.app_config.state.play_queue[self.app_config.state.current_song_index],
+            priority=TaskPriority.INTERACTIVE,
         )
         if song_details_future.data_is_available:
             song_details_future.add_done_callback(
@@ -141,6 +141,8 @@ class AppConfiguration(DataClassJsonMixin):
     download_on_stream: bool = True  # also download when streaming a song
     prefetch_amount: int = 3
     concurrent_download_limit: int = 5
+    download_bandwidth_limit: int = 0  # KiB/s, 0 for unlimited
+    mirror_library_metadata: bool = False  # cache all library metadata for offline use
 
     # Deprecated. These have also been renamed to avoid using them elsewhere in the app.
     _sol: bool = field(default=True, metadata=config(field_name="serve_over_lan"))
@@ -2,7 +2,7 @@ import datetime
 import itertools
 import logging
 import math
-from typing import Any, Callable, Iterable, List, Optional, Tuple, cast
+from typing import Any, Callable, Iterable, List, Optional, Sequence, Tuple, cast
 
 from gi.repository import Gdk, Gio, GLib, GObject, Gtk, Pango
 
@@ -712,6 +712,11 @@ class AlbumsGrid(Gtk.Overlay):
             else:
                 self.error_container.hide()
 
+            if streamed_models and [m.id for m in streamed_models] == [a.id for a in albums]:
+                # Every page was already added to the grid as it arrived.
+                self.spinner.hide()
+                return
+
             selected_index = None
             self.current_models = []
             for i, album in enumerate(albums):
@@ -728,9 +733,48 @@ class AlbumsGrid(Gtk.Overlay):
             )
             do_update_grid(selected_index)
 
+        # The albums that have been received so far, if they are being streamed from
+        # the ground truth adapter one page at a time.
+        streamed_models: List[AlbumsGrid._AlbumModel] = []
+        streamed_selected_index: Optional[int] = None
+
+        def add_page(page: Sequence[API.Album]):
+            nonlocal streamed_selected_index
+            # Don't override more recent results
+            if order_token < self.latest_applied_order_ratchet:
+                return
+            self.latest_applied_order_ratchet = order_token
+
+            # Only redraw the grid if the new albums are on the current page.
+            page_offset = len(streamed_models)
+            redraw = page_offset < self.page_size * (self.page + 1)
+            for i, album in enumerate(page, start=page_offset):
+                model = AlbumsGrid._AlbumModel(album)
+                if model.id == self.currently_selected_id:
+                    streamed_selected_index = i
+                    redraw = True
+                streamed_models.append(model)
+
+            self.current_models = streamed_models
+            self.emit(
+                "num-pages-changed",
+                math.ceil(len(self.current_models) / self.page_size),
+            )
+            if redraw:
+                do_update_grid(streamed_selected_index)
+
         if force_grid_reload_from_master:
             albums_result = AdapterManager.get_albums(
-                self.current_query, use_ground_truth_adapter=use_ground_truth_adapter
+                self.current_query,
+                use_ground_truth_adapter=use_ground_truth_adapter,
+                # Show each page of albums as soon as it arrives. When sorting in
+                # descending order, the first page to show is the last one to arrive, so
+                # there's no point.
+                on_page=(
+                    (lambda page: GLib.idle_add(add_page, page))
+                    if self.sort_dir == "ascending"
+                    else None
+                ),
             )
             if albums_result.data_is_available:
                 # Don't idle add if the data is already available.
@@ -123,6 +123,7 @@ class ArtistList(Gtk.Box):
         AdapterManager.get_artists,
         before_download=lambda self: self.loading_indicator.show_all(),
         on_failure=lambda self, e: self.loading_indicator.hide(),
+        revalidate=True,
     )
     def update(
         self,
@@ -324,6 +325,7 @@ class ArtistDetailPanel(Gtk.Box):
         AdapterManager.get_artist,
         before_download=lambda self: self.set_all_loading(True),
         on_failure=lambda self, e: self.set_all_loading(False),
+        revalidate=True,
     )
     def update_artist_view(
         self,
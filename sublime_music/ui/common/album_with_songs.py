@@ -285,6 +285,7 @@ class AlbumWithSongs(Gtk.Box):
         AdapterManager.get_album,
         before_download=lambda self: self.set_loading(True),
         on_failure=lambda self, e: self.set_loading(False),
+        revalidate=True,
     )
     def update_album_songs(
         self,
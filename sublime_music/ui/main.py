@@ -326,6 +326,8 @@ class MainWindow(Gtk.ApplicationWindow):
         self.download_on_stream_switch.set_active(app_config.download_on_stream)
         self.prefetch_songs_entry.set_value(app_config.prefetch_amount)
         self.max_concurrent_downloads_entry.set_value(app_config.concurrent_download_limit)
+        self.download_bandwidth_limit_entry.set_value(app_config.download_bandwidth_limit)
+        self.mirror_library_metadata_switch.set_active(app_config.mirror_library_metadata)
         self.download_on_stream_switch.set_sensitive(allow_song_downloads)
         self.prefetch_songs_entry.set_sensitive(allow_song_downloads)
         self.max_concurrent_downloads_entry.set_sensitive(allow_song_downloads)
@@ -814,6 +816,28 @@ class MainWindow(Gtk.ApplicationWindow):
         )
         vbox.add(max_concurrent_downloads)
 
+        # Download Bandwidth Limit
+        (
+            download_bandwidth_limit,
+            self.download_bandwidth_limit_entry,
+        ) = self._create_spin_button_menu_item(
+            "Download Bandwidth Limit (KiB/s, 0 for No Limit)",
+            0,
+            1000000,
+            64,
+            "download_bandwidth_limit",
+        )
+        vbox.add(download_bandwidth_limit)
+
+        # Mirror Library Metadata
+        (
+            mirror_library_metadata,
+            self.mirror_library_metadata_switch,
+        ) = self._create_toggle_menu_button(
+            "Cache Entire Library for Offline Browsing", "mirror_library_metadata"
+        )
+        vbox.add(mirror_library_metadata)
+
         main_menu.add(vbox)
         return main_menu
 
@@ -216,7 +216,7 @@ class PlayerControls(Gtk.ActionBar):
             self.popover_label.set_markup(f"<b>Play Queue:</b> {play_queue_len} {song_label}")
 
         # TODO (#207) this is super freaking stupid inefficient.
-        # IDEAS: batch it, don't get the queue until requested
+        # IDEAS: don't get the queue until requested
         self.editing_play_queue_song_list = True
 
         new_store = []
@@ -277,21 +277,25 @@ class PlayerControls(Gtk.ActionBar):
         if app_config.state.play_queue != current_play_queue:
             self.play_queue_update_order_token += 1
 
-        song_details_results = []
+        def on_songs_details_future_done(order_token: int, songs_details: Dict[str, Song]):
+            for idx, song_id in uncached_song_idxs:
+                if song_details := songs_details.get(song_id):
+                    on_song_details_future_done(idx, order_token, song_details)
+
+        # Look up the details of all of the cached songs at once.
+        cached_songs_details = AdapterManager.get_cached_songs_details(app_config.state.play_queue)
+        uncached_song_idxs = []
         for i, (song_id, cached_status) in enumerate(
             zip(
                 app_config.state.play_queue,
                 AdapterManager.get_cached_statuses(app_config.state.play_queue),
             )
         ):
-            song_details_result = AdapterManager.get_song_details(song_id)
-
             cover_art_filename = ""
             label = "\n"
 
-            if song_details_result.data_is_available:
+            if song_details := cached_songs_details.get(song_id):
                 # We have the details of the song already cached.
-                song_details = song_details_result.result()
                 label = calculate_label(song_details)
 
                 filename = get_cover_art_filename_or_create_future(
@@ -300,7 +304,7 @@ class PlayerControls(Gtk.ActionBar):
                 if filename:
                     cover_art_filename = filename
             else:
-                song_details_results.append((i, song_details_result))
+                uncached_song_idxs.append((i, song_id))
 
             new_store.append(
                 [
@@ -319,13 +323,13 @@ class PlayerControls(Gtk.ActionBar):
         util.diff_song_store(self.play_queue_store, new_store)
 
         # Do this after the diff to avoid race conditions.
-        for idx, song_details_result in song_details_results:
-            song_details_result.add_done_callback(
-                make_idle_index_capturing_function(
-                    idx,
-                    self.play_queue_update_order_token,
-                    on_song_details_future_done,
-                )
+        if uncached_song_idxs:
+            order_token = self.play_queue_update_order_token
+            songs_details_result = AdapterManager.get_songs_details(
+                [song_id for _, song_id in uncached_song_idxs]
+            )
+            songs_details_result.add_done_callback(
+                lambda f: GLib.idle_add(on_songs_details_future_done, order_token, f.result())
             )
 
         self.editing_play_queue_song_list = False
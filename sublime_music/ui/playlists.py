@@ -227,6 +227,7 @@ class PlaylistList(Gtk.Box):
         AdapterManager.get_playlists,
         before_download=lambda self: self.loading_indicator.show_all(),
         on_failure=lambda self, e: self.loading_indicator.hide(),
+        revalidate=True,
     )
     def update_list(
         self,
@@ -514,6 +515,7 @@ class PlaylistDetailPanel(Gtk.Overlay):
         AdapterManager.get_playlist_details,
         before_download=lambda self: self.show_loading_all(),
         on_failure=lambda self, e: self.hide_loading_all(),
+        revalidate=True,
     )
     def update_playlist_view(
         self,
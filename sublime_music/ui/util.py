@@ -1,7 +1,7 @@
 import functools
 import re
 from datetime import timedelta
-from typing import Any, Callable, Iterable, List, Match, Optional, Tuple, Union, cast
+from typing import Any, Callable, Dict, Iterable, List, Match, Optional, Tuple, Union, cast
 
 from deepdiff import DeepDiff
 from gi.repository import Gdk, GLib, Gtk
@@ -270,12 +270,9 @@ def show_song_popover(
             browse_to_song.set_action_target_value(GLib.Variant("s", list(parents)[0]))
             browse_to_song.set_action_name("app.browse-to")
 
-    def batch_get_song_details() -> List[Song]:
-        return [AdapterManager.get_song_details(song_id).result() for song_id in song_ids]
-
-    get_song_details_result: Result[List[Song]] = Result(batch_get_song_details)
+    get_song_details_result: Result[Dict[str, Song]] = AdapterManager.get_songs_details(song_ids)
     get_song_details_result.add_done_callback(
-        lambda f: GLib.idle_add(on_get_song_details_done, f.result())
+        lambda f: GLib.idle_add(on_get_song_details_done, list(f.result().values()))
     )
 
     menu_items = [
@@ -354,6 +351,7 @@ def async_callback(
     future_fn: Callable[..., Result],
     before_download: Callable[[Any], None] | None = None,
     on_failure: Callable[[Any, Exception], None] | None = None,
+    revalidate: bool = False,
 ) -> Callable[[Callable], Callable]:
     """
     Defines the ``async_callback`` decorator.
@@ -363,6 +361,10 @@ def async_callback(
     will be called with the result of the Result generated by said lambda function.
 
     :param future_fn: a function which generates an :class:`AdapterManager.Result`.
+    :param revalidate: whether to use stale-while-revalidate. If ``True``,
+        ``future_fn`` must accept an ``on_revalidated`` keyword argument. Cached data
+        is passed to the annotated function immediately, and the annotated function is
+        called again if newer data is retrieved from the server.
     """
 
     def decorator(callback_fn: Callable) -> Callable:
@@ -416,6 +418,22 @@ def async_callback(
                     # have to idle add so that we don't seg fault GTK.
                     GLib.idle_add(fn)
 
+            def on_revalidated(data: Any):
+                GLib.idle_add(
+                    functools.partial(
+                        callback_fn,
+                        self,
+                        data,
+                        app_config=app_config,
+                        force=force,
+                        order_token=order_token,
+                        is_partial=False,
+                    )
+                )
+
+            if revalidate:
+                kwargs["on_revalidated"] = on_revalidated
+
             result: Result = future_fn(
                 *args,
                 before_download=on_before_download,
@@ -1,10 +1,40 @@
+import hashlib
+import io
+import json
+import os
+import subprocess
+import sys
+import textwrap
+import threading
+from concurrent.futures import Future
+from datetime import datetime
 from pathlib import Path
-from time import sleep
+from time import monotonic, sleep
+from typing import Any, Callable, List, Optional, Sequence, Tuple
 
 import pytest
-
-from sublime_music.adapters import AdapterManager, ConfigurationStore, Result, SearchResult
+import requests
+from requests.adapters import HTTPAdapter
+
+from sublime_music.adapters import (
+    AdapterManager,
+    AdaptiveConcurrencyLimiter,
+    AlbumSearchQuery,
+    CachingAdapter,
+    ConfigurationStore,
+    HTTPSessionPool,
+    LibraryChanges,
+    Result,
+    SearchResult,
+    TaskPriority,
+    api_objects as API,
+)
+from sublime_music.adapters.bandwidth import BandwidthLimiter
+from sublime_music.adapters.executor import PriorityThreadPoolExecutor
 from sublime_music.adapters.filesystem import FilesystemAdapter
+from sublime_music.adapters.ingest_queue import IngestItem, IngestQueue
+from sublime_music.adapters.metrics import Metrics
+from sublime_music.adapters.object_cache import ObjectCache
 from sublime_music.adapters.subsonic import SubsonicAdapter, api_objects as SubsonicAPI
 from sublime_music.config import AppConfiguration, ProviderConfiguration
 
@@ -124,6 +154,265 @@ def test_cancel():
         result.result()
 
 
+def test_priority_executor():
+    executor = PriorityThreadPoolExecutor(max_workers=1)
+    started = threading.Event()
+    release = threading.Event()
+
+    def block():
+        started.set()
+        release.wait()
+
+    # Occupy the only worker so that everything else gets queued.
+    executor.submit(block)
+    started.wait()
+
+    order: List[str] = []
+    futures = [
+        executor.submit(order.append, "background", priority=TaskPriority.BACKGROUND),
+        executor.submit(order.append, "prefetch", priority=TaskPriority.PREFETCH),
+        executor.submit(order.append, "interactive", priority=TaskPriority.INTERACTIVE),
+        executor.submit(order.append, "promoted", priority=TaskPriority.BACKGROUND),
+    ]
+    assert executor.queue_depths()[TaskPriority.BACKGROUND] == 2
+    assert executor.promote(futures[3], TaskPriority.INTERACTIVE)
+
+    release.set()
+    for f in futures:
+        f.result()
+    executor.shutdown()
+
+    assert order == ["interactive", "promoted", "prefetch", "background"]
+    assert all(depth == 0 for depth in executor.queue_depths().values())
+
+
+def test_priority_executor_finishes_running_tasks_at_exit(tmp_path: Path):
+    # The interpreter exits without shutting down the executor. The running task has
+    # to finish anyway, and the idle workers must not keep the interpreter alive.
+    done_path = tmp_path.joinpath("done")
+    script = textwrap.dedent(
+        f"""
+        import threading, time
+        from sublime_music.adapters.executor import PriorityThreadPoolExecutor
+
+        executor = PriorityThreadPoolExecutor(max_workers=2)
+        started = threading.Event()
+
+        def task():
+            started.set()
+            time.sleep(0.5)
+            open({str(done_path)!r}, "w").close()
+
+        executor.submit(task)
+        executor.submit(lambda: None)
+        started.wait()
+        """
+    )
+    subprocess.run([sys.executable, "-c", script], check=True, timeout=30)
+    assert done_path.exists()
+
+
+def test_bandwidth_limiter():
+    now = 0.0
+    limiter = BandwidthLimiter(rate=100 * 1024, clock=lambda: now)
+    total_bucket, bulk_bucket = limiter._total_bucket, limiter._bulk_bucket
+
+    # The first second worth of data is allowed as a burst, then the rate is limited.
+    limiter.acquire(100 * 1024, TaskPriority.VISIBLE)
+    assert total_bucket.tokens == 0
+    limiter.acquire(20 * 1024, TaskPriority.VISIBLE)
+    assert total_bucket.wait_time() == pytest.approx(0.2)
+
+    now += 0.1
+    total_bucket.refill(now)
+    assert total_bucket.tokens == pytest.approx(-10 * 1024)
+    now += 0.1
+    limiter.acquire(1024, TaskPriority.VISIBLE)
+    assert total_bucket.tokens == pytest.approx(-1024)
+
+    # While bandwidth is reserved, low priority downloads only get what's left, but
+    # higher priority downloads can still use all of it.
+    now += 10
+    limiter.reserve(80 * 1024)
+    assert bulk_bucket.rate == 20 * 1024
+    limiter.acquire(20 * 1024, TaskPriority.PREFETCH)
+    limiter.acquire(20 * 1024, TaskPriority.PREFETCH)
+    assert bulk_bucket.wait_time() == pytest.approx(1.0)
+    assert total_bucket.tokens == 60 * 1024
+
+    limiter.acquire(60 * 1024, TaskPriority.INTERACTIVE)
+    assert total_bucket.tokens == 0
+    assert bulk_bucket.tokens == -20 * 1024
+
+    # Bandwidth that was acquired but not used is given back, but never more than the
+    # burst.
+    limiter.release(10 * 1024, TaskPriority.PREFETCH)
+    assert total_bucket.tokens == 10 * 1024
+    assert bulk_bucket.tokens == -10 * 1024
+    limiter.release(200 * 1024, TaskPriority.INTERACTIVE)
+    assert total_bucket.tokens == 100 * 1024
+    assert bulk_bucket.tokens == -10 * 1024
+
+    # Without a limit, nothing waits.
+    limiter.set_rate(0)
+    limiter.acquire(1024 * 1024, TaskPriority.BACKGROUND)
+    assert total_bucket.tokens == 0
+
+
+def test_adaptive_concurrency_limiter():
+    # The requests are all instant, so any latency counts as healthy.
+    limiter = AdaptiveConcurrencyLimiter(
+        initial_limit=2, max_limit=8, latency_tolerance=float("inf")
+    )
+
+    def run_batch(overloaded: bool = False):
+        start_times = [limiter.acquire() for _ in range(limiter.limit)]
+        for start_time in start_times:
+            limiter.release(start_time, overloaded)
+
+    # The limit grows while all of the requests are healthy.
+    for _ in range(10):
+        run_batch()
+    assert limiter.limit == 8
+    assert limiter.in_flight == 0
+
+    # A batch of failures backs off once, not once for each failed request.
+    run_batch(overloaded=True)
+    assert limiter.limit == 4
+    run_batch(overloaded=True)
+    assert limiter.limit == 2
+
+    # Requests over the limit wait until a request is done.
+    start_times = [limiter.acquire() for _ in range(limiter.limit)]
+    acquired = threading.Event()
+
+    def acquire():
+        limiter.release(limiter.acquire())
+        acquired.set()
+
+    threading.Thread(target=acquire).start()
+    assert not acquired.wait(0.2)
+    limiter.release(start_times.pop())
+    assert acquired.wait(1)
+    for start_time in start_times:
+        limiter.release(start_time)
+
+    stats = limiter.stats()
+    assert stats["backoffs"] == 2
+    assert stats["overloads"] == 12
+    assert stats["in_flight"] == 0
+
+
+def test_object_cache():
+    cache: ObjectCache[str] = ObjectCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+
+    # "b" is the least recently used, so it should be evicted.
+    cache.put("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+
+    # Objects read before an invalidation should not be put back into the cache.
+    generation = cache.generation
+    cache.invalidate("a")
+    cache.put("a", 1, generation)
+    assert cache.get("a") is None
+
+    assert cache.stats() == {
+        "size": 1,
+        "max_size": 2,
+        "hits": 2,
+        "misses": 2,
+        "evictions": 1,
+        "expirations": 0,
+    }
+
+    # Objects should not be returned once their time-to-live has passed.
+    cache.put("d", 4, ttl=0.1)
+    assert cache.get("d") == 4
+    sleep(0.2)
+    assert cache.get("d") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_ingest_queue():
+    KEYS = CachingAdapter.CachedDataKey
+
+    class RecordingAdapter:
+        def __init__(self):
+            self.batches: List[List[IngestItem]] = []
+            self.ingested: List[IngestItem] = []
+
+        def ingest_new_data_batch(self, items: Sequence[IngestItem]):
+            if any(data == "bad" for _, _, data in items):
+                raise Exception("bad data")
+            self.batches.append(list(items))
+            self.ingested.extend(items)
+
+        def ingest_new_data(
+            self, cache_key: CachingAdapter.CachedDataKey, param: Optional[str], data: Any
+        ):
+            self.ingest_new_data_batch([(cache_key, param, data)])
+
+    adapter = RecordingAdapter()
+    ingested_batches: List[Sequence[IngestItem]] = []
+    queue = IngestQueue(
+        adapter,  # type: ignore
+        on_ingested=ingested_batches.append,
+        batch_interval=10,
+    )
+
+    # Everything that is put on the queue before a flush is ingested in one batch,
+    # without waiting for the rest of the batch interval.
+    for i in range(20):
+        queue.put(KEYS.SONG, str(i), i)
+    start = monotonic()
+    assert queue.flush(timeout=5)
+    assert monotonic() - start < 5
+    assert adapter.batches == [[(KEYS.SONG, str(i), i) for i in range(20)]]
+    assert ingested_batches == adapter.batches
+
+    # A bad item doesn't lose the rest of the batch.
+    queue.put(KEYS.SONG, "a", "good")
+    queue.put(KEYS.SONG, "b", "bad")
+    queue.put(KEYS.SONG, "c", "good")
+    assert queue.flush(timeout=5)
+    assert adapter.ingested[-2:] == [(KEYS.SONG, "a", "good"), (KEYS.SONG, "c", "good")]
+
+    # Shutting down ingests everything that is left.
+    queue.put(KEYS.SONG, "d", "good")
+    queue.shutdown()
+    assert adapter.ingested[-1] == (KEYS.SONG, "d", "good")
+    assert len(queue) == 0
+
+
+def test_metrics(adapter_manager: AdapterManager, tmp_path: Path):
+    metrics = Metrics()
+    metrics.observe_latency("get_song_details", Metrics.CACHE_HIT, 0.002)
+    metrics.observe_latency("get_song_details", Metrics.CACHE_HIT, 0.5)
+    metrics.count_cache_lookup("SONG", "hit", 2)
+    metrics.count_cache_lookup("SONG", "miss")
+    metrics.add_bytes_downloaded(1024)
+
+    metrics_dict = metrics.to_dict()
+    histogram = metrics_dict["latencies"]["get_song_details"][Metrics.CACHE_HIT]
+    assert histogram["count"] == 2
+    assert histogram["max"] == 0.5
+    assert histogram["buckets"]["le_0.0025"] == 1
+    assert histogram["buckets"]["le_0.5"] == 1
+    assert metrics_dict["cache_lookups"] == {"SONG": {"hit": 2, "miss": 1}}
+    assert metrics_dict["bytes_downloaded"] == 1024
+
+    metrics_file = AdapterManager.dump_metrics(tmp_path.joinpath("metrics.json"))
+    assert metrics_file
+    with open(metrics_file) as f:
+        dumped = json.load(f)
+    assert set(dumped["queue_depths"].keys()) == {"executor", "download_executor"}
+    assert "hits" in dumped["object_cache"]
+
+
 def test_get_song_details(adapter_manager: AdapterManager):
     # song = AdapterManager.get_song_details("1")
     # print(song)
@@ -132,6 +421,512 @@ def test_get_song_details(adapter_manager: AdapterManager):
     pass
 
 
+def test_get_song_details_coalesces_requests(adapter_manager: AdapterManager):
+    assert AdapterManager._instance
+    calls = 0
+
+    def get_song_details(song_id: str) -> SubsonicAPI.Song:
+        nonlocal calls
+        calls += 1
+        sleep(0.2)
+        return SubsonicAPI.Song(song_id, title="Song 1")
+
+    AdapterManager._instance.ground_truth_adapter.get_song_details = (  # type: ignore
+        get_song_details
+    )
+
+    # All of these requests are made while the first one is still in flight, so they
+    # should share a single call to the ground truth adapter.
+    results = [AdapterManager.get_song_details("1") for _ in range(3)]
+    assert [r.result().title for r in results] == ["Song 1"] * 3
+    assert calls == 1
+
+    # The song is written to the cache behind the request.
+    assert AdapterManager.flush_ingest_queue(timeout=5)
+    caching_adapter = AdapterManager._instance.caching_adapter
+    assert caching_adapter
+    assert caching_adapter.get_song_details("1").title == "Song 1"
+
+
+def test_cancel_coalesced_requests(adapter_manager: AdapterManager):
+    assert AdapterManager._instance
+    requests: List[Future] = []
+
+    def call_async(function_name: str, *args: Any, **kwargs: Any) -> Future:
+        # Stand in for an asyncio network engine request that never finishes.
+        requests.append(Future())
+        return requests[-1]
+
+    AdapterManager._instance.ground_truth_adapter.call_async = call_async  # type: ignore
+
+    results = [AdapterManager.get_song_details("1") for _ in range(2)]
+    assert len(requests) == 1
+
+    # The request isn't cancelled while anyone is still waiting for it.
+    assert results[0].cancel()
+    assert not requests[0].cancelled()
+
+    # Once everyone has cancelled, the request itself is cancelled, and the next caller
+    # makes a new request.
+    assert results[1].cancel()
+    assert requests[0].cancelled()
+    result = AdapterManager.get_song_details("1")
+    assert len(requests) == 2
+    assert result.cancel()
+    assert requests[1].cancelled()
+
+
+def test_get_songs_details_joins_in_flight_requests(adapter_manager: AdapterManager):
+    assert AdapterManager._instance
+    calls: List[str] = []
+
+    def get_song_details(song_id: str) -> SubsonicAPI.Song:
+        calls.append(song_id)
+        sleep(0.2)
+        return SubsonicAPI.Song(song_id, title=f"Song {song_id}")
+
+    AdapterManager._instance.ground_truth_adapter.get_song_details = (  # type: ignore
+        get_song_details
+    )
+
+    # The batch request for song 1 joins the request that is already in flight.
+    result = AdapterManager.get_song_details("1")
+    songs = AdapterManager.get_songs_details(["1", "2"]).result()
+    assert result.result().title == "Song 1"
+    assert {song_id: song.title for song_id, song in songs.items()} == {
+        "1": "Song 1",
+        "2": "Song 2",
+    }
+    assert sorted(calls) == ["1", "2"]
+
+    assert AdapterManager.flush_ingest_queue(timeout=5)
+    caching_adapter = AdapterManager._instance.caching_adapter
+    assert caching_adapter
+    assert set(caching_adapter.get_songs_details(["1", "2"])) == {"1", "2"}
+
+
+def test_stale_while_revalidate(adapter_manager: AdapterManager):
+    assert AdapterManager._instance
+    AdapterManager._ingest_new_data(
+        CachingAdapter.CachedDataKey.PLAYLIST_DETAILS,
+        "1",
+        SubsonicAPI.Playlist("1", "Old Name"),
+    )
+    AdapterManager._invalidate_data(CachingAdapter.CachedDataKey.PLAYLIST_DETAILS, "1")
+
+    def get_playlist_details(playlist_id: str) -> SubsonicAPI.Playlist:
+        sleep(0.2)
+        return SubsonicAPI.Playlist(playlist_id, "New Name")
+
+    AdapterManager._instance.ground_truth_adapter.get_playlist_details = (  # type: ignore
+        get_playlist_details
+    )
+
+    revalidated = threading.Event()
+    revalidated_playlists: List[API.Playlist] = []
+
+    def on_revalidated(playlist: API.Playlist):
+        revalidated_playlists.append(playlist)
+        revalidated.set()
+
+    # The stale data should be returned immediately, and then the new data should be
+    # passed to the callback once it is retrieved.
+    result = AdapterManager.get_playlist_details("1", on_revalidated=on_revalidated)
+    assert result.data_is_available
+    assert result.result().name == "Old Name"
+    assert revalidated.wait(5)
+    assert [p.name for p in revalidated_playlists] == ["New Name"]
+
+    # The new data has been ingested, so it should be served without revalidating,
+    # since it was just revalidated.
+    result = AdapterManager.get_playlist_details("1", on_revalidated=on_revalidated)
+    assert result.result().name == "New Name"
+    sleep(0.5)
+    assert len(revalidated_playlists) == 1
+
+
+def test_get_albums_pages(adapter_manager: AdapterManager):
+    assert AdapterManager._instance
+    query = AlbumSearchQuery(AlbumSearchQuery.Type.ALPHABETICAL_BY_NAME)
+    pages = [
+        [SubsonicAPI.Album(id=f"a{i}", name=f"Album {i}") for i in range(j, j + 2)]
+        for j in range(0, 6, 2)
+    ]
+    continue_event = threading.Event()
+
+    def get_albums(
+        query: AlbumSearchQuery,
+        sort_direction: str,
+        on_page: Callable[[Sequence[API.Album]], None],
+    ) -> List[SubsonicAPI.Album]:
+        for page in pages:
+            on_page(page)
+            assert continue_event.wait(5)
+        return [album for page in pages for album in page]
+
+    AdapterManager._instance.ground_truth_adapter.get_albums = get_albums  # type: ignore
+
+    received_pages: List[Sequence[API.Album]] = []
+    first_page_received = threading.Event()
+
+    def on_page(page: Sequence[API.Album]):
+        received_pages.append(page)
+        first_page_received.set()
+
+    # The first page should be delivered before the rest of the albums are retrieved.
+    result = AdapterManager.get_albums(query, on_page=on_page)
+    assert first_page_received.wait(5)
+    assert len(received_pages) == 1
+    continue_event.set()
+    assert [a.id for a in result.result()] == [f"a{i}" for i in range(6)]
+    assert received_pages == pages
+
+    # Each page was ingested by the caching adapter as it arrived, and the query result
+    # is valid now that all of them have been ingested.
+    caching_adapter = AdapterManager._instance.caching_adapter
+    assert caching_adapter
+    sleep(0.2)
+    assert [a.id for a in caching_adapter.get_albums(query)] == [f"a{i}" for i in range(6)]
+
+
+def test_incremental_library_sync(adapter_manager: AdapterManager):
+    assert AdapterManager._instance
+    caching_adapter = AdapterManager._instance.caching_adapter
+    assert caching_adapter
+    caching_adapter.ingest_new_data(
+        CachingAdapter.CachedDataKey.ARTISTS,
+        None,
+        [SubsonicAPI.ArtistAndArtistInfo(id="1", name="Old")],
+    )
+
+    library_changes = LibraryChanges("1", changed=False)
+    watermarks: List[Optional[str]] = []
+    artists_requests = 0
+
+    def get_library_changes(watermark: Optional[str]) -> LibraryChanges:
+        watermarks.append(watermark)
+        return library_changes
+
+    def get_artists() -> List[SubsonicAPI.ArtistAndArtistInfo]:
+        nonlocal artists_requests
+        artists_requests += 1
+        return [SubsonicAPI.ArtistAndArtistInfo(id="1", name="New")]
+
+    ground_truth_adapter = AdapterManager._instance.ground_truth_adapter
+    ground_truth_adapter.get_library_changes = get_library_changes  # type: ignore
+    ground_truth_adapter.get_artists = get_artists  # type: ignore
+    ground_truth_adapter.get_ignored_articles = lambda: {"The"}  # type: ignore
+
+    # Nothing has changed, so refreshing the artists just uses the cache.
+    assert [a.name for a in AdapterManager.get_artists(force=True).result()] == ["Old"]
+    assert artists_requests == 0
+    assert watermarks == [None]
+    assert caching_adapter.get_library_watermark() == "1"
+
+    # The result of the last sync is reused for a while.
+    AdapterManager.get_artists(force=True).result()
+    assert watermarks == [None]
+
+    # Read an artist, so that it is in the object cache.
+    caching_adapter.ingest_new_data(
+        CachingAdapter.CachedDataKey.ARTIST,
+        "1",
+        SubsonicAPI.ArtistAndArtistInfo(
+            id="1",
+            name="Old",
+            albums=[SubsonicAPI.Album(id="a0", name="A0", artist_id="1", _artist="Old")],
+        ),
+    )
+    assert AdapterManager.get_artist("1").result().album_count == 1
+
+    # If the only change is new albums, their artists are added to the cached artists,
+    # which are still used.
+    library_changes = LibraryChanges(
+        "2",
+        new_albums=[
+            SubsonicAPI.Album(id="a1", name="A1", artist_id="2", _artist="Newcomer"),
+            SubsonicAPI.Album(id="a2", name="A2", artist_id="1", _artist="Old"),
+        ],
+        new_albums_complete=True,
+    )
+    assert AdapterManager.sync_library().result() == library_changes
+    assert watermarks == [None, "1"]
+    artists = AdapterManager.get_artists(force=True).result()
+    assert [a.name for a in artists] == ["Newcomer", "Old"]
+    assert artists_requests == 0
+
+    # The artist of a new album isn't served from the object cache without it.
+    artist = AdapterManager.get_artist("1").result()
+    assert artist.album_count == 2
+    assert [a.id for a in artist.albums or ()] == ["a0", "a2"]
+
+    # Once something else has changed, refreshing the artists retrieves them again.
+    library_changes = LibraryChanges("3")
+    assert AdapterManager.sync_library().result() == library_changes
+    assert watermarks == [None, "1", "2"]
+    assert [a.name for a in AdapterManager.get_artists(force=True).result()] == ["New"]
+    assert artists_requests == 1
+    assert caching_adapter.get_library_watermark() == "3"
+
+
+def test_mirror_library(adapter_manager: AdapterManager, monkeypatch: pytest.MonkeyPatch):
+    assert AdapterManager._instance
+    ground_truth_adapter = AdapterManager._instance.ground_truth_adapter
+    albums = [SubsonicAPI.Album(id=f"a{i}", name=f"Album {i}") for i in range(5)]
+    requested_album_ids = []
+    failing_album_ids = {"a3"}
+
+    def get_album(album_id: str) -> SubsonicAPI.Album:
+        requested_album_ids.append(album_id)
+        if album_id in failing_album_ids:
+            raise Exception("Connection lost")
+        return SubsonicAPI.Album(id=album_id, name=f"Album {album_id[1:]}")
+
+    ground_truth_adapter.get_genres = lambda: []  # type: ignore
+    ground_truth_adapter.get_artists = lambda: []  # type: ignore
+    ground_truth_adapter.get_playlists = lambda: []  # type: ignore
+    ground_truth_adapter.get_albums = lambda *a, **k: albums  # type: ignore
+    ground_truth_adapter.get_album = get_album  # type: ignore
+    monkeypatch.setattr(AdapterManager, "library_mirror_batch_size", 2)
+    monkeypatch.setattr(AdapterManager, "library_mirror_max_consecutive_failures", 2)
+    monkeypatch.setattr(SubsonicAdapter, "ping_status", True)
+
+    progress = []
+    AdapterManager.mirror_library(lambda *a: progress.append(a)).result()
+    assert sorted(requested_album_ids) == ["a0", "a1", "a2", "a3", "a4"]
+    assert progress[0] == (0, 0, 5)
+    assert progress[-1] == (4, 1, 5)
+
+    # The second time, only the album that failed is retrieved.
+    requested_album_ids.clear()
+    failing_album_ids.clear()
+    AdapterManager.mirror_library().result()
+    assert requested_album_ids == ["a3"]
+
+    caching_adapter = AdapterManager._instance.caching_adapter
+    assert caching_adapter
+    assert [caching_adapter.get_album(a.id).name for a in albums if a.id] == [
+        a.name for a in albums
+    ]
+
+    # If the server becomes unreachable, mirroring stops instead of trying every item.
+    albums.extend(SubsonicAPI.Album(id=f"a{i}", name=f"Album {i}") for i in range(5, 50))
+    AdapterManager.get_albums(
+        AlbumSearchQuery(AlbumSearchQuery.Type.ALPHABETICAL_BY_NAME),
+        use_ground_truth_adapter=True,
+    ).result()
+    requested_album_ids.clear()
+    failing_album_ids.update(a.id for a in albums if a.id)
+    progress.clear()
+    AdapterManager.mirror_library(lambda *a: progress.append(a)).result()
+    assert len(requested_album_ids) < 10
+    done, failed, total = progress[-1]
+    assert (done, total) == (5, 50)
+    assert 2 <= failed < 10
+
+
+def test_http_session_pool():
+    session_pool = HTTPSessionPool(pool_size=3)
+    session = session_pool.session
+    assert session_pool.session is session
+
+    adapter = session.get_adapter("https://subsonic.example.com")
+    assert isinstance(adapter, HTTPAdapter)
+    assert adapter.poolmanager.connection_pool_kw["maxsize"] == 3
+    assert adapter.max_retries.total == 2
+    assert session_pool.connection_stats() == {}
+
+    session_pool.close()
+    assert session_pool.session is not session
+
+
+def test_download_failure_propagates_to_waiters(
+    adapter_manager: AdapterManager, monkeypatch: pytest.MonkeyPatch
+):
+    calls = 0
+
+    def failing_get(*args, **kwargs):
+        nonlocal calls
+        calls += 1
+        sleep(0.2)
+        raise Exception("download failed")
+
+    monkeypatch.setattr(HTTPSessionPool, "get", failing_get)
+
+    first = AdapterManager._create_download_result("https://example.com/1", "1")
+    second = AdapterManager._create_download_result("https://example.com/1", "1")
+
+    for result in (first, second):
+        with pytest.raises(Exception, match="download failed"):
+            result.result()
+    assert calls == 1
+
+
+def test_download_resume(adapter_manager: AdapterManager, monkeypatch: pytest.MonkeyPatch):
+    content = bytes(range(256)) * 256
+    requested_ranges = []
+
+    class FakeResponse:
+        def __init__(self, range_header: Optional[str]):
+            self.offset = int(range_header[6:-1]) if range_header else 0
+            self.status_code = 206 if range_header else 200
+            self.headers = {"Content-Length": str(len(content) - self.offset)}
+            if range_header:
+                content_range = f"bytes {self.offset}-{len(content) - 1}/{len(content)}"
+                self.headers["Content-Range"] = content_range
+            self.raw = self
+            self.position = self.offset
+            # Drop the connection part way through the first request.
+            self.end = len(content) if range_header else 20000
+
+        def read(self, amt: int, decode_content: bool = False) -> bytes:
+            if self.position == self.end < len(content):
+                raise requests.ConnectionError("connection reset")
+            data = content[self.position : min(self.position + amt, self.end)]
+            self.position += len(data)
+            return data
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+    def fake_get(
+        self: HTTPSessionPool, uri: str, headers: Optional[dict] = None, **kwargs
+    ) -> FakeResponse:
+        requested_ranges.append((headers or {}).get("Range"))
+        return FakeResponse(requested_ranges[-1])
+
+    monkeypatch.setattr(HTTPSessionPool, "get", fake_get)
+
+    # The clock doesn't move, so the limiter never refills.
+    limiter = BandwidthLimiter(rate=1024 * 1024, clock=lambda: 0.0)
+    monkeypatch.setattr(AdapterManager, "bandwidth_limiter", limiter)
+
+    # The salt and token change with every request, but the download should resume.
+    downloaded: List[Tuple[str, str]] = []
+    result = AdapterManager._create_download_result(
+        "https://example.com/rest/download.view?id=1&s=abc&t=123",
+        "1",
+        expected_size=len(content),
+        on_downloaded=lambda filename, file_hash: downloaded.append((filename, file_hash)),
+    )
+    with open(result.result(), "rb") as f:
+        assert f.read() == content
+    assert requested_ranges == [None, "bytes=20000-"]
+
+    # The bandwidth acquired for the chunks that never arrived (because the connection
+    # dropped or the rest of the file was shorter than a chunk) was released.
+    assert limiter._total_bucket.tokens == 1024 * 1024 - len(content)
+
+    # The file is hashed while it is downloaded, including the part that was
+    # downloaded before the connection dropped.
+    assert downloaded == [(result.result(), hashlib.sha1(content).hexdigest())]
+    assert AdapterManager._download_tmp_name(
+        "https://example.com/rest/download.view?id=1&s=abc&t=123"
+    ) == AdapterManager._download_tmp_name(
+        "https://example.com/rest/download.view?id=1&s=def&t=456"
+    )
+
+
+def test_download_resume_after_restart(
+    adapter_manager: AdapterManager, monkeypatch: pytest.MonkeyPatch
+):
+    assert AdapterManager._instance
+    content = bytes(range(256)) * 16
+    uri = "https://example.com/rest/download.view?id=1&s=abc&t=123"
+    requested_ranges = []
+
+    # The partial download is kept outside of the temporary download directory, so
+    # it is still there after a restart.
+    partial_download_path = AdapterManager._instance.partial_download_path
+    assert AdapterManager._instance.download_path not in partial_download_path.parents
+    partial_download_path.joinpath(
+        Path(AdapterManager._download_tmp_name(uri)).with_suffix(".part").name
+    ).write_bytes(content[:1000])
+
+    class FakeResponse:
+        status_code = 206
+        headers = {
+            "Content-Length": str(len(content) - 1000),
+            "Content-Range": f"bytes 1000-{len(content) - 1}/{len(content)}",
+        }
+
+        def __init__(self):
+            self.raw = self
+            self.body = io.BytesIO(content[1000:])
+
+        def read(self, amt: int, decode_content: bool = False) -> bytes:
+            return self.body.read(amt)
+
+        def __enter__(self) -> "FakeResponse":
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+    def fake_get(
+        self: HTTPSessionPool, uri: str, headers: Optional[dict] = None, **kwargs
+    ) -> FakeResponse:
+        requested_ranges.append((headers or {}).get("Range"))
+        sleep(0.2)
+        return FakeResponse()
+
+    monkeypatch.setattr(HTTPSessionPool, "get", fake_get)
+
+    # The second request joins the first download, and the downloaded file is only
+    # handed off once.
+    downloaded: List[str] = []
+    first, second = (
+        AdapterManager._create_download_result(
+            uri,
+            "1",
+            expected_size=len(content),
+            on_downloaded=lambda filename, _: downloaded.append(filename),
+        )
+        for _ in range(2)
+    )
+    with open(first.result(), "rb") as f:
+        assert f.read() == content
+    assert second.result() == first.result()
+    assert downloaded == [first.result()]
+    assert requested_ranges == ["bytes=1000-"]
+
+
+def test_stale_download_dirs_removed(tmp_path: Path, request: pytest.FixtureRequest):
+    # Simulate a temporary download directory that was left behind by a crash.
+    stale_dir = tmp_path.joinpath("1", "downloads-crashed")
+    stale_dir.mkdir(parents=True)
+    stale_dir.joinpath("song.mp3").write_bytes(b"song")
+
+    request.getfixturevalue("adapter_manager")
+    assert AdapterManager._instance
+    assert not stale_dir.exists()
+    assert AdapterManager._instance.download_path.exists()
+
+
+def test_partial_downloads_pruned(tmp_path: Path, request: pytest.FixtureRequest):
+    partial_download_path = tmp_path.joinpath("1", "partial_downloads")
+    partial_download_path.mkdir(parents=True)
+    old_partial_file = partial_download_path.joinpath("old.part")
+    old_partial_file.write_bytes(b"old")
+    old_mtime = datetime.now().timestamp() - AdapterManager.partial_download_max_age - 60
+    os.utime(old_partial_file, (old_mtime, old_mtime))
+    new_partial_file = partial_download_path.joinpath("new.part")
+    new_partial_file.write_bytes(b"new")
+
+    # Partial downloads that haven't been resumed for a long time are deleted on
+    # startup.
+    request.getfixturevalue("adapter_manager")
+    assert not old_partial_file.exists()
+    assert new_partial_file.exists()
+
+    # All of them are deleted when the song cache is cleared.
+    AdapterManager.clear_song_cache()
+    assert not new_partial_file.exists()
+
+
 def test_search_result_sort():
     search_results1 = SearchResult(query="foo")
     search_results1.add_results(
@@ -179,6 +974,31 @@ def test_search_result_update():
     assert [a.name for a in search_results1.artists] == ["foo", "another foo", "foo2"]
 
 
+def test_search_result_incremental_scoring():
+    search_results1 = SearchResult(query="foo")
+    search_results1.add_results(
+        "artists",
+        [SubsonicAPI.ArtistAndArtistInfo(id=str(i), name=f"foo{i}") for i in range(5)],
+    )
+    assert len(search_results1.artists) == 5
+    scores = dict(search_results1._scores["artists"])
+
+    # Merging in more results only scores the new (and replaced) ones.
+    search_results2 = SearchResult(query="foo")
+    search_results2.add_results(
+        "artists",
+        [
+            SubsonicAPI.ArtistAndArtistInfo(id="0", name="bar"),
+            SubsonicAPI.ArtistAndArtistInfo(id="5", name="foo"),
+        ],
+    )
+    search_results1.update(search_results2)
+    assert search_results1._unscored["artists"] == {"0", "5"}
+    assert [a.name for a in search_results1.artists] == ["foo1", "foo2", "foo3", "foo4", "foo"]
+    assert search_results1._scores["artists"]["0"] is None
+    assert all(search_results1._scores["artists"][id_] == scores[id_] for id_ in "1234")
+
+
 def test_search(adapter_manager: AdapterManager):
     # TODO (#180)
     return
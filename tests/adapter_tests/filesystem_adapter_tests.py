@@ -1,9 +1,13 @@
+import hashlib
 import json
+import logging
 import shutil
+import threading
 from dataclasses import asdict
-from datetime import timedelta
+from datetime import datetime, timedelta
 from pathlib import Path
-from typing import Any, Generator, Iterable, Tuple, cast
+from time import perf_counter
+from typing import Any, Generator, Iterable, List, Tuple, cast
 
 import pytest
 from peewee import SelectQuery
@@ -11,10 +15,12 @@ from peewee import SelectQuery
 from sublime_music.adapters import (
     AlbumSearchQuery,
     CacheMissError,
+    LibraryChanges,
     SongCacheStatus,
     api_objects as SublimeAPI,
 )
 from sublime_music.adapters.filesystem import FilesystemAdapter
+from sublime_music.adapters.filesystem import models
 from sublime_music.adapters.filesystem.models import Directory
 from sublime_music.adapters.subsonic import api_objects as SubsonicAPI
 
@@ -238,6 +244,112 @@ def test_caching_get_playlist_details(cache_adapter: FilesystemAdapter):
     verify_songs(playlist.songs, MOCK_SUBSONIC_SONGS)
 
 
+def test_caching_large_playlist_details(cache_adapter: FilesystemAdapter):
+    songs = [
+        SubsonicAPI.Song(
+            f"s{i}",
+            title=f"Song {i}",
+            _album=f"Album {i % 10}",
+            album_id=f"a{i % 10}",
+            _artist=f"Artist {i % 20}",
+            artist_id=f"ar{i % 20}",
+            cover_art=f"c{i % 10}",
+            path=f"artist/album/song{i}.mp3",
+        )
+        for i in range(5000)
+    ]
+    cache_adapter.ingest_new_data(
+        KEYS.PLAYLIST_DETAILS, "1", SubsonicAPI.Playlist("1", "big", songs=songs)
+    )
+
+    playlist = cache_adapter.get_playlist_details("1")
+    assert [s.id for s in playlist.songs] == [s.id for s in songs]
+    song = cache_adapter.get_song_details("s1234")
+    assert song.album and song.artist
+    assert (song.title, song.album.name, song.artist.name) == ("Song 1234", "Album 4", "Artist 14")
+    assert (song.cover_art, song.path) == ("c4", "artist/album/song1234.mp3")
+
+    # Ingesting less data doesn't overwrite the data that's already there.
+    cache_adapter.ingest_new_data(
+        KEYS.PLAYLIST_DETAILS,
+        "1",
+        SubsonicAPI.Playlist("1", "big", songs=[SubsonicAPI.Song("s1234", title="New Title")]),
+    )
+    song = cache_adapter.get_song_details("s1234")
+    assert song.album
+    assert (song.title, song.album.name, song.path) == (
+        "New Title",
+        "Album 4",
+        "artist/album/song1234.mp3",
+    )
+    assert [s.id for s in cache_adapter.get_playlist_details("1").songs] == ["s1234"]
+
+
+def test_read_latency_during_ingest_benchmark(cache_adapter: FilesystemAdapter):
+    # Reads from other threads (such as the UI thread) shouldn't have to wait for an
+    # ingestion to finish. The latencies depend on the machine, so they are only logged.
+    songs = [
+        SubsonicAPI.Song(f"s{i}", title=f"Song {i}", _album="Album", album_id="a1")
+        for i in range(2000)
+    ]
+    cache_adapter.ingest_new_data(KEYS.SONG, "s0", songs[0])
+
+    done = threading.Event()
+    latencies: List[float] = []
+
+    def read():
+        # Read at least once, so that there is something to log.
+        while not (latencies and done.is_set()):
+            start = perf_counter()
+            assert cache_adapter.get_song_details("s0").title == "Song 0"
+            latencies.append(perf_counter() - start)
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    iterations = 5
+    start = perf_counter()
+    for i in range(iterations):
+        cache_adapter.ingest_new_data(
+            KEYS.PLAYLIST_DETAILS, "1", SubsonicAPI.Playlist("1", f"{i}", songs=songs)
+        )
+    ingest_time = (perf_counter() - start) / iterations
+    done.set()
+    reader.join()
+
+    latencies.sort()
+    logging.info(
+        f"{len(latencies)} reads during {iterations} ingestions ({ingest_time:.3f}s each): "
+        f"median {latencies[len(latencies) // 2] * 1000:.2f}ms, "
+        f"max {latencies[-1] * 1000:.2f}ms"
+    )
+
+
+def test_playlist_details_expiry(cache_adapter: FilesystemAdapter):
+    cache_adapter.ingest_new_data(
+        KEYS.PLAYLIST_DETAILS,
+        "1",
+        SubsonicAPI.Playlist("1", "test1", songs=MOCK_SUBSONIC_SONGS[:2]),
+    )
+    assert cache_adapter.get_playlist_details("1").name == "test1"
+
+    expiration_time = cache_adapter.get_expiration_time(KEYS.PLAYLIST_DETAILS, "1")
+    assert expiration_time
+    assert expiration_time - datetime.now() <= cache_adapter.cache_ttls[KEYS.PLAYLIST_DETAILS]
+
+    # Pretend that the playlist was ingested a long time ago. The old data should be
+    # returned in the CacheMissError.
+    cache_adapter.cache_ttls = {KEYS.PLAYLIST_DETAILS: timedelta(seconds=0)}
+    try:
+        cache_adapter.get_playlist_details("1")
+        assert 0, "DID NOT raise CacheMissError"
+    except CacheMissError as e:
+        assert e.partial_data
+        assert e.partial_data.name == "test1"
+
+    # Songs have no TTL.
+    assert cache_adapter.get_expiration_time(KEYS.SONG, "1") is None
+
+
 def test_no_caching_get_playlist_details(adapter: FilesystemAdapter):
     with pytest.raises(Exception, match="<Model: Playlist> with id=1 does not exist"):
         adapter.get_playlist_details("1")
@@ -399,6 +511,24 @@ def test_malformed_song_path(cache_adapter: FilesystemAdapter):
     assert song_uri2.endswith("fine/path/song2.mp3")
 
 
+def test_ingest_song_file_with_hash(cache_adapter: FilesystemAdapter, tmp_path: Path):
+    cache_adapter.ingest_new_data(KEYS.SONG, "1", MOCK_SUBSONIC_SONGS[1])
+
+    # When the hash is known, the downloaded file is moved into the cache.
+    song_content = bytes(range(256)) * 64
+    song_hash = hashlib.sha1(song_content).hexdigest()
+    buffer_filename = tmp_path.joinpath("download")
+    buffer_filename.write_bytes(song_content)
+    cache_adapter.ingest_new_data(
+        KEYS.SONG_FILE, "1", (None, str(buffer_filename), None, song_hash)
+    )
+
+    assert not buffer_filename.exists()
+    song_uri = cache_adapter.get_song_file_uri("1", "file")
+    assert song_uri.endswith(f"/music/{MOCK_SUBSONIC_SONGS[1].path}")
+    assert Path(song_uri[len("file://") :]).read_bytes() == song_content
+
+
 def test_get_cached_statuses(cache_adapter: FilesystemAdapter):
     cache_adapter.ingest_new_data(KEYS.SONG, "1", MOCK_SUBSONIC_SONGS[1])
     assert cache_adapter.get_cached_statuses(["1"]) == {"1": SongCacheStatus.NOT_CACHED}
@@ -571,6 +701,22 @@ def test_caching_get_song_details(cache_adapter: FilesystemAdapter):
         cache_adapter.get_playlist_details("2")
 
 
+def test_caching_get_songs_details(cache_adapter: FilesystemAdapter):
+    assert cache_adapter.get_songs_details(["1", "2"]) == {}
+
+    cache_adapter.ingest_new_data_batch([(KEYS.SONG, s.id, s) for s in MOCK_SUBSONIC_SONGS])
+
+    songs = cache_adapter.get_songs_details(["1", "2", "3"])
+    assert set(songs.keys()) == {"1", "2"}
+    assert songs["1"].title == "Song 1"
+    assert songs["1"].album and songs["1"].album.name == "foo"
+    assert songs["2"].artist and songs["2"].artist.name == "cool"
+
+    # Invalidated songs should not be returned.
+    cache_adapter.invalidate_data(KEYS.SONG, "1")
+    assert set(cache_adapter.get_songs_details(["1", "2"]).keys()) == {"2"}
+
+
 def test_caching_get_song_details_missing_data(cache_adapter: FilesystemAdapter):
     with pytest.raises(CacheMissError):
         cache_adapter.get_song_details("1")
@@ -853,6 +999,171 @@ def test_caching_get_album(cache_adapter: FilesystemAdapter):
     verify_songs(album.songs, MOCK_SUBSONIC_SONGS[:2])
 
 
+def test_get_cached_params(cache_adapter: FilesystemAdapter):
+    assert cache_adapter.get_cached_params(KEYS.ALBUM) == set()
+
+    for album_id in ("a1", "a2"):
+        cache_adapter.ingest_new_data(
+            KEYS.ALBUM, album_id, SubsonicAPI.Album(id=album_id, name=album_id)
+        )
+    cache_adapter.invalidate_data(KEYS.ALBUM, "a2")
+    assert cache_adapter.get_cached_params(KEYS.ALBUM) == {"a1"}
+
+    # Expired data isn't cached either.
+    cache_adapter.cache_ttls = {KEYS.ALBUM: timedelta(seconds=0)}
+    assert cache_adapter.get_cached_params(KEYS.ALBUM) == set()
+
+
+def test_caching_get_albums_pages(cache_adapter: FilesystemAdapter):
+    query = AlbumSearchQuery(AlbumSearchQuery.Type.ALPHABETICAL_BY_NAME)
+    albums = [SubsonicAPI.Album(id=f"a{i}", name=f"Album {i}") for i in range(5)]
+
+    # Simulate the pages of albums being retrieved from Subsonic.
+    assert cache_adapter.ingest_new_data_page(
+        KEYS.ALBUMS, query.strhash(), albums[:3], 0, is_last_page=False
+    )
+
+    # The query result isn't valid until the last page has been ingested, but the pages
+    # that have been ingested are available as partial data.
+    try:
+        cache_adapter.get_albums(query)
+        assert 0, "DID NOT raise CacheMissError"
+    except CacheMissError as e:
+        assert [a.id for a in e.partial_data] == ["a0", "a1", "a2"]
+
+    cache_adapter.ingest_new_data_page(
+        KEYS.ALBUMS, query.strhash(), albums[3:], 3, is_last_page=False
+    )
+    cache_adapter.ingest_new_data_page(KEYS.ALBUMS, query.strhash(), [], 5, is_last_page=True)
+    assert [a.id for a in cache_adapter.get_albums(query)] == [a.id for a in albums]
+
+    # Ingesting the first page again replaces the old query result.
+    cache_adapter.ingest_new_data_page(
+        KEYS.ALBUMS, query.strhash(), albums[4:], 0, is_last_page=True
+    )
+    assert [a.id for a in cache_adapter.get_albums(query)] == ["a4"]
+
+    # The albums themselves are only partial data.
+    with pytest.raises(CacheMissError):
+        cache_adapter.get_album("a0")
+
+
+def test_caching_library_sync(cache_adapter: FilesystemAdapter):
+    assert cache_adapter.get_library_watermark() is None
+
+    query = AlbumSearchQuery(AlbumSearchQuery.Type.NEWEST)
+    cache_adapter.ingest_new_data(
+        KEYS.ARTISTS, None, [SubsonicAPI.ArtistAndArtistInfo(id="1", name="test1")]
+    )
+    cache_adapter.ingest_new_data(
+        KEYS.ALBUMS, query.strhash(), [SubsonicAPI.Album(id="a1", name="Album 1")]
+    )
+
+    # If nothing changed, the cached data is still valid.
+    cache_adapter.ingest_new_data(KEYS.LIBRARY_SYNC, None, LibraryChanges("1", changed=False))
+    assert cache_adapter.get_library_watermark() == "1"
+    assert [a.id for a in cache_adapter.get_artists()] == ["1"]
+    assert [a.id for a in cache_adapter.get_albums(query)] == ["a1"]
+
+    # If something changed, the lists are invalidated, and the new albums and root
+    # directory are cached.
+    cache_adapter.ingest_new_data(
+        KEYS.LIBRARY_SYNC,
+        None,
+        LibraryChanges(
+            "2",
+            new_albums=[SubsonicAPI.Album(id="a2", name="Album 2")],
+            root_directory=SubsonicAPI.Directory(
+                id="root", _children=[{"id": "d1", "title": "Dir 1", "isDir": True}]
+            ),
+        ),
+    )
+    assert cache_adapter.get_library_watermark() == "2"
+    with pytest.raises(CacheMissError):
+        cache_adapter.get_artists()
+    try:
+        cache_adapter.get_albums(query)
+        assert 0, "DID NOT raise CacheMissError"
+    except CacheMissError as e:
+        assert [a.id for a in e.partial_data] == ["a1"]
+    try:
+        cache_adapter.get_album("a2")
+        assert 0, "DID NOT raise CacheMissError"
+    except CacheMissError as e:
+        assert e.partial_data.name == "Album 2"
+    assert [c.id for c in cache_adapter.get_directory("root").children] == ["d1"]
+
+
+def test_caching_library_sync_new_albums(cache_adapter: FilesystemAdapter):
+    Type = AlbumSearchQuery.Type
+    rock = AlbumSearchQuery(Type.GENRE, genre=SubsonicAPI.Genre("Rock"))
+    jazz = AlbumSearchQuery(Type.GENRE, genre=SubsonicAPI.Genre("Jazz"))
+    queries = [
+        (AlbumSearchQuery(Type.NEWEST), ["c", "a"]),
+        (AlbumSearchQuery(Type.ALPHABETICAL_BY_NAME), ["a", "c"]),
+        (AlbumSearchQuery(Type.ALPHABETICAL_BY_ARTIST), ["c", "a"]),
+        (rock, ["a"]),
+        (jazz, ["c"]),
+        (AlbumSearchQuery(Type.YEAR_RANGE, year_range=(2000, 2020)), ["a", "c"]),
+    ]
+    albums = {
+        "a": SubsonicAPI.Album(id="a", name="A", artist_id="2", _artist="Z", _genre="Rock"),
+        "c": SubsonicAPI.Album(id="c", name="C", artist_id="1", _artist="X", _genre="Jazz"),
+    }
+    cache_adapter.ingest_new_data(
+        KEYS.ARTISTS,
+        None,
+        [
+            SubsonicAPI.ArtistAndArtistInfo(id="1", name="X", album_count=1),
+            SubsonicAPI.ArtistAndArtistInfo(id="2", name="Z", album_count=1),
+        ],
+    )
+    cache_adapter.ingest_new_data(KEYS.GENRES, None, [SubsonicAPI.Genre("Rock")])
+    for query, album_ids in queries:
+        cache_adapter.ingest_new_data(
+            KEYS.ALBUMS, query.strhash(), [albums[album_id] for album_id in album_ids]
+        )
+
+    # When new albums are the only change, they are added to the cached lists that they
+    # belong in, which stay valid.
+    cache_adapter.ingest_new_data(
+        KEYS.LIBRARY_SYNC,
+        None,
+        LibraryChanges(
+            "1",
+            new_albums=[
+                SubsonicAPI.Album(id="d", name="D", artist_id="2", _artist="Z", _genre="Rock"),
+                SubsonicAPI.Album(id="b", name="B", artist_id="3", _artist="Y", _genre="Pop"),
+            ],
+            new_albums_complete=True,
+        ),
+    )
+    assert [a.id for a in cache_adapter.get_albums(AlbumSearchQuery(Type.NEWEST))] == [
+        "d",
+        "b",
+        "c",
+        "a",
+    ]
+    assert [
+        a.id for a in cache_adapter.get_albums(AlbumSearchQuery(Type.ALPHABETICAL_BY_NAME))
+    ] == ["a", "b", "c", "d"]
+    assert [
+        a.id for a in cache_adapter.get_albums(AlbumSearchQuery(Type.ALPHABETICAL_BY_ARTIST))
+    ] == ["c", "b", "a", "d"]
+    assert [a.id for a in cache_adapter.get_albums(rock)] == ["a", "d"]
+    assert [a.id for a in cache_adapter.get_albums(jazz)] == ["c"]
+    assert {(a.name, a.album_count) for a in cache_adapter.get_artists()} == {
+        ("X", 1),
+        ("Y", None),
+        ("Z", 2),
+    }
+    assert {g.name for g in cache_adapter.get_genres()} == {"Jazz", "Pop", "Rock"}
+
+    # The year range lists can't be updated.
+    with pytest.raises(CacheMissError):
+        cache_adapter.get_albums(AlbumSearchQuery(Type.YEAR_RANGE, year_range=(2000, 2020)))
+
+
 def test_caching_invalidate_artist(cache_adapter: FilesystemAdapter):
     # Simulate the artist details being retrieved from Subsonic.
     cache_adapter.ingest_new_data(
@@ -1044,3 +1355,36 @@ def test_search(cache_adapter: FilesystemAdapter):
     ]
     assert [a.name for a in search_result.artists] == ["foo", "better boo"]
     assert [a.name for a in search_result.albums] == ["Foo", "Boo"]
+
+
+def test_search_index(cache_adapter: FilesystemAdapter, tmp_path: Path):
+    assert cache_adapter.has_search_indexes
+    songs = [
+        SubsonicAPI.Song(f"s{i}", title, _artist="The Beatles", artist_id="ar1")
+        for i, title in enumerate(("Yellow Submarine", "Here Comes the Sun", "Something"))
+    ]
+    cache_adapter.ingest_new_data(
+        KEYS.PLAYLIST_DETAILS, "1", SubsonicAPI.Playlist("1", "Favourites", songs=songs)
+    )
+
+    # Misspelled queries still match.
+    assert [s.title for s in cache_adapter.search("submarnie").songs] == ["Yellow Submarine"]
+    assert [p.name for p in cache_adapter.search("favorites").playlists] == ["Favourites"]
+    # Songs match by the name of their artist, too.
+    assert len(cache_adapter.search("beatles").songs) == 3
+
+    # The index is updated when the data changes.
+    cache_adapter.ingest_new_data(
+        KEYS.SONG,
+        "s0",
+        SubsonicAPI.Song("s0", "Octopus's Garden", _artist="The Beatles", artist_id="ar1"),
+    )
+    assert cache_adapter.search("submarine").songs == []
+    assert [s.title for s in cache_adapter.search("octopus").songs] == ["Octopus's Garden"]
+    cache_adapter.delete_data(KEYS.PLAYLIST_DETAILS, "1")
+    assert cache_adapter.search("favourites").playlists == []
+
+    # Data that was cached before the index existed is indexed.
+    models.SongSearchIndex.drop_table()
+    new_adapter = FilesystemAdapter({}, tmp_path, is_cache=True)
+    assert [s.title for s in new_adapter.search("octopus").songs] == ["Octopus's Garden"]
@@ -2,15 +2,20 @@ import hashlib
 import json
 import logging
 import re
+import threading
 from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from pathlib import Path
-from typing import Any, Generator, List, Tuple
+from time import monotonic, perf_counter, sleep
+from typing import Any, Dict, Generator, List, Tuple
 
 import pytest
+from dateutil import parser as dateutil_parser
 from dateutil.tz import tzutc
 
-from sublime_music.adapters import ConfigurationStore
+from sublime_music.adapters import AlbumSearchQuery, ConfigurationStore
 from sublime_music.adapters.subsonic import SubsonicAdapter, api_objects as SubsonicAPI
+from sublime_music.adapters.subsonic.decoder import LazyList, decode, parse_iso8601
 
 MOCK_DATA_FILES = Path(__file__).parent.joinpath("mock_data")
 
@@ -556,3 +561,270 @@ def test_search(adapter: SubsonicAdapter):
         assert len(search_results._songs) == 7
         assert len(search_results._artists) == 2
         assert len(search_results._albums) == 4
+
+
+def test_parse_iso8601():
+    for timestamp in (
+        "2020-03-27T05:32:31.000Z",
+        "2020-03-27T05:32:31Z",
+        "2020-03-27T05:32:31.123456789+02:00",
+        "2020-03-27T05:32:31-0530",
+        "2020-03-27 05:32:31.5",
+        "2020-03-27",
+    ):
+        expected = dateutil_parser.parse(timestamp)
+        parsed = parse_iso8601(timestamp)
+        assert parsed == expected
+        assert parsed.utcoffset() == expected.utcoffset()
+
+
+def test_decode_response_benchmark():
+    # Decode all of the mock responses with dataclasses_json and with the fast path,
+    # and make sure that the results are the same. The timings depend on the machine,
+    # so they are only logged.
+    responses = []
+    for file in sorted(MOCK_DATA_FILES.glob("*.json")):
+        for part in re.split(r"=+\n", file.read_text()):
+            try:
+                if subsonic_response := json.loads(part).get("subsonic-response"):
+                    responses.append(subsonic_response)
+            except ValueError:
+                pass
+    assert len(responses) > 0
+
+    for subsonic_response in responses:
+        expected = SubsonicAPI.Response.from_dict(subsonic_response)
+        assert decode(SubsonicAPI.Response, subsonic_response) == expected
+
+    iterations = 20
+    start = perf_counter()
+    for _ in range(iterations):
+        for subsonic_response in responses:
+            SubsonicAPI.Response.from_dict(subsonic_response)
+    dataclasses_json_time = perf_counter() - start
+
+    start = perf_counter()
+    for _ in range(iterations):
+        for subsonic_response in responses:
+            decode(SubsonicAPI.Response, subsonic_response)
+    fast_path_time = perf_counter() - start
+
+    logging.info(
+        f"Decoded {len(responses)} responses {iterations} times: "
+        f"dataclasses_json {dataclasses_json_time:.3f}s, fast path {fast_path_time:.3f}s "
+        f"({dataclasses_json_time / fast_path_time:.1f}x)"
+    )
+
+
+def test_lazy_decoding(adapter: SubsonicAdapter):
+    for filename, data in mock_data_files("get_album"):
+        logging.info(filename)
+        logging.debug(data)
+        adapter._set_mock_data(data)
+
+        album = adapter.get_album("243")
+        songs = album.songs
+        assert isinstance(songs, LazyList)
+
+        # Nothing is decoded until it is accessed.
+        assert len(songs) == 17
+        assert not any(songs._decoded)
+
+        song = songs[-1]
+        assert song.title == "Better Together"
+        assert songs._decoded.count(1) == 1
+        assert songs[16] is song
+        assert [s.title for s in songs[:2]] == ["Beer Never Broke My Heart", "Refrigerator Door"]
+        assert songs._decoded.count(1) == 3
+
+        # Once everything is decoded, it's the same as a list of the songs.
+        subsonic_response = json.loads(filename.read_text())["subsonic-response"]
+        expected = SubsonicAPI.Response.from_dict(subsonic_response)
+        assert expected.album and songs == expected.album.songs
+        assert all(songs._decoded)
+
+
+def test_get_albums_parallel_pages(adapter: SubsonicAdapter):
+    num_albums = 2250
+    requested_offsets = []
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    class MockResult:
+        status_code = 200
+
+        def __init__(self, content: str):
+            self._content = content
+
+        def json(self) -> Any:
+            return json.loads(self._content)
+
+    def get_album_list_page(url: str, **params) -> MockResult:
+        nonlocal in_flight, max_in_flight
+        offset, size = params["offset"], params["size"]
+        with lock:
+            requested_offsets.append(offset)
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+
+        # Make the earlier pages slower so that they come back out of order.
+        sleep(0.05 if offset < 1000 else 0.01)
+        with lock:
+            in_flight -= 1
+
+        albums = [
+            {"id": str(i), "name": f"Album {i}"}
+            for i in range(offset, min(offset + size, num_albums))
+        ]
+        return MockResult(mock_json(albumList2={"album": albums}))
+
+    adapter._get = get_album_list_page  # type: ignore
+
+    albums = adapter.get_albums(AlbumSearchQuery(AlbumSearchQuery.Type.ALPHABETICAL_BY_NAME))
+    assert [a.id for a in albums] == [str(i) for i in range(num_albums)]
+    assert max_in_flight > 1
+
+    # It should stop at the short page (offset 2000) instead of fetching until an empty
+    # page comes back, apart from the pages that were already in flight.
+    assert len(requested_offsets) <= 5 + adapter.max_album_pages_in_flight
+
+
+def test_get_library_changes(adapter: SubsonicAdapter):
+    last_modified = 1000
+    albums = [
+        {"id": f"a{i}", "name": f"Album {i}", "created": f"2020-01-{20 - i}T00:00:00.000Z"}
+        for i in range(5)
+    ]
+    requests_made: List[str] = []
+
+    class MockResult:
+        status_code = 200
+
+        def __init__(self, content: str):
+            self._content = content
+
+        def json(self) -> Any:
+            return json.loads(self._content)
+
+    def get(url: str, **params) -> MockResult:
+        endpoint = url.split("/")[-1]
+        requests_made.append(endpoint)
+        if endpoint == "getIndexes.view":
+            indexes: Dict[str, Any] = {"lastModified": last_modified}
+            # The indexes are only returned if they changed since ifModifiedSince.
+            if params.get("ifModifiedSince") != last_modified:
+                indexes["index"] = [{"name": "A", "artist": [{"id": "1", "name": "A"}]}]
+            return MockResult(mock_json(indexes=indexes))
+
+        offset, size = params["offset"], params["size"]
+        return MockResult(mock_json(albumList2={"album": albums[offset : offset + size]}))
+
+    adapter._get = get  # type: ignore
+
+    # The first sync only gets the newest album.
+    changes = adapter.get_library_changes(None)
+    assert changes.changed
+    assert changes.new_albums == []
+    assert not changes.new_albums_complete
+    assert changes.root_directory and [c.id for c in changes.root_directory.children] == ["1"]
+    assert requests_made == ["getIndexes.view", "getAlbumList2.view"]
+
+    # Nothing has changed, so only the indexes are requested, and they are empty.
+    requests_made.clear()
+    unchanged = adapter.get_library_changes(changes.watermark)
+    assert not unchanged.changed
+    assert unchanged.watermark == changes.watermark
+    assert requests_made == ["getIndexes.view"]
+
+    # Add some albums, and the sync should only return those.
+    last_modified = 2000
+    albums = [
+        {"id": f"new{i}", "name": f"New {i}", "created": f"2020-02-0{9 - i}T00:00:00.000Z"}
+        for i in range(3)
+    ] + albums
+    changes = adapter.get_library_changes(changes.watermark)
+    assert changes.changed
+    assert [a.id for a in changes.new_albums] == ["new0", "new1", "new2"]
+    assert changes.new_albums_complete
+    assert changes.root_directory
+
+    requests_made.clear()
+    assert not adapter.get_library_changes(changes.watermark).changed
+    assert requests_made == ["getIndexes.view"]
+
+    # If too many albums were added, only some of them are returned.
+    last_modified = 3000
+    albums = [
+        {"id": f"newer{i}", "name": f"Newer {i}", "created": f"2020-03-0{9 - i}T00:00:00.000Z"}
+        for i in range(3)
+    ] + albums
+    adapter.max_library_sync_albums = 2
+    changes = adapter.get_library_changes(changes.watermark)
+    assert [a.id for a in changes.new_albums] == ["newer0", "newer1"]
+    assert not changes.new_albums_complete
+
+
+def test_async_network_engine(tmp_path: Path):
+    pytest.importorskip("aiohttp")
+    song_json = MOCK_DATA_FILES.joinpath("get_song_details-airsonic.json").read_bytes()
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+
+    class StandInSubsonicServer(BaseHTTPRequestHandler):
+        def do_GET(self):
+            nonlocal in_flight, max_in_flight
+            with lock:
+                in_flight += 1
+                max_in_flight = max(max_in_flight, in_flight)
+            sleep(2 if "id=slow" in self.path else 0.2)
+            with lock:
+                in_flight -= 1
+
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(song_json)))
+            self.end_headers()
+            self.wfile.write(song_json)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInSubsonicServer)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    ConfigurationStore.MOCK = True
+    config = ConfigurationStore(
+        server_address=f"http://127.0.0.1:{server.server_port}",
+        username="test",
+        verify_cert=True,
+        salt_auth=False,
+        use_async_network_engine=True,
+    )
+    config.set_secret("password", "testpass")
+    adapter = SubsonicAdapter(config, tmp_path)
+
+    try:
+        # Only the supported methods run on the engine.
+        assert adapter.call_async("get_artists") is None
+
+        start = monotonic()
+        futures = [adapter.call_async("get_song_details", "1") for _ in range(20)]
+        for future in futures:
+            assert future
+            assert future.result(timeout=10).title == "Sweet Caroline"
+
+        # All of the requests should have been in flight at the same time.
+        assert monotonic() - start < 2
+        assert max_in_flight > 1
+
+        # Requests can be cancelled while they are in flight.
+        slow_future = adapter.call_async("get_song_details", "slow")
+        assert slow_future
+        sleep(0.2)
+        assert slow_future.cancel()
+        assert slow_future.cancelled()
+    finally:
+        adapter.shutdown()
+        server.shutdown()